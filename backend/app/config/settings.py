@@ -1,4 +1,5 @@
 from pydantic_settings import BaseSettings
+from functools import lru_cache
 from typing import Optional
 import os
 
@@ -12,10 +13,104 @@ class Settings(BaseSettings):
     secret_key: str = "your-secret-key-change-in-production-2024"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    refresh_token_expire_days: int = 30
+    
+    # Password hashing settings
+    password_schemes: list = ["bcrypt"]  # El primero se usa para hashes nuevos; el resto se migra al iniciar sesión
+    bcrypt_rounds: int = 12  # Factor de trabajo (ver benchmarks/bench_bcrypt_cost.py)
+    password_scheme_options: dict = {}  # Opciones extra de passlib, p. ej. {"argon2__memory_cost": 65536}
+    jwt_backend: str = "jose"  # "jose" o "pyjwt" (requiere PyJWT instalado)
+    token_cache_size: int = 4096  # Tokens verificados en caché (0 = desactivado)
+    admin_emails: list = []  # Usuarios registrados con estos correos reciben el rol admin
     
     # Database settings
     mongodb_url: str = "mongodb://localhost:27017/"
     database_name: str = "expense_tracker"
+    tombstone_retention_days: int = 30  # Tokens de sincronización más antiguos fuerzan recarga completa
+    search_language: str = "spanish"  # Idioma del índice de texto (stemming y palabras vacías)
+    search_max_time_ms: int = 2000  # Tiempo máximo de una búsqueda con q=
+    expense_storage: str = "documents"  # "documents" (un documento por gasto) o "buckets" (uno por usuario y mes)
+    
+    # Currency settings
+    default_currency: str = "COP"  # Moneda de los gastos sin moneda y de los usuarios sin moneda de reporte
+    fx_rates_path: str = ""  # JSON versionado de tasas de cambio (vacío = app/data/fx_rates.json)
+    
+    # Import settings
+    import_chunk_size: int = 1000  # Filas por insert_many
+    import_max_bytes: int = 50 * 1024 * 1024
+    import_default_category: str = "Importado"
+    
+    # Background job settings
+    job_retention_seconds: int = 3600  # Tiempo que se conserva el estado de un trabajo tras su última actualización
+    job_progress_interval_seconds: float = 1.0  # Cada cuánto un trabajo en curso guarda su progreso
+    job_drain_seconds: float = 20.0  # Espera a los trabajos en curso al apagar un worker antes de cancelarlos
+    
+    # Statement settings
+    statement_workers: int = 2  # Procesos que generan estados de cuenta (por worker)
+    statement_cache_dir: str = ""  # Caché de archivos generados (vacío = directorio temporal del sistema)
+    statement_batch_size: int = 1000  # Gastos leídos por lote del cursor
+    
+    # Insights settings
+    insights_enabled: bool = False  # Pasada nocturna de pronósticos y anomalías
+    insights_tick_seconds: float = 3600.0  # Cada cuánto se revisa si toca (o continúa) la pasada
+    insights_hour_utc: int = 3  # Hora UTC a partir de la cual empieza la pasada del día
+    insights_time_budget_seconds: float = 1800.0  # Tiempo máximo por ejecución; lo que falte sigue en la próxima
+    insights_batch_users: int = 1000  # Usuarios por consulta y por cálculo vectorizado
+    insights_history_days: int = 90  # Historial antes del mes actual usado para el pronóstico
+    insights_half_life_days: float = 14.0  # Vida media del peso de los días del historial
+    insights_anomaly_threshold: float = 3.5  # Puntaje z robusto a partir del cual un gasto es inusual
+    insights_min_samples: int = 8  # Gastos mínimos de una categoría para marcar anomalías
+    insights_max_anomalies: int = 20  # Anomalías guardadas por usuario
+    
+    # Recurring transactions settings
+    recurring_scheduler_enabled: bool = True
+    recurring_tick_seconds: float = 60.0
+    recurring_batch_size: int = 500  # Reglas vencidas por bulk_write
+    
+    # Audit log settings
+    audit_enabled: bool = True
+    audit_queue_size: int = 10000  # Eventos en memoria; al llenarse se descartan (ver /metrics)
+    audit_batch_size: int = 500  # Eventos por insert_many
+    audit_flush_ms: int = 1000  # Tiempo máximo de un evento en la cola
+    audit_retention_days: int = 90
+    
+    # Rate limiting settings (token bucket per user, or per IP when anonymous)
+    rate_limit_enabled: bool = True
+    rate_limit_backend: str = "memory"  # "memory" (por worker) o "mongo" (compartido entre workers)
+    rate_limit_rate: float = 10.0  # Tokens recuperados por segundo
+    rate_limit_burst: float = 60.0  # Tokens máximos acumulados
+    rate_limit_costs: dict = {  # Costo por "MÉTODO /ruta" (admite comodines); el resto cuesta 1
+        "POST /auth/login": 10,
+        "POST /auth/register": 10,
+        "POST /auth/refresh": 2,
+        "GET /expenses/stats/*": 5,
+        "POST /expenses/import": 20,
+    }
+    rate_limit_trust_forwarded: bool = False  # Usar X-Forwarded-For (solo detrás de un proxy confiable)
+    
+    # Compression settings
+    compression_enabled: bool = True
+    compression_min_size: int = 1024  # Bytes; las respuestas más pequeñas se envían sin comprimir
+    compression_gzip_level: int = 6
+    compression_brotli_quality: int = 4  # Solo si el paquete brotli está instalado
+    ws_per_message_deflate: bool = True  # Negociar permessage-deflate en /ws/expenses
+    
+    # WebSocket settings (per worker)
+    ws_heartbeat_seconds: float = 25.0  # Intervalo de los mensajes heartbeat del servidor
+    ws_idle_timeout_seconds: float = 75.0  # Sin mensajes del cliente en este tiempo se cierra (0 = nunca)
+    ws_send_timeout_seconds: float = 10.0  # Un envío bloqueado más tiempo se considera conexión muerta
+    ws_max_buffered_bytes: int = 1048576  # Bytes en cola por conexión antes de cerrarla por lenta
+    ws_max_connections_per_user: int = 10  # Al superarlo se cierra la conexión más antigua del usuario
+    ws_max_connections: int = 10000  # Al superarlo las conexiones nuevas se rechazan con 1013
+    
+    # Archive settings (cold tier for old expenses)
+    archive_enabled: bool = False
+    archive_after_days: int = 730  # Los meses completos más antiguos que esto se archivan
+    archive_tick_seconds: float = 3600.0
+    archive_batch_months: int = 200  # Meses (usuario, mes) archivados por ejecución
+    
+    # Cache settings
+    stats_cache_ttl_seconds: float = 5.0  # Resultados de estadísticas en caché por usuario (0 = solo coalescer)
     
     # CORS settings
     allowed_origins: list = [
@@ -28,6 +123,20 @@ class Settings(BaseSettings):
     # Server settings
     host: str = "0.0.0.0"
     port: int = 8000
+    workers: int = 1  # Procesos de app.server (0 = uno por núcleo; más de uno requiere RATE_LIMIT_BACKEND=mongo)
+    max_requests: int = 0  # Peticiones por worker antes de reemplazarlo (0 = nunca)
+    max_requests_jitter: int = 0  # Extra aleatorio por worker, para que no se reciclen a la vez
+    graceful_timeout_seconds: int = 30  # Espera máxima a las peticiones en curso al apagar
+    ws_drain_jitter_seconds: float = 10.0  # Ventana en la que los clientes WebSocket reparten su reconexión
+    
+    # Event loop monitor settings
+    loop_monitor_enabled: bool = True
+    loop_monitor_interval_ms: int = 100  # Cada cuánto se mide el retraso del event loop
+    loop_monitor_threshold_ms: int = 100  # Retraso a partir del cual se registra un bloqueo
+    loop_monitor_sampling: bool = False  # Captura la pila del código que bloquea (pensado para staging)
+    
+    # Startup settings
+    startup_budget_ms: int = 1500  # Máximo tiempo de importación de app.main
     
     model_config = {
         "env_file": ".env",
@@ -35,10 +144,14 @@ class Settings(BaseSettings):
         "extra": "ignore"
     }
 
-# Create settings instance
-settings = Settings()
-
 # Environment-specific configurations
+@lru_cache()
 def get_settings() -> Settings:
-    """Get application settings"""
-    return settings
+    """Get application settings (built on first use, not at import time)"""
+    return Settings()
+
+def __getattr__(name: str):
+    """Keep `from app.config.settings import settings` working lazily"""
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,21 +1,26 @@
-from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 import asyncio
 from app.config.settings import get_settings
+from app.utils.audit import audit_log
+
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 
 class Database:
-    client: Optional[AsyncIOMotorClient] = None
-    database: Optional[AsyncIOMotorDatabase] = None
+    client: Optional["AsyncIOMotorClient"] = None
+    database: Optional["AsyncIOMotorDatabase"] = None
 
 # Global database instance
 db = Database()
 
-async def get_database() -> AsyncIOMotorDatabase:
+async def get_database() -> "AsyncIOMotorDatabase":
     """Get database instance"""
     return db.database
 
 async def connect_to_mongo():
     """Create database connection"""
+    # Motor is imported here so it loads during lifespan, not at import time
+    from motor.motor_asyncio import AsyncIOMotorClient
     settings = get_settings()
     
     try:
@@ -37,12 +42,15 @@ async def connect_to_mongo():
 
 async def close_mongo_connection():
     """Close database connection"""
+    # Los eventos de auditoría en cola se escriben antes de cerrar el cliente
+    await audit_log.stop()
     if db.client:
         db.client.close()
         print("🔌 Conexión a MongoDB cerrada")
 
 async def create_indexes():
     """Create database indexes for better performance"""
+    settings = get_settings()
     try:
         # User collection indexes
         await db.database.users.create_index("email", unique=True)
@@ -54,6 +62,66 @@ async def create_indexes():
         await db.database.expenses.create_index("category")
         await db.database.expenses.create_index([("user_id", 1), ("date", -1)])
         await db.database.expenses.create_index([("user_id", 1), ("category", 1)])
+        await db.database.expenses.create_index([("user_id", 1), ("seq", 1)])
+        await db.database.expenses.create_index([("user_id", 1), ("_id", -1)])
+        await db.database.expenses.create_index(
+            [("user_id", 1), ("idempotency_key", 1)],
+            unique=True,
+            partialFilterExpression={"idempotency_key": {"$exists": True}}
+        )
+        await db.database.expenses.create_index(
+            [("user_id", 1), ("title", "text"), ("description", "text")],
+            name="expense_search",
+            weights={"title": 3, "description": 1},
+            default_language=settings.search_language
+        )
+        
+        # Tombstones for delta sync, removed by the TTL index after the retention period
+        await db.database.expense_tombstones.create_index([("user_id", 1), ("seq", 1)])
+        await db.database.expense_tombstones.create_index(
+            "deleted_at",
+            expireAfterSeconds=settings.tombstone_retention_days * 24 * 3600
+        )
+        
+        # Cold tier: one compressed document per user and month ("<user_id>:<YYYY-MM>")
+        await db.database.expense_archives.create_index([("user_id", 1), ("start", -1)])
+        await db.database.expense_archives.create_index([("user_id", 1), ("ids", 1)])
+        await db.database.expense_archives.create_index([("user_id", 1), ("idempotency_keys", 1)])
+
+        # Bucketed layout (EXPENSE_STORAGE=buckets): one document per user and month
+        if settings.expense_storage == "buckets":
+            await db.database.expense_buckets.create_index([("user_id", 1), ("start", -1)])
+            await db.database.expense_buckets.create_index("entries._id")
+            await db.database.expense_buckets.create_index([("user_id", 1), ("entries.idempotency_key", 1)])
+            await db.database.expense_buckets.create_index([("user_id", 1), ("max_seq", 1)])
+        
+        # Recurring rules: the scheduler only reads due rules through (active, next_run_at)
+        await db.database.recurring_rules.create_index([("active", 1), ("next_run_at", 1)])
+        await db.database.recurring_rules.create_index("user_id")
+
+        # Budgets: one per category; usage docs are keyed by "<budget_id>:<YYYY-MM>"
+        await db.database.budgets.create_index([("user_id", 1), ("category", 1)], unique=True)
+        await db.database.budget_usage.create_index("budget_id")
+        
+        # Audit log, removed by the TTL index after the retention period
+        await db.database.audit_log.create_index([("action", 1), ("_id", -1)])
+        await db.database.audit_log.create_index([("user_id", 1), ("_id", -1)])
+        await db.database.audit_log.create_index(
+            "timestamp",
+            name="audit_ttl",
+            expireAfterSeconds=settings.audit_retention_days * 24 * 3600
+        )
+        
+        # Background jobs, readable from any worker and removed by the TTL index
+        await db.database.jobs.create_index("expires_at", expireAfterSeconds=0)
+        
+        # Shared rate limit buckets (RATE_LIMIT_BACKEND=mongo), removed once refilled
+        await db.database.rate_limits.create_index("expires_at", expireAfterSeconds=0)
+        
+        # Session collection indexes (refresh tokens expire through the TTL index)
+        await db.database.sessions.create_index("token_hash", unique=True)
+        await db.database.sessions.create_index("user_id")
+        await db.database.sessions.create_index("expires_at", expireAfterSeconds=0)
         
         print("📊 Índices de base de datos creados")
     except Exception as e:
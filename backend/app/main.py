@@ -1,23 +1,66 @@
 from fastapi import FastAPI, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-import uvicorn
 
 from app.database.mongodb import connect_to_mongo, close_mongo_connection
-from app.routes import auth, expenses
+from app.routes import auth, expenses, recurring, budgets, admin, dashboard, statements
 from app.routes.websocket import websocket_endpoint
 from app.config.settings import get_settings
+from app.services.recurring_service import RecurringService
+from app.services.archive_service import ArchiveService
+from app.services.insights_service import InsightsService
+from app.services.statement_service import shutdown_statement_pool
+from app.utils.audit import audit_log
+from app.utils.compression import CompressionMiddleware
+from app.utils.jobs import jobs
+from app.utils.loop_monitor import loop_monitor
+from app.utils.metrics import collect_metrics
+from app.utils.periodic import PeriodicTask
+from app.utils.rate_limit import RateLimitMiddleware
+from app.utils.startup import timed_phase
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan manager"""
     # Startup
     print("🚀 Iniciando servidor FastAPI...")
-    await connect_to_mongo()
+    with timed_phase("connect_to_mongo"):
+        await connect_to_mongo()
+    audit_log.start()
+    loop_monitor.start()
+    
+    # Background tasks (each runs only on the worker holding its leader lock)
+    periodic_tasks = []
+    if settings.recurring_scheduler_enabled:
+        periodic_tasks.append(PeriodicTask(
+            "recurring_scheduler",
+            settings.recurring_tick_seconds,
+            RecurringService().materialize_due
+        ))
+    if settings.archive_enabled:
+        periodic_tasks.append(PeriodicTask(
+            "expense_archiver",
+            settings.archive_tick_seconds,
+            ArchiveService().archive_due
+        ))
+    if settings.insights_enabled:
+        periodic_tasks.append(PeriodicTask(
+            "expense_insights",
+            settings.insights_tick_seconds,
+            InsightsService().refresh_due
+        ))
+    for task in periodic_tasks:
+        task.start()
     yield
     # Shutdown
     print("🛑 Cerrando servidor...")
-    await close_mongo_connection()
+    for task in periodic_tasks:
+        await task.stop()
+    await jobs.drain(settings.job_drain_seconds)
+    shutdown_statement_pool()
+    await loop_monitor.stop()
+    with timed_phase("close_mongo_connection"):
+        await close_mongo_connection()
 
 # Create FastAPI app
 settings = get_settings()
@@ -30,6 +73,12 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+# Compression (innermost: compresses the final body produced by the routes)
+app.add_middleware(CompressionMiddleware)
+
+# Rate limiting (added before CORS so 429 responses still carry CORS headers)
+app.add_middleware(RateLimitMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -37,11 +86,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include routers
 app.include_router(auth.router)
 app.include_router(expenses.router)
+app.include_router(recurring.router)
+app.include_router(budgets.router)
+app.include_router(admin.router)
+app.include_router(dashboard.router)
+app.include_router(statements.router)
 
 # WebSocket endpoint
 @app.websocket("/ws/expenses")
@@ -61,7 +116,10 @@ async def root():
         "websocket": "/ws/expenses",
         "endpoints": {
             "auth": "/auth",
-            "expenses": "/expenses"
+            "expenses": "/expenses",
+            "recurring": "/recurring",
+            "budgets": "/budgets",
+            "admin": "/api"
         }
     }
 
@@ -75,11 +133,34 @@ async def health_check():
         "version": settings.app_version
     }
 
+# Metrics endpoint (per worker)
+@app.get("/metrics")
+async def metrics():
+    """In-process counters of this worker"""
+    return collect_metrics()
+
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=settings.app_name)
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="Report import and lifespan timings per module and exit"
+    )
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        from app.utils.startup import print_startup_report
+        print_startup_report(app)
+        raise SystemExit(0)
+
+    import uvicorn
     uvicorn.run(
         "app.main:app",
         host=settings.host,
         port=settings.port,
         reload=settings.debug,
+        ws_per_message_deflate=settings.ws_per_message_deflate,
         log_level="info"
     )
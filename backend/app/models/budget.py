@@ -0,0 +1,22 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from datetime import datetime
+from bson import ObjectId
+from app.models.user import PyObjectId
+
+class Budget(BaseModel):
+    """Monthly per-category budget model for MongoDB"""
+    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+    user_id: PyObjectId
+    category: str = Field(..., min_length=1, max_length=50)
+    limit: float = Field(..., gt=0)
+    thresholds: List[float] = Field(default_factory=lambda: [0.8, 1.0])  # Fracciones del límite que generan alerta
+    currency: Optional[str] = None  # Moneda del límite y de lo gastado (None = DEFAULT_CURRENCY)
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    model_config = {
+        "populate_by_name": True,
+        "arbitrary_types_allowed": True,
+        "json_encoders": {ObjectId: str}
+    }
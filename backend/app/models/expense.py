@@ -3,6 +3,7 @@ from typing import Optional
 from datetime import datetime
 from bson import ObjectId
 from app.models.user import PyObjectId
+from app.config.settings import get_settings
 
 class Expense(BaseModel):
     """Expense model for MongoDB"""
@@ -10,6 +11,8 @@ class Expense(BaseModel):
     user_id: PyObjectId
     title: str = Field(..., min_length=1, max_length=100)
     amount: float = Field(..., gt=0)
+    # Los gastos guardados antes de la multimoneda no tienen moneda: están en DEFAULT_CURRENCY
+    currency: str = Field(default_factory=lambda: get_settings().default_currency)
     category: str = Field(..., min_length=1, max_length=50)
     description: Optional[str] = Field(None, max_length=500)
     date: datetime = Field(default_factory=datetime.utcnow)
@@ -25,6 +28,7 @@ class Expense(BaseModel):
             "example": {
                 "title": "Comida",
                 "amount": 25.50,
+                "currency": "COP",
                 "category": "Alimentación",
                 "description": "Almuerzo en restaurante",
                 "date": "2024-01-15T12:00:00Z",
@@ -0,0 +1,30 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+from bson import ObjectId
+from app.models.user import PyObjectId
+
+class RecurringRule(BaseModel):
+    """Recurring transaction rule model for MongoDB"""
+    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+    user_id: PyObjectId
+    title: str = Field(..., min_length=1, max_length=100)
+    amount: float = Field(..., gt=0)
+    currency: Optional[str] = None
+    category: str = Field(..., min_length=1, max_length=50)
+    description: Optional[str] = Field(None, max_length=500)
+    type: str = Field(default="expense", pattern="^(income|expense)$")
+    frequency: str = Field(..., pattern="^(daily|weekly|monthly|yearly)$")
+    interval: int = Field(default=1, ge=1)
+    anchor_day: int = Field(..., ge=1, le=31)  # Día del mes de la primera ocurrencia
+    next_run_at: datetime
+    end_date: Optional[datetime] = None
+    active: bool = True
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    
+    model_config = {
+        "populate_by_name": True,
+        "arbitrary_types_allowed": True,
+        "json_encoders": {ObjectId: str}
+    }
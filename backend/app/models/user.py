@@ -28,11 +28,13 @@ class User(BaseModel):
     full_name: Optional[str] = None
     hashed_password: str
     is_active: bool = True
+    role: str = Field(default="user", pattern="^(user|admin)$")
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
     # 👇 Agrega este campo
     income: float = Field(default=0.0, ge=0)
+    reporting_currency: Optional[str] = None  # Moneda de las estadísticas (None = DEFAULT_CURRENCY)
 
     model_config = {
         "populate_by_name": True,
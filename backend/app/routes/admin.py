@@ -0,0 +1,168 @@
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response
+from typing import List, Optional
+from bson import ObjectId
+from app.schemas.admin import (
+    AdminUserUpdate, AdminUserResponse, AdminTransactionResponse, PlatformStatsResponse
+)
+from app.schemas.audit import AuditEventResponse, AuditSummaryResponse
+from app.models.user import User
+from app.services.audit_service import AuditService
+from app.services.auth_service import AuthService
+from app.services.expense_service import ExpenseService
+from app.services.platform_stats_service import PlatformStatsService
+from app.utils.dependencies import get_current_admin_user
+from app.config.settings import get_settings
+
+router = APIRouter(
+    prefix="/api",
+    tags=["admin"],
+    dependencies=[Depends(get_current_admin_user)]
+)
+
+# Header with the cursor of the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def _check_cursor(cursor: Optional[str]):
+    if cursor and not ObjectId.is_valid(cursor):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def _user_response(user: User) -> AdminUserResponse:
+    return AdminUserResponse(
+        id=str(user.id),
+        username=user.username,
+        email=user.email,
+        full_name=user.full_name,
+        is_active=user.is_active,
+        role=user.role,
+        created_at=user.created_at
+    )
+
+@router.get("/users", response_model=List[AdminUserResponse])
+async def list_users(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor de la página anterior")
+):
+    """List users with keyset pagination"""
+    _check_cursor(cursor)
+    auth_service = AuthService()
+    users = await auth_service.list_users(limit=limit + 1, after=cursor)
+    if len(users) > limit:
+        users = users[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = str(users[-1].id)
+    return [_user_response(user) for user in users]
+
+@router.put("/users/{user_id}", response_model=AdminUserResponse)
+async def update_user(user_id: str, user_update: AdminUserUpdate):
+    """Update a user's profile, status or role"""
+    auth_service = AuthService()
+    user = await auth_service.update_user(user_id, user_update) if ObjectId.is_valid(user_id) else None
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    return _user_response(user)
+
+@router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def deactivate_user(user_id: str):
+    """Deactivate a user (expenses are kept)"""
+    auth_service = AuthService()
+    user = await auth_service.get_user_by_id(user_id) if ObjectId.is_valid(user_id) else None
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    await auth_service.deactivate_user(user_id)
+
+@router.get("/transactions", response_model=List[AdminTransactionResponse])
+async def list_transactions(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
+    user_id: Optional[str] = Query(None)
+):
+    """List transactions of every user, newest first, with keyset pagination"""
+    _check_cursor(cursor)
+    _check_cursor(user_id)
+    expense_service = ExpenseService()
+    expenses = await expense_service.list_all_expenses(limit=limit + 1, before=cursor, user_id=user_id)
+    if len(expenses) > limit:
+        expenses = expenses[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = str(expenses[-1].id)
+    return [
+        AdminTransactionResponse(
+            id=str(expense.id),
+            user_id=str(expense.user_id),
+            title=expense.title,
+            amount=expense.amount,
+            currency=expense.currency,
+            category=expense.category,
+            type=expense.type,
+            date=expense.date,
+            created_at=expense.created_at
+        )
+        for expense in expenses
+    ]
+
+@router.get("/stats", response_model=PlatformStatsResponse)
+async def get_platform_stats():
+    """Platform-wide totals, read from precomputed counters"""
+    return await PlatformStatsService().get_totals()
+
+@router.post("/stats/rebuild", response_model=PlatformStatsResponse)
+async def rebuild_platform_stats():
+    """Recompute the platform counters from the collections (full scan)"""
+    return await PlatformStatsService().rebuild()
+
+@router.get("/audit", response_model=AuditSummaryResponse)
+async def get_audit_summary():
+    """Audit summary for the admin dashboard"""
+    return await AuditService().get_summary()
+
+@router.get("/audit/events", response_model=List[AuditEventResponse])
+async def list_audit_events(
+    response: Response,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Valor de X-Next-Cursor de la página anterior"),
+    user_id: Optional[str] = Query(None),
+    action: Optional[str] = Query(None, description="Por ejemplo expense.create o auth.login_failed")
+):
+    """List audit events, newest first, with keyset pagination"""
+    _check_cursor(cursor)
+    _check_cursor(user_id)
+    events = await AuditService().list_events(limit=limit + 1, before=cursor, user_id=user_id, action=action)
+    if len(events) > limit:
+        events = events[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = str(events[-1]["_id"])
+    return [
+        AuditEventResponse(
+            id=str(event["_id"]),
+            action=event["action"],
+            user_id=str(event["user_id"]) if event.get("user_id") else None,
+            timestamp=event["timestamp"],
+            details=event.get("details", {})
+        )
+        for event in events
+    ]
+
+@router.get("/config")
+async def get_config():
+    """Non-secret runtime configuration"""
+    settings = get_settings()
+    return {
+        "app_name": settings.app_name,
+        "app_version": settings.app_version,
+        "access_token_expire_minutes": settings.access_token_expire_minutes,
+        "refresh_token_expire_days": settings.refresh_token_expire_days,
+        "password_schemes": settings.password_schemes,
+        "bcrypt_rounds": settings.bcrypt_rounds,
+        "tombstone_retention_days": settings.tombstone_retention_days,
+        "import_max_bytes": settings.import_max_bytes,
+        "recurring_scheduler_enabled": settings.recurring_scheduler_enabled,
+        "stats_cache_ttl_seconds": settings.stats_cache_ttl_seconds,
+    }
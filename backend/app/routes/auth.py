@@ -1,8 +1,10 @@
 from fastapi import APIRouter, HTTPException, status, Depends
 from datetime import timedelta
-from app.schemas.user import UserCreate, UserResponse, Token, UserLogin, UserUpdate
+from typing import Optional
+from app.schemas.user import UserCreate, UserResponse, Token, UserLogin, UserUpdate, RefreshTokenRequest
 from app.models.user import User
 from app.services.auth_service import AuthService
+from app.services.session_service import SessionService
 from app.utils.security import create_access_token
 from app.utils.dependencies import get_current_active_user
 from app.config.settings import get_settings
@@ -24,7 +26,8 @@ async def register(user_data: UserCreate):
             full_name=user.full_name,
             is_active=user.is_active,
             created_at=user.created_at,
-            income=user.income or 0.0
+            income=user.income or 0.0,
+            reporting_currency=user.reporting_currency
         )
     except ValueError as e:
         raise HTTPException(
@@ -51,9 +54,11 @@ async def login(login_data: UserLogin):
     access_token = create_access_token(
         data={"sub": user.email}, expires_delta=access_token_expires
     )
+    refresh_token = await SessionService().create_session(str(user.id))
     
     return {
         "access_token": access_token,
+        "refresh_token": refresh_token,
         "token_type": "bearer",
         "user": {
             "id": str(user.id),
@@ -67,6 +72,40 @@ async def login(login_data: UserLogin):
     }
 
 
+@router.post("/refresh", response_model=Token)
+async def refresh(refresh_data: RefreshTokenRequest):
+    """Exchange a refresh token for a new access token (the refresh token is rotated)"""
+    session_service = SessionService()
+    settings = get_settings()
+    
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid or expired refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    
+    rotated = await session_service.rotate_session(refresh_data.refresh_token)
+    if not rotated:
+        raise credentials_exception
+    user_id, refresh_token = rotated
+    
+    user = await AuthService().get_user_by_id(user_id)
+    if not user or not user.is_active:
+        await session_service.revoke_session(refresh_token)
+        raise credentials_exception
+    
+    access_token = create_access_token(
+        data={"sub": user.email},
+        expires_delta=timedelta(minutes=settings.access_token_expire_minutes)
+    )
+    
+    return Token(
+        access_token=access_token,
+        refresh_token=refresh_token,
+        token_type="bearer"
+    )
+
+
 @router.get("/me", response_model=UserResponse)
 async def read_users_me(current_user: User = Depends(get_current_active_user)):
     """Get current user information"""
@@ -77,7 +116,8 @@ async def read_users_me(current_user: User = Depends(get_current_active_user)):
         full_name=current_user.full_name,
         is_active=current_user.is_active,
         created_at=current_user.created_at,
-        income=getattr(current_user, "income", 0.0)
+        income=getattr(current_user, "income", 0.0),
+        reporting_currency=current_user.reporting_currency
     )
 
 
@@ -104,11 +144,14 @@ async def update_user_profile(
         full_name=updated_user.full_name,
         is_active=updated_user.is_active,
         created_at=updated_user.created_at,
-        income=getattr(updated_user, "income", 0.0)
+        income=getattr(updated_user, "income", 0.0),
+        reporting_currency=updated_user.reporting_currency
     )
 
 
 @router.post("/logout")
-async def logout():
-    """Logout user (client should remove token)"""
+async def logout(logout_data: Optional[RefreshTokenRequest] = None):
+    """Logout user, revoking the refresh token's session (client should remove tokens)"""
+    if logout_data:
+        await SessionService().revoke_session(logout_data.refresh_token)
     return {"message": "Successfully logged out"}
\ No newline at end of file
@@ -0,0 +1,56 @@
+from fastapi import APIRouter, HTTPException, status, Depends
+from typing import List
+from datetime import datetime
+from app.schemas.budget import BudgetCreate, BudgetResponse
+from app.models.user import User
+from app.services.budget_service import BudgetService, budget_currency
+from app.utils.dependencies import get_current_active_user
+from app.utils.dates import month_key
+
+router = APIRouter(prefix="/budgets", tags=["budgets"])
+
+def _budget_response(budget, spent: float) -> BudgetResponse:
+    return BudgetResponse(
+        id=str(budget.id),
+        category=budget.category,
+        limit=budget.limit,
+        thresholds=budget.thresholds,
+        currency=budget_currency(budget),
+        month=month_key(datetime.utcnow()),
+        spent=spent,
+        created_at=budget.created_at
+    )
+
+@router.get("/", response_model=List[BudgetResponse])
+async def get_budgets(current_user: User = Depends(get_current_active_user)):
+    """Get user's budgets with the current month's spend"""
+    budget_service = BudgetService()
+    budgets = await budget_service.get_user_budgets(str(current_user.id))
+    return [_budget_response(budget, spent) for budget, spent in budgets]
+
+@router.put("/", response_model=BudgetResponse)
+async def put_budget(
+    budget_data: BudgetCreate,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Create or replace the monthly budget of a category"""
+    budget_service = BudgetService()
+    budget, spent = await budget_service.upsert_budget(
+        str(current_user.id), budget_data, current_user.reporting_currency
+    )
+    return _budget_response(budget, spent)
+
+@router.delete("/{budget_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_budget(
+    budget_id: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Delete a budget"""
+    budget_service = BudgetService()
+    
+    success = await budget_service.delete_budget(budget_id, str(current_user.id))
+    if not success:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Budget not found"
+        )
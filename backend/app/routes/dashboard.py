@@ -0,0 +1,63 @@
+import asyncio
+from fastapi import APIRouter, Depends, Query
+from app.schemas.dashboard import DashboardResponse
+from app.schemas.expense import ExpenseResponse, ExpenseStats, CategoryStats
+from app.schemas.user import UserResponse
+from app.models.user import User
+from app.services.expense_service import ExpenseService
+from app.utils.dependencies import get_current_active_user, get_stats_currency
+
+router = APIRouter(prefix="/dashboard", tags=["dashboard"])
+
+# Ruta vacía: GET /dashboard sin la redirección a /dashboard/
+@router.get("", response_model=DashboardResponse)
+async def get_dashboard(
+    limit: int = Query(100, ge=1, le=1000, description="Number of expenses in the first page"),
+    current_user: User = Depends(get_current_active_user),
+    currency: str = Depends(get_stats_currency)
+):
+    """Profile, first expense page, summary and category breakdown in one response
+
+    The user is authenticated and loaded once; the four queries then run concurrently.
+    """
+    user_id = str(current_user.id)
+    expense_service = ExpenseService()
+
+    expenses, total, stats, categories = await asyncio.gather(
+        expense_service.get_user_expenses(user_id=user_id, skip=0, limit=limit),
+        expense_service.get_total_expenses_count(user_id),
+        expense_service.get_expense_stats(user_id=user_id, currency=currency),
+        expense_service.get_expenses_by_category(user_id=user_id, currency=currency)
+    )
+
+    return DashboardResponse(
+        user=UserResponse(
+            id=user_id,
+            username=current_user.username,
+            email=current_user.email,
+            full_name=current_user.full_name,
+            is_active=current_user.is_active,
+            created_at=current_user.created_at,
+            income=getattr(current_user, "income", 0.0),
+            reporting_currency=current_user.reporting_currency
+        ),
+        expenses=[
+            ExpenseResponse(
+                id=str(expense.id),
+                user_id=str(expense.user_id),
+                title=expense.title,
+                amount=abs(expense.amount),
+                currency=expense.currency,
+                category=expense.category,
+                description=expense.description,
+                date=expense.date,
+                type=expense.type,
+                created_at=expense.created_at,
+                updated_at=expense.updated_at
+            )
+            for expense in expenses
+        ],
+        total=total,
+        stats=ExpenseStats(**stats),
+        categories=[CategoryStats(**stat) for stat in categories]
+    )
@@ -1,13 +1,18 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Header, UploadFile, File
 from typing import List, Optional
 from datetime import datetime
+from pymongo.errors import ExecutionTimeout
 from app.schemas.expense import (
     ExpenseCreate, ExpenseUpdate, ExpenseResponse, 
-    ExpenseListResponse, ExpenseStats, CategoryStats
+    ExpenseListResponse, ExpenseStats, CategoryStats, ExpenseChangesResponse, ExpenseInsights
 )
+from app.schemas.job import JobResponse
 from app.models.user import User
 from app.services.expense_service import ExpenseService
-from app.utils.dependencies import get_current_active_user
+from app.services.import_service import ImportService
+from app.services.insights_service import InsightsService
+from app.utils.jobs import jobs
+from app.utils.dependencies import get_current_active_user, get_stats_currency
 
 router = APIRouter(prefix="/expenses", tags=["expenses"])
 
@@ -18,28 +23,45 @@ async def get_expenses(
     category: Optional[str] = Query(None, description="Filter by category"),
     start_date: Optional[datetime] = Query(None, description="Filter expenses from this date"),
     end_date: Optional[datetime] = Query(None, description="Filter expenses until this date"),
+    q: Optional[str] = Query(None, min_length=1, max_length=100, description="Search in title and description (ranked by relevance)"),
     current_user: User = Depends(get_current_active_user)
 ):
-    """Get user's expenses with optional filtering"""
+    """Get user's expenses with optional filtering and search"""
     expense_service = ExpenseService()
-    
-    expenses = await expense_service.get_user_expenses(
-        user_id=str(current_user.id),
-        skip=skip,
-        limit=limit,
-        category=category,
-        start_date=start_date,
-        end_date=end_date
-    )
-    
-    total = await expense_service.get_total_expenses_count(str(current_user.id))
-    
+
+    try:
+        expenses = await expense_service.get_user_expenses(
+            user_id=str(current_user.id),
+            skip=skip,
+            limit=limit,
+            category=category,
+            start_date=start_date,
+            end_date=end_date,
+            q=q
+        )
+
+        if q:
+            # Con búsqueda, total cuenta los resultados (con los mismos filtros)
+            total = await expense_service.count_user_expenses(
+                str(current_user.id), category=category, start_date=start_date, end_date=end_date, q=q
+            )
+        else:
+            total = await expense_service.get_total_expenses_count(str(current_user.id))
+    except ExecutionTimeout:
+        # La búsqueda superó SEARCH_MAX_TIME_MS
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Search took too long; use more specific terms or a narrower date range",
+            headers={"Retry-After": "1"}
+        )
+
     expense_responses = [
         ExpenseResponse(
             id=str(expense.id),
             user_id=str(expense.user_id),
             title=expense.title,
             amount=abs(expense.amount),  # ✅ Siempre positivo
+            currency=expense.currency,
             category=expense.category,
             description=expense.description,
             date=expense.date,
@@ -57,6 +79,88 @@ async def get_expenses(
         limit=limit
     )
 
+@router.get("/changes", response_model=ExpenseChangesResponse)
+async def get_expense_changes(
+    since: Optional[str] = Query(None, description="Sync token from the previous response"),
+    limit: int = Query(500, ge=1, le=1000, description="Maximum number of changes to return"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get expenses created, updated or deleted since a sync token"""
+    expense_service = ExpenseService()
+    
+    changes = await expense_service.get_changes(str(current_user.id), since, limit)
+    
+    changes["upserts"] = [
+        ExpenseResponse(
+            id=str(expense.id),
+            user_id=str(expense.user_id),
+            title=expense.title,
+            amount=abs(expense.amount),  # ✅ Siempre positivo
+            currency=expense.currency,
+            category=expense.category,
+            description=expense.description,
+            date=expense.date,
+            type=expense.type,
+            created_at=expense.created_at,
+            updated_at=expense.updated_at
+        )
+        for expense in changes["upserts"]
+    ]
+    
+    return ExpenseChangesResponse(**changes)
+
+@router.post("/import", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def import_expenses(
+    file: UploadFile = File(..., description="Bank statement (.csv, .ofx or .qfx)"),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Import a bank statement in the background"""
+    import_service = ImportService()
+    
+    extension = (file.filename or "").rsplit(".", 1)[-1].lower()
+    if extension not in ("csv", "ofx", "qfx"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unsupported file type, use CSV or OFX"
+        )
+    
+    try:
+        path = await import_service.save_upload(file)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    
+    job = await import_service.start_import(
+        str(current_user.id), path, "csv" if extension == "csv" else "ofx", current_user.reporting_currency
+    )
+    return JobResponse(**job.to_dict())
+
+@router.get("/import/{job_id}", response_model=JobResponse)
+async def get_import_status(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get the progress of an import job"""
+    job = await jobs.get(job_id, str(current_user.id))
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Import job not found"
+        )
+    return JobResponse(**job.to_dict())
+
+@router.get("/insights", response_model=ExpenseInsights)
+async def get_expense_insights(
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get the month-end forecast and unusual expenses (precomputed nightly)"""
+    insights_service = InsightsService()
+    
+    insights = await insights_service.get_user_insights(current_user)
+    return ExpenseInsights(**insights)
+
 @router.get("/{expense_id}", response_model=ExpenseResponse)
 async def get_expense(
     expense_id: str,
@@ -77,6 +181,7 @@ async def get_expense(
         user_id=str(expense.user_id),
         title=expense.title,
         amount=abs(expense.amount),  # ✅ Siempre positivo
+        currency=expense.currency,
         category=expense.category,
         description=expense.description,
         date=expense.date,
@@ -88,6 +193,12 @@ async def get_expense(
 @router.post("/", response_model=ExpenseResponse, status_code=status.HTTP_201_CREATED)
 async def create_expense(
     expense_data: ExpenseCreate,
+    idempotency_key: Optional[str] = Header(
+        None,
+        alias="Idempotency-Key",
+        max_length=255,
+        description="Retries with the same key return the original expense instead of creating another"
+    ),
     current_user: User = Depends(get_current_active_user)
 ):
     """Create a new expense"""
@@ -96,7 +207,10 @@ async def create_expense(
     # ✅ DEBUG: Imprimir lo que llega
     print(f"📥 Datos recibidos: {expense_data.dict()}")
     
-    expense = await expense_service.create_expense(str(current_user.id), expense_data)
+    expense = await expense_service.create_expense(
+        str(current_user.id), expense_data, idempotency_key=idempotency_key,
+        currency=current_user.reporting_currency
+    )
     
     # ✅ DEBUG: Imprimir lo que se guardó
     print(f"💾 Guardado en DB: amount={expense.amount}, type={expense.type}")
@@ -106,6 +220,7 @@ async def create_expense(
         user_id=str(expense.user_id),
         title=expense.title,
         amount=abs(expense.amount),  # ✅ Siempre positivo
+        currency=expense.currency,
         category=expense.category,
         description=expense.description,
         date=expense.date,
@@ -138,6 +253,7 @@ async def update_expense(
         user_id=str(expense.user_id),
         title=expense.title,
         amount=abs(expense.amount),  # ✅ Siempre positivo
+        currency=expense.currency,
         category=expense.category,
         description=expense.description,
         date=expense.date,
@@ -165,7 +281,8 @@ async def delete_expense(
 async def get_expense_summary(
     current_user: User = Depends(get_current_active_user),
     start_date: Optional[datetime] = Query(None, description="Start date for statistics"),
-    end_date: Optional[datetime] = Query(None, description="End date for statistics")
+    end_date: Optional[datetime] = Query(None, description="End date for statistics"),
+    currency: str = Depends(get_stats_currency)
 ):
     """Get expense summary statistics"""
     expense_service = ExpenseService()
@@ -173,7 +290,8 @@ async def get_expense_summary(
     stats = await expense_service.get_expense_stats(
         user_id=str(current_user.id),
         start_date=start_date,
-        end_date=end_date
+        end_date=end_date,
+        currency=currency
     )
     
     return ExpenseStats(**stats)
@@ -182,7 +300,8 @@ async def get_expense_summary(
 async def get_expenses_by_category(
     current_user: User = Depends(get_current_active_user),
     start_date: Optional[datetime] = Query(None, description="Start date for statistics"),
-    end_date: Optional[datetime] = Query(None, description="End date for statistics")
+    end_date: Optional[datetime] = Query(None, description="End date for statistics"),
+    currency: str = Depends(get_stats_currency)
 ):
     """Get expenses grouped by category"""
     expense_service = ExpenseService()
@@ -190,7 +309,8 @@ async def get_expenses_by_category(
     category_stats = await expense_service.get_expenses_by_category(
         user_id=str(current_user.id),
         start_date=start_date,
-        end_date=end_date
+        end_date=end_date,
+        currency=currency
     )
     
     return [CategoryStats(**stat) for stat in category_stats]
\ No newline at end of file
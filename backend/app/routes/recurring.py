@@ -0,0 +1,56 @@
+from fastapi import APIRouter, HTTPException, status, Depends
+from typing import List
+from app.schemas.recurring import RecurringRuleCreate, RecurringRuleResponse
+from app.models.user import User
+from app.services.recurring_service import RecurringService
+from app.utils.dependencies import get_current_active_user
+
+router = APIRouter(prefix="/recurring", tags=["recurring"])
+
+def _rule_response(rule) -> RecurringRuleResponse:
+    return RecurringRuleResponse(
+        id=str(rule.id),
+        title=rule.title,
+        amount=rule.amount,
+        category=rule.category,
+        description=rule.description,
+        type=rule.type,
+        frequency=rule.frequency,
+        interval=rule.interval,
+        next_run_at=rule.next_run_at,
+        end_date=rule.end_date,
+        active=rule.active,
+        created_at=rule.created_at
+    )
+
+@router.get("/", response_model=List[RecurringRuleResponse])
+async def get_recurring_rules(current_user: User = Depends(get_current_active_user)):
+    """Get user's recurring transaction rules"""
+    recurring_service = RecurringService()
+    rules = await recurring_service.get_user_rules(str(current_user.id))
+    return [_rule_response(rule) for rule in rules]
+
+@router.post("/", response_model=RecurringRuleResponse, status_code=status.HTTP_201_CREATED)
+async def create_recurring_rule(
+    rule_data: RecurringRuleCreate,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Create a recurring transaction rule (materialized by the scheduler)"""
+    recurring_service = RecurringService()
+    rule = await recurring_service.create_rule(str(current_user.id), rule_data, current_user.reporting_currency)
+    return _rule_response(rule)
+
+@router.delete("/{rule_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_recurring_rule(
+    rule_id: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Delete a recurring transaction rule"""
+    recurring_service = RecurringService()
+    
+    success = await recurring_service.delete_rule(rule_id, str(current_user.id))
+    if not success:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Recurring rule not found"
+        )
@@ -0,0 +1,66 @@
+import os
+from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.responses import FileResponse
+from app.schemas.job import JobResponse
+from app.schemas.statement import StatementCreate
+from app.models.user import User
+from app.services.statement_service import StatementService
+from app.config.settings import get_settings
+from app.utils.dependencies import get_current_active_user
+from app.utils.jobs import jobs
+from app.utils.statement_render import MEDIA_TYPES
+
+router = APIRouter(prefix="/statements", tags=["statements"])
+
+async def _statement_job(job_id: str, current_user: User):
+    job = await jobs.get(job_id, str(current_user.id))
+    if not job or job.kind != "statement":
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Statement job not found"
+        )
+    return job
+
+@router.post("/", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_statement(
+    statement_data: StatementCreate,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Generate a monthly statement in the background (served from cache when unchanged)"""
+    statement_service = StatementService()
+    currency = statement_data.currency or current_user.reporting_currency or get_settings().default_currency
+    job = await statement_service.start_statement(current_user, statement_data.month, statement_data.format, currency)
+    return JobResponse(**job.to_dict())
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_statement_status(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get the progress of a statement job"""
+    job = await _statement_job(job_id, current_user)
+    return JobResponse(**job.to_dict())
+
+@router.get("/{job_id}/download")
+async def download_statement(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Download a finished statement"""
+    job = await _statement_job(job_id, current_user)
+    if job.status != "completed":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Statement is {job.status}"
+        )
+    if not os.path.exists(job.result["path"]):
+        # Una versión más nueva del mismo mes la reemplazó
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Statement expired, request it again"
+        )
+    return FileResponse(
+        job.result["path"],
+        media_type=MEDIA_TYPES[job.result["format"]],
+        filename=f"estado-{job.result['month']}.{job.result['format']}"
+    )
@@ -1,46 +1,161 @@
 from fastapi import WebSocket, WebSocketDisconnect, Depends, HTTPException, status
-from typing import List, Dict
+from typing import List, Dict, Optional, Set
 import json
 import asyncio
+import random
+import time
 from app.utils.security import get_user_email_from_token
 from app.services.auth_service import AuthService
 from app.services.expense_service import ExpenseService
 from app.schemas.expense import WebSocketMessage
+from app.models.user import User
+from app.config.settings import get_settings
+from app.utils.metrics import register_metrics
+
+class _Client:
+    """An accepted WebSocket with its outgoing queue"""
+
+    def __init__(self, websocket: WebSocket, user_id: str):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self.buffered_bytes = 0
+        self.last_seen = time.monotonic()
+        self.writer: Optional[asyncio.Task] = None
+
 
 class ConnectionManager:
-    """Manages WebSocket connections"""
+    """Manages WebSocket connections
+
+    Messages are queued per connection and written by one task per connection, so a
+    slow or dead client never blocks the others. A sweeper sends heartbeats and closes
+    connections that stopped talking, that stopped reading, or that queue too much.
+    """
     
     def __init__(self):
+        settings = get_settings()
         # Dictionary to store active connections by user_id
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+        self.active_connections: Dict[str, List[_Client]] = {}
+        self.heartbeat_seconds = settings.ws_heartbeat_seconds
+        self.idle_timeout_seconds = settings.ws_idle_timeout_seconds
+        self.send_timeout_seconds = settings.ws_send_timeout_seconds
+        self.max_buffered_bytes = settings.ws_max_buffered_bytes
+        self.max_per_user = settings.ws_max_connections_per_user
+        self.max_connections = settings.ws_max_connections
+        self.connections = 0
+        self.rejected = 0
+        self.evicted: Dict[str, int] = {"idle": 0, "send_timeout": 0, "send_error": 0, "slow": 0, "replaced": 0}
+        self._sweeper: Optional[asyncio.Task] = None
+        self._closing: Set[asyncio.Task] = set()
+        register_metrics("websocket", self.stats)
 
-    async def connect(self, websocket: WebSocket, user_id: str):
-        """Connect a user to WebSocket"""
+    async def connect(self, websocket: WebSocket, user_id: str) -> Optional[_Client]:
+        """Connect a user to WebSocket (None if this worker is at capacity)"""
         await websocket.accept()
-        if user_id not in self.active_connections:
-            self.active_connections[user_id] = []
-        self.active_connections[user_id].append(websocket)
+        if self.connections >= self.max_connections:
+            self.rejected += 1
+            # 1013 (Try Again Later): otro worker o un reintento posterior pueden aceptarla
+            await websocket.close(code=1013, reason="Server at capacity")
+            return None
+
+        user_clients = self.active_connections.setdefault(user_id, [])
+        while len(user_clients) >= self.max_per_user:
+            # La más antigua suele ser una conexión móvil que ya no existe
+            self._evict(user_clients[0], "replaced", 1008, "Too many connections")
+
+        client = _Client(websocket, user_id)
+        client.writer = asyncio.create_task(self._write_loop(client))
+        self.active_connections.setdefault(user_id, []).append(client)
+        self.connections += 1
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep_loop())
         print(f"🔌 Usuario {user_id} conectado via WebSocket")
+        return client
+
+    def _remove(self, client: _Client) -> bool:
+        user_clients = self.active_connections.get(client.user_id, [])
+        # Por identidad: WebSocket es un Mapping y == compara el scope
+        for index, other in enumerate(user_clients):
+            if other is client:
+                del user_clients[index]
+                break
+        else:
+            return False
+        if not user_clients:
+            del self.active_connections[client.user_id]
+        self.connections -= 1
+        if client.writer is not None:
+            client.writer.cancel()
+        return True
 
     def disconnect(self, websocket: WebSocket, user_id: str):
         """Disconnect a user from WebSocket"""
-        if user_id in self.active_connections:
-            if websocket in self.active_connections[user_id]:
-                self.active_connections[user_id].remove(websocket)
-            if not self.active_connections[user_id]:
-                del self.active_connections[user_id]
+        for client in list(self.active_connections.get(user_id, [])):
+            if client.websocket is websocket:
+                self._remove(client)
         print(f"🔌 Usuario {user_id} desconectado via WebSocket")
 
+    def _evict(self, client: _Client, reason: str, code: int, message: str):
+        """Drop a connection from the manager and close it in the background"""
+        if not self._remove(client):
+            return
+        self.evicted[reason] += 1
+        print(f"🔌 Conexión WebSocket de {client.user_id} cerrada ({reason})")
+        task = asyncio.create_task(self._close(client.websocket, code, message))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close(self, websocket: WebSocket, code: int, reason: str):
+        try:
+            # Un par medio abierto no completa el cierre: no se espera indefinidamente
+            await asyncio.wait_for(websocket.close(code=code, reason=reason), self.send_timeout_seconds)
+        except Exception:
+            pass
+
+    def _enqueue(self, client: _Client, message: str):
+        size = len(message)
+        if client.buffered_bytes + size > self.max_buffered_bytes:
+            self._evict(client, "slow", 1008, "Slow consumer")
+            return
+        client.buffered_bytes += size
+        client.queue.put_nowait(message)
+
+    async def _write_loop(self, client: _Client):
+        while True:
+            message = await client.queue.get()
+            try:
+                await asyncio.wait_for(client.websocket.send_text(message), self.send_timeout_seconds)
+            except asyncio.TimeoutError:
+                self._evict(client, "send_timeout", 1001, "Send timeout")
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self._evict(client, "send_error", 1011, "Send failed")
+                return
+            finally:
+                client.buffered_bytes -= len(message)
+
+    async def _sweep_loop(self):
+        while self.connections:
+            await asyncio.sleep(self.heartbeat_seconds)
+            self.sweep()
+
+    def sweep(self):
+        """Close idle connections and send a heartbeat to the rest"""
+        now = time.monotonic()
+        heartbeat = json.dumps({"type": "heartbeat", "payload": {"timestamp": int(time.time())}})
+        for user_clients in list(self.active_connections.values()):
+            for client in list(user_clients):
+                if self.idle_timeout_seconds and now - client.last_seen > self.idle_timeout_seconds:
+                    self._evict(client, "idle", 1001, "Idle timeout")
+                else:
+                    self._enqueue(client, heartbeat)
+
     async def send_personal_message(self, message: str, user_id: str):
         """Send message to specific user"""
-        if user_id in self.active_connections:
-            for connection in self.active_connections[user_id]:
-                try:
-                    await connection.send_text(message)
-                except:
-                    # Remove broken connections
-                    if connection in self.active_connections[user_id]:
-                        self.active_connections[user_id].remove(connection)
+        for client in list(self.active_connections.get(user_id, [])):
+            self._enqueue(client, message)
 
     async def broadcast_to_user(self, user_id: str, message_type: str, data: dict):
         """Broadcast message to specific user"""
@@ -50,18 +165,53 @@ class ConnectionManager:
         })
         await self.send_personal_message(message, user_id)
 
+    async def drain(self, jitter_seconds: float) -> int:
+        """Close every connection with 1012 (service restart) and a random reconnect delay
+
+        Each client is told to wait a different time within `jitter_seconds` before
+        reconnecting, so a restart does not bring every client back at once.
+        """
+        async def close(client: _Client):
+            delay_ms = int(random.uniform(0, jitter_seconds) * 1000)
+            try:
+                await asyncio.wait_for(client.websocket.send_text(json.dumps({
+                    "type": "server_restart",
+                    "payload": {"reconnect_after_ms": delay_ms}
+                })), self.send_timeout_seconds)
+            except Exception:
+                pass
+            await self._close(client.websocket, 1012, f"reconnect_after_ms={delay_ms}")
+
+        clients = [client for user_clients in self.active_connections.values() for client in user_clients]
+        for client in clients:
+            self._remove(client)
+        await asyncio.gather(*(close(client) for client in clients))
+        return len(clients)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "connections": self.connections,
+            "users": len(self.active_connections),
+            "bytes_buffered": sum(
+                client.buffered_bytes for user_clients in self.active_connections.values() for client in user_clients
+            ),
+            "max_connections": self.max_connections,
+            "rejected": self.rejected,
+            "evicted": dict(self.evicted),
+        }
+
 # Global connection manager
 manager = ConnectionManager()
 
-async def get_user_from_token(token: str) -> str:
-    """Extract user ID from JWT token"""
+async def get_user_from_token(token: str) -> User:
+    """Extract the user from a JWT token"""
     try:
         email = get_user_email_from_token(token)
         auth_service = AuthService()
         user = await auth_service.get_user_by_email(email)
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
-        return str(user.id)
+        return user
     except Exception as e:
         raise HTTPException(status_code=401, detail="Invalid token")
 
@@ -72,8 +222,11 @@ async def websocket_endpoint(websocket: WebSocket, token: str = None):
         return
     
     try:
-        user_id = await get_user_from_token(token)
-        await manager.connect(websocket, user_id)
+        user = await get_user_from_token(token)
+        user_id = str(user.id)
+        client = await manager.connect(websocket, user_id)
+        if client is None:
+            return
         
         # Send welcome message
         await manager.broadcast_to_user(user_id, "connection", {
@@ -85,6 +238,8 @@ async def websocket_endpoint(websocket: WebSocket, token: str = None):
             # Keep connection alive and handle incoming messages
             try:
                 data = await websocket.receive_text()
+                # Cualquier mensaje (incluida la respuesta "pong" al heartbeat) cuenta como actividad
+                client.last_seen = time.monotonic()
                 message_data = json.loads(data)
                 
                 # Handle different message types
@@ -95,7 +250,9 @@ async def websocket_endpoint(websocket: WebSocket, token: str = None):
                 elif message_data.get("type") == "get_stats":
                     # Send current expense statistics
                     expense_service = ExpenseService()
-                    stats = await expense_service.get_expense_stats(user_id)
+                    stats = await expense_service.get_expense_stats(
+                        user_id, currency=user.reporting_currency or get_settings().default_currency
+                    )
                     await manager.broadcast_to_user(user_id, "stats", stats)
                     
             except WebSocketDisconnect:
@@ -0,0 +1,90 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+from app.schemas.user import UserUpdate
+
+class AdminUserUpdate(UserUpdate):
+    """Schema for user update by an administrator"""
+    role: Optional[str] = Field(None, pattern="^(user|admin)$")
+    
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "is_active": False,
+                "role": "user"
+            }
+        }
+    }
+
+class AdminUserResponse(BaseModel):
+    """Schema for user response in the admin API"""
+    id: str
+    username: str
+    email: str
+    full_name: Optional[str] = None
+    is_active: bool
+    role: str
+    created_at: datetime
+    
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "id": "507f1f77bcf86cd799439011",
+                "username": "john",
+                "email": "john@example.com",
+                "full_name": "John Doe",
+                "is_active": True,
+                "role": "user",
+                "created_at": "2024-01-15T10:30:00Z"
+            }
+        }
+    }
+
+class AdminTransactionResponse(BaseModel):
+    """Schema for transaction response in the admin API"""
+    id: str
+    user_id: str
+    title: str
+    amount: float
+    currency: str
+    category: str
+    type: str
+    date: datetime
+    created_at: datetime
+    
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "id": "507f1f77bcf86cd799439012",
+                "user_id": "507f1f77bcf86cd799439011",
+                "title": "Comida",
+                "amount": 25.50,
+                "category": "Alimentación",
+                "type": "expense",
+                "date": "2024-01-15T12:00:00Z",
+                "created_at": "2024-01-15T12:00:00Z"
+            }
+        }
+    }
+
+class PlatformStatsResponse(BaseModel):
+    """Schema for platform-wide totals"""
+    users: int
+    expenses: int
+    incomes: int
+    expense_total: float
+    income_total: float
+    updated_at: Optional[datetime] = None
+    
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "users": 1250,
+                "expenses": 48210,
+                "incomes": 6120,
+                "expense_total": 912345000.0,
+                "income_total": 1523000000.0,
+                "updated_at": "2024-01-15T12:00:00Z"
+            }
+        }
+    }
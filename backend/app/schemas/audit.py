@@ -0,0 +1,37 @@
+from pydantic import BaseModel
+from typing import Optional, Dict, Any
+from datetime import datetime
+
+class AuditEventResponse(BaseModel):
+    """Schema for audit event response"""
+    id: str
+    action: str
+    user_id: Optional[str] = None
+    timestamp: datetime
+    details: Dict[str, Any] = {}
+    
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "id": "507f1f77bcf86cd799439013",
+                "action": "expense.update",
+                "user_id": "507f1f77bcf86cd799439011",
+                "timestamp": "2024-01-15T12:00:00Z",
+                "details": {"expense_id": "507f1f77bcf86cd799439012", "fields": ["amount"]}
+            }
+        }
+    }
+
+class AuditSummaryResponse(BaseModel):
+    """Schema for the admin dashboard audit summary"""
+    lastLogin: Optional[datetime] = None
+    failedAttempts: int
+    
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "lastLogin": "2024-01-15T12:00:00Z",
+                "failedAttempts": 3
+            }
+        }
+    }
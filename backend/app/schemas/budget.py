@@ -0,0 +1,52 @@
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Optional
+from datetime import datetime
+from app.utils.fx import validate_currency
+
+class BudgetCreate(BaseModel):
+    """Schema for budget creation or replacement"""
+    category: str = Field(..., min_length=1, max_length=50)
+    limit: float = Field(..., gt=0)
+    thresholds: List[float] = Field(default_factory=lambda: [0.8, 1.0], min_length=1, max_length=5)
+    currency: Optional[str] = Field(None, description="Moneda del límite (por defecto, la moneda del usuario)")
+
+    @field_validator("currency")
+    @classmethod
+    def check_currency(cls, value: Optional[str]) -> Optional[str]:
+        return validate_currency(value)
+    
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "category": "Alimentación",
+                "limit": 800000,
+                "thresholds": [0.8, 1.0]
+            }
+        }
+    }
+
+class BudgetResponse(BaseModel):
+    """Schema for budget response"""
+    id: str
+    category: str
+    limit: float
+    thresholds: List[float]
+    currency: str
+    month: str
+    spent: float
+    created_at: datetime
+    
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "id": "507f1f77bcf86cd799439011",
+                "category": "Alimentación",
+                "limit": 800000,
+                "thresholds": [0.8, 1.0],
+                "currency": "COP",
+                "month": "2024-01",
+                "spent": 650000,
+                "created_at": "2024-01-15T10:30:00Z"
+            }
+        }
+    }
@@ -0,0 +1,39 @@
+from pydantic import BaseModel
+from typing import List
+from app.schemas.expense import ExpenseResponse, ExpenseStats, CategoryStats
+from app.schemas.user import UserResponse
+
+class DashboardResponse(BaseModel):
+    """Schema for the dashboard bootstrap: everything the first render needs"""
+    user: UserResponse
+    expenses: List[ExpenseResponse]
+    total: int
+    stats: ExpenseStats
+    categories: List[CategoryStats]
+    
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "user": {
+                    "id": "507f1f77bcf86cd799439012",
+                    "username": "johndoe",
+                    "email": "john@example.com",
+                    "full_name": "John Doe",
+                    "is_active": True,
+                    "created_at": "2024-01-01T00:00:00Z",
+                    "income": 2500000,
+                    "reporting_currency": "COP"
+                },
+                "expenses": [],
+                "total": 0,
+                "stats": {
+                    "income_total": 0.0,
+                    "expense_total": 0.0,
+                    "balance": 0.0,
+                    "currency": "COP",
+                    "fx_version": "2024-06-01"
+                },
+                "categories": []
+            }
+        }
+    }
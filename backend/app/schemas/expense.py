@@ -1,11 +1,13 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List
 from datetime import datetime
+from app.utils.fx import validate_currency
 
 class ExpenseBase(BaseModel):
     """Base expense schema"""
     title: str = Field(..., min_length=1, max_length=100)
     amount: float = Field(..., gt=0)
+    currency: Optional[str] = Field(None, description="Código ISO 4217; por defecto, la moneda de reporte del usuario")
     category: str = Field(..., min_length=1, max_length=50)
     description: Optional[str] = Field(None, max_length=500)
     date: datetime = Field(default_factory=datetime.utcnow)
@@ -14,12 +16,18 @@ class ExpenseBase(BaseModel):
 
 class ExpenseCreate(ExpenseBase):
     """Schema for expense creation"""
+
+    @field_validator("currency")
+    @classmethod
+    def check_currency(cls, value: Optional[str]) -> Optional[str]:
+        return validate_currency(value)
     
     model_config = {
         "json_schema_extra": {
             "example": {
                 "title": "Comida",
                 "amount": 25.50,
+                "currency": "COP",
                 "category": "Alimentación",
                 "description": "Almuerzo en restaurante",
                 "date": "2024-01-15T12:00:00Z",
@@ -32,10 +40,16 @@ class ExpenseUpdate(BaseModel):
     """Schema for expense update"""
     title: Optional[str] = Field(None, min_length=1, max_length=100)
     amount: Optional[float] = Field(None, gt=0)
+    currency: Optional[str] = None
     category: Optional[str] = Field(None, min_length=1, max_length=50)
     description: Optional[str] = Field(None, max_length=500)
     date: Optional[datetime] = None
     type: Optional[str] = Field(None, pattern="^(income|expense)$")
+
+    @field_validator("currency")
+    @classmethod
+    def check_currency(cls, value: Optional[str]) -> Optional[str]:
+        return validate_currency(value)
     
     model_config = {
         "json_schema_extra": {
@@ -64,6 +78,7 @@ class ExpenseResponse(ExpenseBase):
                 "user_id": "507f1f77bcf86cd799439012",
                 "title": "Comida",
                 "amount": 25.50,
+                "currency": "COP",
                 "category": "Alimentación",
                 "description": "Almuerzo en restaurante",
                 "date": "2024-01-15T12:00:00Z",
@@ -92,22 +107,42 @@ class ExpenseListResponse(BaseModel):
         }
     }
 
+class ExpenseChangesResponse(BaseModel):
+    """Schema for delta sync response"""
+    upserts: List[ExpenseResponse]
+    deleted: List[str]
+    next_token: str
+    has_more: bool
+    reset: bool
+    
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "upserts": [],
+                "deleted": ["507f1f77bcf86cd799439011"],
+                "next_token": "NDI6MTcwNTMxNDIwMA",
+                "has_more": False,
+                "reset": False
+            }
+        }
+    }
+
 class ExpenseStats(BaseModel):
-    """Schema for expense statistics"""
-    total_amount: float
-    count: int
-    avg_amount: float
-    max_amount: float
-    min_amount: float
+    """Schema for expense statistics, converted to one currency"""
+    income_total: float
+    expense_total: float
+    balance: float
+    currency: str
+    fx_version: str
     
     model_config = {
         "json_schema_extra": {
             "example": {
-                "total_amount": 1500.75,
-                "count": 25,
-                "avg_amount": 60.03,
-                "max_amount": 500.00,
-                "min_amount": 5.50
+                "income_total": 2500000.0,
+                "expense_total": 1500750.0,
+                "balance": 999250.0,
+                "currency": "COP",
+                "fx_version": "2024-06-01"
             }
         }
     }
@@ -128,6 +163,60 @@ class CategoryStats(BaseModel):
         }
     }
 
+class CategoryForecast(BaseModel):
+    """Schema for the month-end forecast of a category"""
+    category: str
+    spent: float
+    projected: float
+
+class ExpenseAnomaly(BaseModel):
+    """Schema for an unusually large expense of the current month"""
+    expense_id: str
+    title: Optional[str] = None
+    category: str
+    amount: float
+    typical_amount: float
+    score: float
+    date: datetime
+
+class ExpenseInsights(BaseModel):
+    """Schema for the spending forecast and anomalies of the current month"""
+    month: str
+    currency: str
+    fx_version: str
+    spent_to_date: float
+    projected_total: float
+    categories: List[CategoryForecast]
+    anomalies: List[ExpenseAnomaly]
+    generated_at: datetime
+    
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "month": "2024-06",
+                "currency": "COP",
+                "fx_version": "2024-06-01",
+                "spent_to_date": 820000.0,
+                "projected_total": 1710000.0,
+                "categories": [
+                    {"category": "Alimentación", "spent": 410000.0, "projected": 860000.0}
+                ],
+                "anomalies": [
+                    {
+                        "expense_id": "507f1f77bcf86cd799439011",
+                        "title": "Cena aniversario",
+                        "category": "Alimentación",
+                        "amount": 380000.0,
+                        "typical_amount": 35000.0,
+                        "score": 9.8,
+                        "date": "2024-06-14T20:30:00"
+                    }
+                ],
+                "generated_at": "2024-06-15T03:00:12"
+            }
+        }
+    }
+
 class WebSocketMessage(BaseModel):
     """Schema for WebSocket messages"""
     type: str
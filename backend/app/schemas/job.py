@@ -0,0 +1,27 @@
+from pydantic import BaseModel
+from typing import Optional, List, Dict
+from datetime import datetime
+
+class JobResponse(BaseModel):
+    """Schema for background job status"""
+    id: str
+    kind: str
+    status: str
+    progress: Dict[str, int]
+    errors: List[str]
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "id": "3f2c1e0a9b8d4c7e8f6a5b4c3d2e1f0a",
+                "kind": "import",
+                "status": "running",
+                "progress": {"processed": 4000, "inserted": 3990, "skipped": 8, "failed": 2},
+                "errors": ["Fila 17: amount: Input should be greater than 0"],
+                "created_at": "2024-01-15T10:30:00Z",
+                "finished_at": None
+            }
+        }
+    }
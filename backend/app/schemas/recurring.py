@@ -0,0 +1,64 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+
+class RecurringRuleCreate(BaseModel):
+    """Schema for recurring rule creation"""
+    title: str = Field(..., min_length=1, max_length=100)
+    amount: float = Field(..., gt=0)
+    category: str = Field(..., min_length=1, max_length=50)
+    description: Optional[str] = Field(None, max_length=500)
+    type: str = Field(default="expense", pattern="^(income|expense)$")
+    frequency: str = Field(..., pattern="^(daily|weekly|monthly|yearly)$")
+    interval: int = Field(default=1, ge=1, le=365)
+    start_date: datetime = Field(default_factory=datetime.utcnow)
+    end_date: Optional[datetime] = None
+    
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "title": "Salario",
+                "amount": 2500000,
+                "category": "Salario",
+                "type": "income",
+                "frequency": "monthly",
+                "interval": 1,
+                "start_date": "2024-01-30T08:00:00Z"
+            }
+        }
+    }
+
+class RecurringRuleResponse(BaseModel):
+    """Schema for recurring rule response"""
+    id: str
+    title: str
+    amount: float
+    category: str
+    description: Optional[str] = None
+    type: str
+    frequency: str
+    interval: int
+    next_run_at: datetime
+    end_date: Optional[datetime] = None
+    active: bool
+    created_at: datetime
+    
+    model_config = {
+        "from_attributes": True,
+        "json_schema_extra": {
+            "example": {
+                "id": "507f1f77bcf86cd799439011",
+                "title": "Salario",
+                "amount": 2500000,
+                "category": "Salario",
+                "description": None,
+                "type": "income",
+                "frequency": "monthly",
+                "interval": 1,
+                "next_run_at": "2024-02-29T08:00:00Z",
+                "end_date": None,
+                "active": True,
+                "created_at": "2024-01-15T10:30:00Z"
+            }
+        }
+    }
@@ -0,0 +1,24 @@
+from pydantic import BaseModel, Field, field_validator
+from typing import Optional
+from app.utils.fx import validate_currency
+
+class StatementCreate(BaseModel):
+    """Schema for a monthly statement request"""
+    month: str = Field(..., pattern=r"^\d{4}-(0[1-9]|1[0-2])$", description="Mes del estado de cuenta (AAAA-MM)")
+    format: str = Field("pdf", pattern="^(csv|html|pdf)$")
+    currency: Optional[str] = Field(None, description="Moneda de los totales (por defecto, la del usuario)")
+
+    @field_validator("currency")
+    @classmethod
+    def check_currency(cls, value: Optional[str]) -> Optional[str]:
+        return validate_currency(value)
+    
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "month": "2024-01",
+                "format": "pdf",
+                "currency": "COP"
+            }
+        }
+    }
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, EmailStr, Field, field_validator
 from typing import Optional
 from datetime import datetime
+from app.utils.fx import validate_currency
 
 class UserBase(BaseModel):
     """Base user schema"""
@@ -12,6 +13,12 @@ class UserCreate(UserBase):
     """Schema for user creation"""
     password: str = Field(..., min_length=6, max_length=72)
     income: Optional[float] = Field(default=0.0, ge=0)
+    reporting_currency: Optional[str] = Field(None, description="Moneda de las estadísticas (código ISO 4217)")
+
+    @field_validator("reporting_currency")
+    @classmethod
+    def check_currency(cls, value: Optional[str]) -> Optional[str]:
+        return validate_currency(value)
     
     model_config = {
         "json_schema_extra": {
@@ -44,6 +51,7 @@ class UserResponse(UserBase):
     is_active: bool
     created_at: datetime
     income: Optional[float] = 0.0
+    reporting_currency: Optional[str] = None
     
     model_config = {
         "from_attributes": True,
@@ -66,6 +74,12 @@ class UserUpdate(BaseModel):
     full_name: Optional[str] = None
     is_active: Optional[bool] = None
     income: Optional[float] = Field(None, ge=0)
+    reporting_currency: Optional[str] = Field(None, description="Moneda de las estadísticas (código ISO 4217)")
+
+    @field_validator("reporting_currency")
+    @classmethod
+    def check_currency(cls, value: Optional[str]) -> Optional[str]:
+        return validate_currency(value)
     
     model_config = {
         "json_schema_extra": {
@@ -73,7 +87,8 @@ class UserUpdate(BaseModel):
                 "username": "johndoe_updated",
                 "full_name": "John Doe Updated",
                 "is_active": True,
-                "income": 3000000
+                "income": 3000000,
+                "reporting_currency": "COP"
             }
         }
     }
@@ -82,8 +97,21 @@ class Token(BaseModel):
     """Schema for authentication token"""
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
     user: Optional[dict] = None
 
+class RefreshTokenRequest(BaseModel):
+    """Schema for refresh token exchange and logout"""
+    refresh_token: str
+    
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "refresh_token": "Jf3x...q8w"
+            }
+        }
+    }
+
 class TokenData(BaseModel):
     """Schema for token data"""
     email: Optional[str] = None
\ No newline at end of file
@@ -0,0 +1,147 @@
+import os
+import random
+import signal
+import sys
+import threading
+import time
+from multiprocessing.context import SpawnProcess
+from typing import List, Optional
+
+import uvicorn
+from uvicorn._subprocess import get_subprocess
+
+from app.config.settings import get_settings
+
+# A worker that dies sooner than this after starting is respawned with a delay
+MIN_WORKER_UPTIME_SECONDS = 5.0
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn server that closes WebSocket clients with a jittered reconnect hint on shutdown
+
+    By default uvicorn drops every WebSocket with 1012 at once and all clients reconnect
+    together. Here listening stops first, each client gets its own reconnect delay, and
+    only then uvicorn waits for in-flight HTTP requests as usual.
+    """
+
+    async def shutdown(self, sockets=None) -> None:
+        # Dejar de aceptar conexiones antes de cerrar los WebSockets
+        for server in self.servers:
+            server.close()
+        for sock in sockets or []:
+            sock.close()
+
+        from app.routes.websocket import manager
+        closed = await manager.drain(get_settings().ws_drain_jitter_seconds)
+        if closed:
+            print(f"🔌 {closed} conexiones WebSocket cerradas con aviso de reconexión (pid {os.getpid()})")
+        await super().shutdown()
+
+
+def worker_config(max_requests: int) -> uvicorn.Config:
+    settings = get_settings()
+    return uvicorn.Config(
+        "app.main:app",
+        host=settings.host,
+        port=settings.port,
+        # "auto" usa uvloop y httptools cuando están instalados
+        loop="auto",
+        http="auto",
+        ws_per_message_deflate=settings.ws_per_message_deflate,
+        limit_max_requests=max_requests or None,
+        timeout_graceful_shutdown=settings.graceful_timeout_seconds,
+        log_level="info"
+    )
+
+
+class WorkerSupervisor:
+    """Runs N uvicorn worker processes on one shared socket and replaces those that exit
+
+    Workers exit on their own after `max_requests` requests (plus a random jitter, so they
+    do not all recycle at once); the supervisor starts a fresh one in their place. On
+    SIGTERM or SIGINT every worker is asked to shut down gracefully.
+    """
+
+    def __init__(self, workers: int, max_requests: int, max_requests_jitter: int):
+        self.workers = workers
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.should_exit = threading.Event()
+        self.processes: List[Optional[SpawnProcess]] = [None] * workers
+        self.started_at: List[float] = [0.0] * workers
+
+    def _spawn(self, slot: int, sockets):
+        max_requests = self.max_requests
+        if max_requests and self.max_requests_jitter:
+            max_requests += random.randint(0, self.max_requests_jitter)
+        config = worker_config(max_requests)
+        process = get_subprocess(config=config, target=DrainingServer(config).run, sockets=sockets)
+        process.start()
+        self.processes[slot] = process
+        self.started_at[slot] = time.monotonic()
+
+    def _handle_signal(self, sig, frame):
+        self.should_exit.set()
+
+    def run(self) -> int:
+        settings = get_settings()
+        sockets = [worker_config(0).bind_socket()]
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, self._handle_signal)
+
+        print(f"🚀 Supervisor {os.getpid()}: {self.workers} workers en http://{settings.host}:{settings.port}")
+        for slot in range(self.workers):
+            self._spawn(slot, sockets)
+
+        while not self.should_exit.wait(0.5):
+            for slot, process in enumerate(self.processes):
+                if process.is_alive():
+                    continue
+                process.join()
+                uptime = time.monotonic() - self.started_at[slot]
+                print(f"♻️ Worker {process.pid} terminó (código {process.exitcode}); iniciando otro")
+                if uptime < MIN_WORKER_UPTIME_SECONDS:
+                    # Un worker que falla al arrancar no se relanza en bucle
+                    if self.should_exit.wait(MIN_WORKER_UPTIME_SECONDS):
+                        break
+                self._spawn(slot, sockets)
+
+        print("🛑 Deteniendo workers...")
+        # SIGTERM: cada worker deja de aceptar, cierra sus WebSockets y espera sus peticiones
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        # Peticiones en curso, luego los trabajos en segundo plano del lifespan
+        deadline = time.monotonic() + settings.graceful_timeout_seconds + settings.job_drain_seconds + 5
+        for process in self.processes:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                print(f"⚠️ Worker {process.pid} no terminó a tiempo; se fuerza el cierre")
+                process.kill()
+                process.join()
+        for sock in sockets:
+            sock.close()
+        return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Production entry point: python -m app.server"""
+    import argparse
+
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=f"{settings.app_name} (producción)")
+    parser.add_argument("--workers", type=int, default=settings.workers, help="0 = one per core")
+    parser.add_argument("--max-requests", type=int, default=settings.max_requests)
+    parser.add_argument("--max-requests-jitter", type=int, default=settings.max_requests_jitter)
+    args = parser.parse_args(argv)
+
+    workers = args.workers or os.cpu_count() or 1
+    if workers > 1 and settings.rate_limit_enabled and settings.rate_limit_backend != "mongo":
+        # Con buckets en memoria cada worker tendría su propio límite: N veces el configurado
+        print(f"❌ {workers} workers requieren RATE_LIMIT_BACKEND=mongo (o RATE_LIMIT_ENABLED=false)")
+        return 2
+    return WorkerSupervisor(workers, args.max_requests, args.max_requests_jitter).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,336 @@
+import re
+import zlib
+from typing import List, Optional, Dict, Any, Set, Tuple
+from datetime import datetime, timedelta
+import bson
+from bson import ObjectId
+from app.database.mongodb import get_collection
+from app.config.settings import get_settings
+from app.utils.dates import month_key, month_bounds
+from app.utils.fx import get_fx_table
+
+
+def encode_entries(entries: List[Dict[str, Any]]) -> bytes:
+    """Pack expense documents as zlib-compressed BSON (keeps ObjectId and datetime types)"""
+    return zlib.compress(bson.encode({"entries": entries}), 6)
+
+
+def decode_entries(data: bytes) -> List[Dict[str, Any]]:
+    return bson.decode(zlib.decompress(data))["entries"]
+
+
+def month_summary(entries: List[Dict[str, Any]], currency: Optional[str] = None) -> Dict[str, Any]:
+    """Precomputed totals of an archive month, so stats do not need to decompress it
+
+    Amounts are summed as stored, or converted to `currency` when one is given.
+    """
+    default_currency = get_settings().default_currency
+    fx = get_fx_table()
+    totals = {"income_total": 0.0, "income_count": 0, "expense_total": 0.0, "expense_count": 0}
+    categories: Dict[str, Dict[str, float]] = {}
+    currencies = set()
+    for entry in entries:
+        source = entry.get("currency") or default_currency
+        currencies.add(source)
+        amount = entry["amount"] * fx.factor(source, currency) if currency else entry["amount"]
+        kind = "income" if entry.get("type") == "income" else "expense"
+        totals[f"{kind}_total"] += amount
+        totals[f"{kind}_count"] += 1
+        if kind == "expense":
+            category = categories.setdefault(entry["category"], {"total": 0.0, "count": 0})
+            category["total"] += amount
+            category["count"] += 1
+    # Con una sola moneda, los totales se convierten sin descomprimir el mes
+    totals["currencies"] = sorted(currencies)
+    # Las claves de categorías se guardan como lista: pueden contener "." o "$"
+    totals["categories"] = [
+        {"category": name, "total": value["total"], "count": value["count"]}
+        for name, value in categories.items()
+    ]
+    return totals
+
+
+def month_index(entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Ids and idempotency keys of an archive month, indexed so single rows are found without decompressing"""
+    return {
+        "ids": [entry["_id"] for entry in entries],
+        "idempotency_keys": [entry["idempotency_key"] for entry in entries if entry.get("idempotency_key")]
+    }
+
+
+def _category_matcher(category: Optional[str]):
+    """Same semantics as the hot path's case-insensitive $regex"""
+    if not category:
+        return None
+    try:
+        return re.compile(category, re.IGNORECASE)
+    except re.error:
+        return re.compile(re.escape(category), re.IGNORECASE)
+
+
+def entry_matches(
+    entry: Dict[str, Any],
+    category_pattern=None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    terms: Optional[List[str]] = None
+) -> bool:
+    """Apply the get_user_expenses filters to an archived entry"""
+    if start_date and entry["date"] < start_date:
+        return False
+    if end_date and entry["date"] > end_date:
+        return False
+    if category_pattern and not category_pattern.search(entry["category"]):
+        return False
+    if terms:
+        # Sin índice de texto: cada palabra debe aparecer en el título o la descripción
+        text = f"{entry.get('title', '')} {entry.get('description') or ''}".lower()
+        if not all(term in text for term in terms):
+            return False
+    return True
+
+
+class ArchiveService:
+    """Cold tier: whole months of old expenses packed into one compressed document per user"""
+
+    def archive_cutoff(self, now: Optional[datetime] = None) -> datetime:
+        """First instant of the oldest month that stays hot"""
+        horizon = (now or datetime.utcnow()) - timedelta(days=get_settings().archive_after_days)
+        return month_bounds(month_key(horizon))[0]
+
+    async def archive_due(self, now: Optional[datetime] = None) -> int:
+        """Move whole months older than the horizon into archive documents; returns rows moved"""
+        expenses_collection = await get_collection("expenses")
+        settings = get_settings()
+        cutoff = self.archive_cutoff(now)
+
+        # Solo se recorren los gastos anteriores al corte, vía el índice de date
+        due = await expenses_collection.aggregate([
+            {"$match": {"date": {"$lt": cutoff}}},
+            {"$group": {"_id": {
+                "user_id": "$user_id",
+                "month": {"$dateToString": {"format": "%Y-%m", "date": "$date"}}
+            }}},
+            {"$limit": settings.archive_batch_months}
+        ]).to_list(None)
+
+        moved = 0
+        for item in due:
+            moved += await self.archive_month(item["_id"]["user_id"], item["_id"]["month"])
+        if moved:
+            print(f"🗄️ {moved} gastos archivados en {len(due)} meses")
+        return moved
+
+    async def archive_month(self, user_id: ObjectId, month: str) -> int:
+        """Merge a user's hot expenses of one month into its archive document, then delete them"""
+        expenses_collection = await get_collection("expenses")
+        archives_collection = await get_collection("expense_archives")
+        start, end = month_bounds(month)
+
+        hot = await expenses_collection.find({
+            "user_id": user_id,
+            "date": {"$gte": start, "$lt": end}
+        }).to_list(None)
+        if not hot:
+            return 0
+
+        archive_id = f"{user_id}:{month}"
+        existing = await archives_collection.find_one({"_id": archive_id})
+        entries = {entry["_id"]: entry for entry in decode_entries(existing["data"])} if existing else {}
+        # Por _id: si una ejecución anterior se cortó antes de borrar, no se duplica
+        for document in hot:
+            document.pop("score", None)
+            entries[document["_id"]] = document
+        merged = sorted(entries.values(), key=lambda entry: entry["date"], reverse=True)
+
+        await archives_collection.replace_one(
+            {"_id": archive_id},
+            {
+                "user_id": user_id,
+                "month": month,
+                "start": start,
+                "end": end,
+                "count": len(merged),
+                **month_summary(merged),
+                **month_index(merged),
+                "data": bson.Binary(encode_entries(merged)),
+                "archived_at": datetime.utcnow()
+            },
+            upsert=True
+        )
+        # Primero el archivo, luego el borrado: un corte a la mitad solo deja filas repetidas
+        # que la siguiente ejecución vuelve a fusionar
+        await expenses_collection.delete_many({"_id": {"$in": [document["_id"] for document in hot]}})
+        return len(hot)
+
+    async def _find_month(self, user_id: str, filter_query: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The archive month of a user matching an ids/idempotency_keys filter"""
+        archives_collection = await get_collection("expense_archives")
+        return await archives_collection.find_one({"user_id": ObjectId(user_id), **filter_query})
+
+    async def find_archived_expense(self, user_id: str, expense_id: str) -> Optional[Dict[str, Any]]:
+        """An archived expense by id (None if it is not archived)"""
+        archive = await self._find_month(user_id, {"ids": ObjectId(expense_id)})
+        if archive is None:
+            return None
+        return next((entry for entry in decode_entries(archive["data"]) if entry["_id"] == ObjectId(expense_id)), None)
+
+    async def find_by_idempotency_key(self, user_id: str, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        """The archived expense created with an idempotency key (None if there is none)"""
+        archive = await self._find_month(user_id, {"idempotency_keys": idempotency_key})
+        if archive is None:
+            return None
+        return next(
+            (entry for entry in decode_entries(archive["data"]) if entry.get("idempotency_key") == idempotency_key),
+            None
+        )
+
+    async def archived_idempotency_keys(self, user_id: str, idempotency_keys: List[str]) -> Set[str]:
+        """The subset of idempotency keys already used by a user's archived expenses"""
+        if not idempotency_keys:
+            return set()
+        archives_collection = await get_collection("expense_archives")
+        wanted = set(idempotency_keys)
+        found: Set[str] = set()
+        cursor = archives_collection.find(
+            {"user_id": ObjectId(user_id), "idempotency_keys": {"$in": list(wanted)}},
+            {"idempotency_keys": 1}
+        )
+        async for archive in cursor:
+            found.update(key for key in archive["idempotency_keys"] if key in wanted)
+        return found
+
+    async def restore_expense(self, user_id: str, expense_id: str) -> Optional[Dict[str, Any]]:
+        """Move one archived expense back to the hot collection, so it can be updated or deleted there
+
+        The month document is rewritten without it, with its totals recomputed (or removed
+        when it was the last one). Returns the restored document, or None if it is not archived.
+        """
+        expenses_collection = await get_collection("expenses")
+        archives_collection = await get_collection("expense_archives")
+        oid = ObjectId(expense_id)
+        while True:
+            archive = await self._find_month(user_id, {"ids": oid})
+            if archive is None:
+                return None
+            entries = decode_entries(archive["data"])
+            entry = next((entry for entry in entries if entry["_id"] == oid), None)
+            if entry is None:
+                return None
+            remaining = [other for other in entries if other["_id"] != oid]
+
+            # Primero al activo (por _id: repetirlo no duplica), luego el archivo; un corte a la
+            # mitad deja la fila en ambos lados, como en archive_month
+            await expenses_collection.replace_one({"_id": oid}, entry, upsert=True)
+            # Solo si nadie reescribió el mes desde que se leyó; si no, se vuelve a leer
+            unchanged = {"_id": archive["_id"], "archived_at": archive["archived_at"]}
+            if remaining:
+                result = await archives_collection.update_one(unchanged, {"$set": {
+                    "count": len(remaining),
+                    **month_summary(remaining),
+                    **month_index(remaining),
+                    "data": bson.Binary(encode_entries(remaining)),
+                    "archived_at": datetime.utcnow()
+                }})
+                written = result.matched_count
+            else:
+                written = (await archives_collection.delete_one(unchanged)).deleted_count
+            if written:
+                return entry
+
+    async def _months(
+        self,
+        user_id: str,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        with_data: bool
+    ):
+        """Archive documents overlapping a date range, newest month first"""
+        archives_collection = await get_collection("expense_archives")
+        filter_query: Dict[str, Any] = {"user_id": ObjectId(user_id)}
+        if start_date:
+            filter_query["end"] = {"$gt": start_date}
+        if end_date:
+            filter_query["start"] = {"$lte": end_date}
+        projection = None if with_data else {"data": 0}
+        async for archive in archives_collection.find(filter_query, projection).sort("start", -1):
+            yield archive
+
+    async def get_archived_expenses(
+        self,
+        user_id: str,
+        needed: int,
+        category: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        q: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Newest archived entries matching the filters, at least `needed` of them if they exist"""
+        category_pattern = _category_matcher(category)
+        terms = q.lower().split() if q else None
+        matched: List[Dict[str, Any]] = []
+        # Meses del más nuevo al más viejo: se deja de descomprimir al tener suficientes
+        async for archive in self._months(user_id, start_date, end_date, with_data=True):
+            matched.extend(
+                entry for entry in decode_entries(archive["data"])
+                if entry_matches(entry, category_pattern, start_date, end_date, terms)
+            )
+            if len(matched) >= needed:
+                break
+        return matched
+
+    async def get_archived_totals(
+        self,
+        user_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        currency: Optional[str] = None
+    ) -> Tuple[Dict[str, float], Dict[str, Dict[str, float]]]:
+        """Archived (type totals, expense totals per category) within a date range
+
+        Months fully inside the range use their precomputed totals; only the months at
+        the edges of the range, and months mixing currencies when converting to
+        `currency`, are decompressed.
+        """
+        fx = get_fx_table()
+        totals = {"income_total": 0.0, "income_count": 0, "expense_total": 0.0, "expense_count": 0}
+        categories: Dict[str, Dict[str, float]] = {}
+
+        def add_category(name: str, total: float, count: int):
+            category = categories.setdefault(name, {"total": 0.0, "count": 0})
+            category["total"] += total
+            category["count"] += count
+
+        archives_collection = await get_collection("expense_archives")
+        async for archive in self._months(user_id, start_date, end_date, with_data=False):
+            partial = (start_date and archive["start"] < start_date) or (end_date and archive["end"] > end_date)
+            month_currencies = archive["currencies"]
+            if not partial and (currency is None or len(month_currencies) == 1):
+                factor = fx.factor(month_currencies[0], currency) if currency else 1.0
+                for field in totals:
+                    totals[field] += archive[field] * factor if field.endswith("_total") else archive[field]
+                for item in archive["categories"]:
+                    add_category(item["category"], item["total"] * factor, item["count"])
+                continue
+
+            full = await archives_collection.find_one({"_id": archive["_id"]}, {"data": 1})
+            entries = [
+                entry for entry in decode_entries(full["data"])
+                if entry_matches(entry, start_date=start_date, end_date=end_date)
+            ]
+            summary = month_summary(entries, currency)
+            for field in totals:
+                totals[field] += summary[field]
+            for item in summary["categories"]:
+                add_category(item["category"], item["total"], item["count"])
+
+        return totals, categories
+
+    async def get_archived_count(self, user_id: str) -> int:
+        """Number of archived expenses of a user"""
+        archives_collection = await get_collection("expense_archives")
+        result = await archives_collection.aggregate([
+            {"$match": {"user_id": ObjectId(user_id)}},
+            {"$group": {"_id": None, "count": {"$sum": "$count"}}}
+        ]).to_list(None)
+        return result[0]["count"] if result else 0
@@ -0,0 +1,46 @@
+from typing import List, Optional, Dict, Any
+from datetime import datetime, timedelta
+from bson import ObjectId
+from app.database.mongodb import get_collection
+
+class AuditService:
+    """Service for reading the audit log"""
+
+    async def get_summary(self) -> Dict[str, Any]:
+        """Last successful login and failed logins in the last 24 hours"""
+        audit_collection = await get_collection("audit_log")
+
+        last_login = await audit_collection.find_one(
+            {"action": "auth.login"}, sort=[("_id", -1)]
+        )
+        # El _id (ObjectId) lleva la fecha: el rango usa el índice (action, _id)
+        since = ObjectId.from_datetime(datetime.utcnow() - timedelta(hours=24))
+        failed_attempts = await audit_collection.count_documents({
+            "action": "auth.login_failed",
+            "_id": {"$gte": since}
+        })
+        return {
+            "lastLogin": last_login["timestamp"] if last_login else None,
+            "failedAttempts": failed_attempts
+        }
+
+    async def list_events(
+        self,
+        limit: int = 50,
+        before: Optional[str] = None,
+        user_id: Optional[str] = None,
+        action: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """List audit events, newest first, starting before a keyset cursor"""
+        audit_collection = await get_collection("audit_log")
+
+        filter_query: Dict[str, Any] = {}
+        if user_id:
+            filter_query["user_id"] = ObjectId(user_id)
+        if action:
+            filter_query["action"] = action
+        if before:
+            filter_query["_id"] = {"$lt": ObjectId(before)}
+
+        cursor = audit_collection.find(filter_query).sort("_id", -1).limit(limit)
+        return await cursor.to_list(None)
@@ -1,10 +1,28 @@
-from typing import Optional
+from typing import Optional, List
 from datetime import datetime
+import secrets
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 from app.database.mongodb import get_collection
-from app.utils.security import get_password_hash, verify_password
+from app.services.platform_stats_service import PlatformStatsService
+from app.config.settings import get_settings
+from app.utils.audit import audit_log
+from app.utils.security import get_password_hash, verify_and_update_password
+
+# Attempts with a generated suffix when the requested username is taken
+USERNAME_RETRIES = 5
+
+
+def _duplicate_key_field(error: DuplicateKeyError) -> str:
+    """Name of the unique field that caused a duplicate key error"""
+    details = error.details or {}
+    key_pattern = details.get("keyPattern")
+    if key_pattern:
+        return next(iter(key_pattern))
+    # Servidores antiguos no incluyen keyPattern; se usa el nombre del índice
+    return "username" if "username_1" in details.get("errmsg", str(error)) else "email"
 
 
 class AuthService:
@@ -35,50 +53,73 @@ class AuthService:
         return None
 
     async def create_user(self, user_data: UserCreate) -> User:
-        """Create a new user"""
+        """Create a new user with a single insert, relying on the unique indexes"""
         users_collection = await get_collection("users")
 
-        # Check if user already exists
-        existing_user = await self.get_user_by_email(user_data.email)
-        if existing_user:
-            raise ValueError("Email already registered")
-
         # Si no envía username, se genera automáticamente a partir del correo
-        username = user_data.username or user_data.email.split("@")[0]
-
-        # Check for username collisions
-        existing_username = await self.get_user_by_username(username)
-        if existing_username:
-            username = f"{username}_{int(datetime.utcnow().timestamp())}"
+        base_username = user_data.username or user_data.email.split("@")[0]
+        username = base_username
 
         # ✅ Hashear contraseña
         hashed_password = get_password_hash(user_data.password)
 
-        # ✅ Crear el diccionario del nuevo usuario
-        user_dict = {
-            "username": username,
-            "email": user_data.email,
-            "full_name": getattr(user_data, "full_name", None),
-            "hashed_password": hashed_password,
-            "is_active": True,
-            "income": getattr(user_data, "income", 0.0),  # 👈 aquí se guarda el ingreso
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
-
-        # ✅ Insertar en la base de datos
-        result = await users_collection.insert_one(user_dict)
-        user_dict["_id"] = result.inserted_id
+        for _ in range(USERNAME_RETRIES + 1):
+            # ✅ Crear el diccionario del nuevo usuario
+            user_dict = {
+                "username": username,
+                "email": user_data.email,
+                "full_name": getattr(user_data, "full_name", None),
+                "hashed_password": hashed_password,
+                "is_active": True,
+                "role": "admin" if user_data.email in get_settings().admin_emails else "user",
+                "income": getattr(user_data, "income", 0.0),  # 👈 aquí se guarda el ingreso
+                "reporting_currency": user_data.reporting_currency,
+                "created_at": datetime.utcnow(),
+                "updated_at": datetime.utcnow()
+            }
 
-        return User(**user_dict)
+            # ✅ Insertar en la base de datos; los índices únicos detectan duplicados
+            try:
+                result = await users_collection.insert_one(user_dict)
+            except DuplicateKeyError as e:
+                if _duplicate_key_field(e) != "username":
+                    raise ValueError("Email already registered")
+                # Colisión de username: reintentar con un sufijo generado
+                username = f"{base_username}_{secrets.token_hex(3)}"
+                continue
+
+            user_dict["_id"] = result.inserted_id
+            audit_log.record("user.create", result.inserted_id)
+            try:
+                await PlatformStatsService().increment({"users": 1})
+            except Exception as e:
+                print(f"⚠️ Error actualizando contadores de la plataforma: {e}")
+            return User(**user_dict)
+
+        raise ValueError("Could not generate a unique username")
 
     async def authenticate_user(self, email: str, password: str) -> Optional[User]:
         """Authenticate user with email and password"""
         user = await self.get_user_by_email(email)
         if not user:
+            audit_log.record("auth.login_failed", email=email)
             return None
-        if not verify_password(password, user.hashed_password):
+
+        valid, new_hash = verify_and_update_password(password, user.hashed_password)
+        if not valid:
+            audit_log.record("auth.login_failed", user.id, email=email)
             return None
+
+        # Rehash transparently when the scheme or work factor changed
+        if new_hash:
+            users_collection = await get_collection("users")
+            await users_collection.update_one(
+                {"_id": user.id},
+                {"$set": {"hashed_password": new_hash, "updated_at": datetime.utcnow()}}
+            )
+            user.hashed_password = new_hash
+
+        audit_log.record("auth.login", user.id)
         return user
 
     async def update_user(self, user_id: str, user_update: UserUpdate) -> Optional[User]:
@@ -99,6 +140,10 @@ class AuthService:
                 {"_id": ObjectId(user_id)},
                 {"$set": update_data}
             )
+            audit_log.record(
+                "user.update", user_id,
+                fields=sorted(user_update.dict(exclude_unset=True))
+            )
 
         # Return updated user
         return await self.get_user_by_id(user_id)
@@ -117,4 +162,15 @@ class AuthService:
             }
         )
 
+        if result.modified_count > 0:
+            audit_log.record("user.deactivate", user_id)
         return result.modified_count > 0
+
+    async def list_users(self, limit: int = 50, after: Optional[str] = None) -> List[User]:
+        """List users in _id order, starting after a keyset cursor"""
+        users_collection = await get_collection("users")
+
+        # Paginación por clave: cada página es un rango del índice _id, sin skip
+        filter_query = {"_id": {"$gt": ObjectId(after)}} if after else {}
+        cursor = users_collection.find(filter_query).sort("_id", 1).limit(limit)
+        return [User(**user) async for user in cursor]
@@ -0,0 +1,199 @@
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ReturnDocument
+from app.models.budget import Budget
+from app.schemas.budget import BudgetCreate
+from app.database.mongodb import get_collection
+from app.config.settings import get_settings
+from app.services.expense_bucket_store import ExpenseBucketStore
+from app.utils.dates import month_key, month_bounds
+from app.utils.fx import get_fx_table
+
+# (category, YYYY-MM, expense currency) -> change in spent amount, converted when applied
+SpendDeltas = Dict[Tuple[str, str, str], float]
+
+
+def add_spend_delta(deltas: SpendDeltas, expense: Dict[str, Any], sign: int):
+    """Accumulate the budget effect of an expense document (+1 added, -1 removed)"""
+    if expense.get("type", "expense") != "expense":
+        return
+    currency = expense.get("currency") or get_settings().default_currency
+    key = (expense["category"], month_key(expense["date"]), currency)
+    deltas[key] = deltas.get(key, 0.0) + sign * abs(expense["amount"])
+
+
+def budget_currency(budget: Budget) -> str:
+    """Currency of a budget's limit and spend (budgets created before currencies use DEFAULT_CURRENCY)"""
+    return budget.currency or get_settings().default_currency
+
+
+class BudgetService:
+    """Service for monthly category budgets"""
+
+    async def upsert_budget(
+        self,
+        user_id: str,
+        budget_data: BudgetCreate,
+        user_currency: Optional[str] = None
+    ) -> Tuple[Budget, float]:
+        """Create or replace the budget of a category, returning it with this month's spend
+
+        The limit is in the budget's currency, else in the user's reporting currency.
+        """
+        budgets_collection = await get_collection("budgets")
+        now = datetime.utcnow()
+        currency = budget_data.currency or user_currency or get_settings().default_currency
+
+        budget_doc = await budgets_collection.find_one_and_update(
+            {"user_id": ObjectId(user_id), "category": budget_data.category},
+            {
+                "$set": {
+                    "limit": budget_data.limit,
+                    "thresholds": sorted(budget_data.thresholds),
+                    "currency": currency,
+                    "updated_at": now
+                },
+                "$setOnInsert": {"created_at": now}
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        budget = Budget(**budget_doc)
+
+        # Única agregación: el mes en curso se calcula al crear el presupuesto;
+        # desde entonces cada escritura solo suma su delta
+        spent = await self._seed_usage(budget, month_key(now))
+        return budget, spent
+
+    async def _seed_usage(self, budget: Budget, month: str) -> float:
+        expenses_collection = await get_collection("expenses")
+        start, end = month_bounds(month)
+
+        currency = budget_currency(budget)
+
+        if get_settings().expense_storage == "buckets":
+            spent = await ExpenseBucketStore().category_spent(budget.user_id, budget.category, start, end, currency)
+            await self._save_usage(budget, month, spent)
+            return spent
+
+        result = await expenses_collection.aggregate([
+            {"$match": {
+                "user_id": budget.user_id,
+                "category": budget.category,
+                "type": "expense",
+                "date": {"$gte": start, "$lt": end}
+            }},
+            # Cada gasto se convierte a la moneda del presupuesto
+            {"$group": {"_id": None, "spent": {"$sum": get_fx_table().amount_expr(currency)}}}
+        ]).to_list(None)
+        spent = result[0]["spent"] if result else 0.0
+        await self._save_usage(budget, month, spent)
+        return spent
+
+    async def _save_usage(self, budget: Budget, month: str, spent: float):
+        usage_collection = await get_collection("budget_usage")
+        await usage_collection.update_one(
+            {"_id": f"{budget.id}:{month}"},
+            {"$set": {"budget_id": budget.id, "month": month, "spent": spent}},
+            upsert=True
+        )
+
+    async def get_user_budgets(self, user_id: str) -> List[Tuple[Budget, float]]:
+        """Get a user's budgets with this month's spend"""
+        budgets_collection = await get_collection("budgets")
+        usage_collection = await get_collection("budget_usage")
+        month = month_key(datetime.utcnow())
+
+        budgets = [Budget(**doc) async for doc in budgets_collection.find({"user_id": ObjectId(user_id)})]
+        usage_ids = [f"{budget.id}:{month}" for budget in budgets]
+        spent = {
+            doc["_id"]: doc["spent"]
+            async for doc in usage_collection.find({"_id": {"$in": usage_ids}})
+        }
+        return [(budget, spent.get(f"{budget.id}:{month}", 0.0)) for budget in budgets]
+
+    async def delete_budget(self, budget_id: str, user_id: str) -> bool:
+        """Delete a budget and its usage counters"""
+        budgets_collection = await get_collection("budgets")
+        usage_collection = await get_collection("budget_usage")
+
+        if not ObjectId.is_valid(budget_id):
+            return False
+
+        result = await budgets_collection.delete_one({
+            "_id": ObjectId(budget_id),
+            "user_id": ObjectId(user_id)
+        })
+        if result.deleted_count > 0:
+            await usage_collection.delete_many({"budget_id": ObjectId(budget_id)})
+        return result.deleted_count > 0
+
+    async def apply_spend_deltas(self, user_id: str, deltas: SpendDeltas):
+        """Apply write-path deltas to budget usage and push threshold crossings
+
+        Each delta is converted from the expense currency to the budget currency. Cost
+        depends only on the categories touched by the write, never on history size.
+        """
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        budgets_collection = await get_collection("budgets")
+        usage_collection = await get_collection("budget_usage")
+        current_month = month_key(datetime.utcnow())
+
+        categories = list({category for category, _, _ in deltas})
+        budgets = {
+            doc["category"]: Budget(**doc)
+            async for doc in budgets_collection.find({
+                "user_id": ObjectId(user_id),
+                "category": {"$in": categories}
+            })
+        }
+        if not budgets:
+            return
+
+        fx = get_fx_table()
+        converted: Dict[Tuple[str, str], float] = {}
+        for (category, month, currency), delta in deltas.items():
+            budget = budgets.get(category)
+            if budget is None:
+                continue
+            key = (category, month)
+            converted[key] = converted.get(key, 0.0) + delta * fx.factor(currency, budget_currency(budget))
+
+        alerts = []
+        for (category, month), delta in converted.items():
+            budget = budgets[category]
+            if not delta:
+                continue
+            usage = await usage_collection.find_one_and_update(
+                {"_id": f"{budget.id}:{month}"},
+                {
+                    "$inc": {"spent": delta},
+                    "$setOnInsert": {"budget_id": budget.id, "month": month}
+                },
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            if month != current_month or delta <= 0:
+                continue
+
+            spent = usage["spent"]
+            previous = spent - delta
+            crossed = [t for t in budget.thresholds if previous < budget.limit * t <= spent]
+            if crossed:
+                alerts.append({
+                    "budget_id": str(budget.id),
+                    "category": category,
+                    "month": month,
+                    "limit": budget.limit,
+                    "spent": spent,
+                    "threshold": max(crossed)
+                })
+
+        if alerts:
+            # Importación diferida: websocket importa los servicios
+            from app.routes.websocket import manager
+            for alert in alerts:
+                await manager.broadcast_to_user(user_id, "budget_alert", alert)
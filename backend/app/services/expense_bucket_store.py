@@ -0,0 +1,394 @@
+import re
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
+from datetime import datetime
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.database.mongodb import get_collection
+from app.config.settings import get_settings
+from app.utils.dates import month_key, month_bounds
+from app.utils.fx import get_fx_table
+
+
+def bucket_id(user_id: ObjectId, date: datetime) -> str:
+    """Bucket of an expense: one per user and month"""
+    return f"{user_id}:{month_key(date)}"
+
+
+def bucket_totals(documents: List[Dict[str, Any]], sign: int) -> Dict[str, float]:
+    """Changes to a bucket's precomputed totals (same fields as an archive month)"""
+    inc: Dict[str, float] = {"income_total": 0.0, "income_count": 0, "expense_total": 0.0, "expense_count": 0}
+    for document in documents:
+        kind = "income" if document.get("type") == "income" else "expense"
+        inc[f"{kind}_total"] += sign * document["amount"]
+        inc[f"{kind}_count"] += sign
+    return inc
+
+
+def bucket_currencies(documents: List[Dict[str, Any]]) -> List[str]:
+    """Currencies present in a bucket's entries (kept as a set: removals do not shrink it)"""
+    default_currency = get_settings().default_currency
+    return sorted({document.get("currency") or default_currency for document in documents})
+
+
+def bucket_max_seq(documents: List[Dict[str, Any]]) -> int:
+    """Highest change sequence among a bucket's entries, so sync can skip unchanged buckets"""
+    return max((document.get("seq", 0) for document in documents), default=0)
+
+
+def _range_match(start_date: Optional[datetime], end_date: Optional[datetime]) -> Dict[str, Any]:
+    """Buckets overlapping a date range"""
+    match: Dict[str, Any] = {}
+    if start_date:
+        match["end"] = {"$gt": start_date}
+    if end_date:
+        match["start"] = {"$lte": end_date}
+    return match
+
+
+def _entry_match(category: Optional[str], q: Optional[str]) -> Dict[str, Any]:
+    """Entry filter for the get_user_expenses category and q= filters"""
+    entry_match: Dict[str, Any] = {}
+    if category:
+        entry_match["category"] = {"$regex": category, "$options": "i"}
+    if q:
+        # Sin índice de texto: cada palabra debe aparecer en el título o la descripción
+        entry_match["$and"] = [
+            {"$or": [
+                {"title": {"$regex": re.escape(term), "$options": "i"}},
+                {"description": {"$regex": re.escape(term), "$options": "i"}}
+            ]}
+            for term in q.split()
+        ]
+    return entry_match
+
+
+def _search_options(q: Optional[str]) -> Dict[str, Any]:
+    """Searches get the same time limit as on the hot collection"""
+    return {"maxTimeMS": get_settings().search_max_time_ms} if q else {}
+
+
+class ExpenseBucketStore:
+    """Bucketed storage layout: one document per user and month holding an array of entries
+
+    Entries are complete expense documents (user_id included), so they convert to and
+    from the document layout unchanged.
+    Each bucket keeps its entry count and income/expense totals up to date, so unfiltered
+    stats read a handful of small documents instead of every expense.
+    """
+
+    async def insert_documents(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Push prepared expense documents into their buckets; returns the ones inserted
+
+        Documents whose idempotency_key already exists in their bucket are skipped.
+        """
+        if not documents:
+            return []
+        buckets_collection = await get_collection("expense_buckets")
+
+        by_bucket: Dict[str, List[Dict[str, Any]]] = {}
+        for document in documents:
+            document.setdefault("_id", ObjectId())
+            by_bucket.setdefault(bucket_id(document["user_id"], document["date"]), []).append(document)
+
+        # (bucket, idempotency key, documents): las entradas sin clave van juntas por bucket
+        writes: List[Tuple[str, Optional[str], List[Dict[str, Any]]]] = []
+        for bid, bucket_documents in by_bucket.items():
+            plain = [document for document in bucket_documents if not document.get("idempotency_key")]
+            if plain:
+                writes.append((bid, None, plain))
+            seen_keys = set()
+            for document in bucket_documents:
+                key = document.get("idempotency_key")
+                if key and key not in seen_keys:
+                    seen_keys.add(key)
+                    writes.append((bid, key, [document]))
+
+        inserted: List[Dict[str, Any]] = []
+        while writes:
+            # Sin índice único: con clave, el push solo aplica si la clave no está en el bucket.
+            # Si ya está, el filtro no coincide y el upsert choca con el _id existente
+            operations = [
+                self._push(bid, bucket_documents, {"entries.idempotency_key": {"$ne": key}} if key else None)
+                for bid, key, bucket_documents in writes
+            ]
+            failed = set()
+            try:
+                await buckets_collection.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                write_errors = e.details.get("writeErrors", [])
+                if any(error.get("code") != 11000 for error in write_errors):
+                    raise
+                failed = {error["index"] for error in write_errors}
+
+            retry = []
+            for index, (bid, key, bucket_documents) in enumerate(writes):
+                if index not in failed:
+                    inserted.extend(bucket_documents)
+                    continue
+                # El choque es un reintento si la clave ya está; si no, dos upserts crearon el
+                # bucket a la vez y basta con repetir el push
+                if key and await buckets_collection.find_one({"_id": bid, "entries.idempotency_key": key}, {"_id": 1}):
+                    continue
+                retry.append((bid, key, bucket_documents))
+            writes = retry
+        return inserted
+
+    def _push(
+        self,
+        bid: str,
+        documents: List[Dict[str, Any]],
+        condition: Optional[Dict[str, Any]] = None
+    ) -> UpdateOne:
+        """Upsert adding entries to a bucket along with its totals"""
+        start, end = month_bounds(month_key(documents[0]["date"]))
+        return UpdateOne(
+            {"_id": bid, **(condition or {})},
+            {
+                "$push": {"entries": {"$each": documents}},
+                "$inc": bucket_totals(documents, 1),
+                "$addToSet": {"currencies": {"$each": bucket_currencies(documents)}},
+                "$max": {"max_seq": bucket_max_seq(documents)},
+                "$setOnInsert": {"user_id": documents[0]["user_id"], "start": start, "end": end}
+            },
+            upsert=True
+        )
+
+    async def find_by_idempotency_key(self, user_id: str, idempotency_key: str) -> Optional[Dict[str, Any]]:
+        buckets_collection = await get_collection("expense_buckets")
+        bucket = await buckets_collection.find_one(
+            {"user_id": ObjectId(user_id), "entries.idempotency_key": idempotency_key},
+            {"entries": {"$elemMatch": {"idempotency_key": idempotency_key}}}
+        )
+        return bucket["entries"][0] if bucket else None
+
+    async def find_by_id(self, user_id: str, expense_id: str) -> Optional[Dict[str, Any]]:
+        """Get one entry through the multikey index on entries._id"""
+        buckets_collection = await get_collection("expense_buckets")
+        bucket = await buckets_collection.find_one(
+            {"entries._id": ObjectId(expense_id), "user_id": ObjectId(user_id)},
+            {"entries": {"$elemMatch": {"_id": ObjectId(expense_id)}}}
+        )
+        return bucket["entries"][0] if bucket else None
+
+    def _pull(self, old: Dict[str, Any]) -> UpdateOne:
+        return UpdateOne(
+            {"_id": bucket_id(old["user_id"], old["date"]), "entries._id": old["_id"]},
+            {"$pull": {"entries": {"_id": old["_id"]}}, "$inc": bucket_totals([old], -1)}
+        )
+
+    async def replace(self, old: Dict[str, Any], new: Dict[str, Any]):
+        """Replace an entry; it moves to another bucket when its month changes"""
+        buckets_collection = await get_collection("expense_buckets")
+        # Un solo viaje: quitar del bucket viejo y agregar al nuevo, en orden
+        await buckets_collection.bulk_write([
+            self._pull(old),
+            self._push(bucket_id(new["user_id"], new["date"]), [new])
+        ], ordered=True)
+
+    async def delete(self, user_id: str, expense_id: str) -> Optional[Dict[str, Any]]:
+        """Remove an entry, returning it (None if it does not exist)"""
+        entry = await self.find_by_id(user_id, expense_id)
+        if entry is None:
+            return None
+        buckets_collection = await get_collection("expense_buckets")
+        result = await buckets_collection.bulk_write([self._pull(entry)])
+        return entry if result.modified_count else None
+
+    def _entries_pipeline(
+        self,
+        user_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        entry_match: Optional[Dict[str, Any]] = None,
+        bucket_match: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """Pipeline yielding the entries of the buckets overlapping a range, one per document"""
+        entry_filter = dict(entry_match or {})
+        if start_date or end_date:
+            entry_filter["date"] = {}
+            if start_date:
+                entry_filter["date"]["$gte"] = start_date
+            if end_date:
+                entry_filter["date"]["$lte"] = end_date
+        pipeline: List[Dict[str, Any]] = [
+            {"$match": {"user_id": ObjectId(user_id), **_range_match(start_date, end_date), **(bucket_match or {})}},
+            {"$unwind": "$entries"},
+            {"$replaceRoot": {"newRoot": "$entries"}},
+        ]
+        if entry_filter:
+            pipeline.append({"$match": entry_filter})
+        return pipeline
+
+    async def iter_entries(
+        self,
+        user_id: str,
+        start_date: datetime,
+        end_date: datetime,
+        batch_size: int = 1000
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Entries of a user within a date range, oldest first, read from a cursor"""
+        buckets_collection = await get_collection("expense_buckets")
+        pipeline = self._entries_pipeline(user_id, start_date, end_date) + [{"$sort": {"date": 1}}]
+        async for entry in buckets_collection.aggregate(pipeline, batchSize=batch_size):
+            yield entry
+
+    async def find(
+        self,
+        user_id: str,
+        skip: int = 0,
+        limit: int = 100,
+        category: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        q: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Entries of a user, newest first, with the get_user_expenses filters"""
+        buckets_collection = await get_collection("expense_buckets")
+        pipeline = self._entries_pipeline(user_id, start_date, end_date, _entry_match(category, q))
+        pipeline += [{"$sort": {"date": -1}}, {"$skip": skip}, {"$limit": limit}]
+        return await buckets_collection.aggregate(pipeline, **_search_options(q)).to_list(None)
+
+    async def count_matching(
+        self,
+        user_id: str,
+        category: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        q: Optional[str] = None
+    ) -> int:
+        """Number of entries matching the get_user_expenses filters"""
+        if not (category or start_date or end_date or q):
+            return await self.count(user_id)
+        buckets_collection = await get_collection("expense_buckets")
+        pipeline = self._entries_pipeline(user_id, start_date, end_date, _entry_match(category, q))
+        pipeline.append({"$count": "count"})
+        result = await buckets_collection.aggregate(pipeline, **_search_options(q)).to_list(None)
+        return result[0]["count"] if result else 0
+
+    async def find_changed(self, user_id: str, since_seq: int, limit: int) -> List[Dict[str, Any]]:
+        """Entries with a change sequence above `since_seq`, in sequence order
+
+        Only buckets whose max_seq is above `since_seq` are unwound, through the
+        (user_id, max_seq) index.
+        """
+        buckets_collection = await get_collection("expense_buckets")
+        pipeline = self._entries_pipeline(
+            user_id,
+            entry_match={"seq": {"$gt": since_seq}},
+            bucket_match={"max_seq": {"$gt": since_seq}}
+        )
+        pipeline += [{"$sort": {"seq": 1}}, {"$limit": limit}]
+        return await buckets_collection.aggregate(pipeline).to_list(None)
+
+    async def type_totals(
+        self,
+        user_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        currency: Optional[str] = None
+    ) -> Tuple[float, float]:
+        """(income total, expense total) of a user within a date range, optionally converted to `currency`"""
+        buckets_collection = await get_collection("expense_buckets")
+        fx = get_fx_table()
+        totals = {"income": 0.0, "expense": 0.0}
+        mixed_match = None
+        if not start_date and not end_date:
+            # Sin rango: se suman los totales de cada bucket, sin desplegar las entradas
+            bucket_filter: Dict[str, Any] = {"user_id": ObjectId(user_id)}
+            income_total: Any = "$income_total"
+            expense_total: Any = "$expense_total"
+            if currency:
+                # Un bucket de una sola moneda se convierte con sus totales; los mixtos, entrada por entrada
+                bucket_filter["currencies.1"] = {"$exists": False}
+                mixed_match = {"currencies.1": {"$exists": True}}
+                bucket_currency = {"$arrayElemAt": ["$currencies", 0]}
+                income_total = fx.amount_expr(currency, "$income_total", bucket_currency)
+                expense_total = fx.amount_expr(currency, "$expense_total", bucket_currency)
+            result = await buckets_collection.aggregate([
+                {"$match": bucket_filter},
+                {"$group": {
+                    "_id": None,
+                    "income_total": {"$sum": income_total},
+                    "expense_total": {"$sum": expense_total}
+                }}
+            ]).to_list(None)
+            if result:
+                totals = {"income": result[0]["income_total"], "expense": result[0]["expense_total"]}
+            if mixed_match is None:
+                return totals["income"], totals["expense"]
+
+        pipeline = self._entries_pipeline(user_id, start_date, end_date, bucket_match=mixed_match)
+        amount = fx.amount_expr(currency) if currency else "$amount"
+        pipeline.append({"$group": {"_id": "$type", "total_amount": {"$sum": amount}}})
+        async for item in buckets_collection.aggregate(pipeline):
+            if item["_id"] in totals:
+                totals[item["_id"]] += item["total_amount"]
+        return totals["income"], totals["expense"]
+
+    async def category_totals(
+        self,
+        user_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        currency: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Expense totals per category, largest first, optionally converted to `currency`"""
+        buckets_collection = await get_collection("expense_buckets")
+        amount = get_fx_table().amount_expr(currency) if currency else "$amount"
+        pipeline = self._entries_pipeline(user_id, start_date, end_date, {"type": "expense"})
+        pipeline += [
+            {"$group": {"_id": "$category", "total_amount": {"$sum": amount}, "count": {"$sum": 1}}},
+            {"$sort": {"total_amount": -1}}
+        ]
+        return [
+            {"category": item["_id"], "total_amount": item["total_amount"], "count": item["count"]}
+            async for item in buckets_collection.aggregate(pipeline)
+        ]
+
+    async def count(self, user_id: str) -> int:
+        buckets_collection = await get_collection("expense_buckets")
+        result = await buckets_collection.aggregate([
+            {"$match": {"user_id": ObjectId(user_id)}},
+            {"$group": {"_id": None, "count": {"$sum": {"$add": ["$income_count", "$expense_count"]}}}}
+        ]).to_list(None)
+        return result[0]["count"] if result else 0
+
+    async def category_spent(
+        self,
+        user_id: ObjectId,
+        category: str,
+        start: datetime,
+        end: datetime,
+        currency: str
+    ) -> float:
+        """Expense total of one category in [start, end), converted to `currency`"""
+        buckets_collection = await get_collection("expense_buckets")
+        pipeline = self._entries_pipeline(str(user_id), start, entry_match={
+            "type": "expense", "category": category, "date": {"$gte": start, "$lt": end}
+        })
+        pipeline.append({"$group": {"_id": None, "spent": {"$sum": get_fx_table().amount_expr(currency)}}})
+        result = await buckets_collection.aggregate(pipeline).to_list(None)
+        return result[0]["spent"] if result else 0.0
+
+    async def find_all(
+        self,
+        limit: int = 50,
+        before: Optional[str] = None,
+        user_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Entries of every user, newest _id first (unwinds every bucket when there is no user_id)"""
+        buckets_collection = await get_collection("expense_buckets")
+        pipeline: List[Dict[str, Any]] = []
+        if user_id:
+            pipeline.append({"$match": {"user_id": ObjectId(user_id)}})
+        if before:
+            pipeline.append({"$match": {"entries._id": {"$lt": ObjectId(before)}}})
+        pipeline += [
+            {"$unwind": "$entries"},
+            {"$replaceRoot": {"newRoot": "$entries"}},
+        ]
+        if before:
+            pipeline.append({"$match": {"_id": {"$lt": ObjectId(before)}}})
+        pipeline += [{"$sort": {"_id": -1}}, {"$limit": limit}]
+        return await buckets_collection.aggregate(pipeline).to_list(None)
@@ -1,20 +1,187 @@
-from typing import List, Optional, Dict, Any
-from datetime import datetime
+from typing import AsyncIterator, List, Optional, Dict, Any, Tuple
+from datetime import datetime, timedelta
+import base64
+import sys
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from app.models.expense import Expense
 from app.schemas.expense import ExpenseCreate, ExpenseUpdate
 from app.database.mongodb import get_collection
+from app.config.settings import get_settings
+from app.utils.audit import audit_log
+from app.utils.dates import naive_utc
+from app.utils.fx import get_fx_table
+from app.utils.metrics import register_metrics
+from app.utils.singleflight import SingleFlightCache
+from app.services.budget_service import BudgetService, SpendDeltas, add_spend_delta
+from app.services.platform_stats_service import PlatformStatsService
+from app.services.archive_service import ArchiveService
+from app.services.expense_bucket_store import ExpenseBucketStore
+
+# Shared across requests (ExpenseService is created per request)
+_stats_cache: Optional[SingleFlightCache] = None
+
+
+def get_stats_cache() -> SingleFlightCache:
+    """Get the per-worker single-flight cache for stats queries"""
+    global _stats_cache
+    if _stats_cache is None:
+        _stats_cache = SingleFlightCache(get_settings().stats_cache_ttl_seconds)
+        register_metrics("stats_cache", _stats_cache.stats)
+    return _stats_cache
+
+
+# Changes newer than this may still have lower-sequence writes in flight,
+# so sync tokens never advance past them
+SYNC_SETTLE_SECONDS = 5
+
+
+def encode_sync_token(seq: int, issued_at: datetime) -> str:
+    """Encode a delta sync position as an opaque token"""
+    raw = f"{seq}:{int(issued_at.timestamp())}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_sync_token(token: str) -> Optional[Tuple[int, datetime]]:
+    """Decode a sync token into (seq, issued_at), or None if it is malformed"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        seq, issued_at = base64.urlsafe_b64decode(padded.encode()).decode().split(":")
+        return int(seq), datetime.fromtimestamp(int(issued_at))
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def page_changes(
+    expense_docs: List[Dict[str, Any]],
+    tombstones: List[Dict[str, Any]],
+    since: int,
+    issued_at: datetime,
+    limit: int,
+    now: datetime
+) -> Dict[str, Any]:
+    """One delta sync page from changed expenses and tombstones with seq above `since`
+
+    Both kinds are interleaved by seq and cut at `limit`. The token only advances over
+    changes older than SYNC_SETTLE_SECONDS; when an unsettled change cuts the page
+    short, has_more is False so the client does not ask again right away.
+    """
+    settled_at = now - timedelta(seconds=SYNC_SETTLE_SECONDS)
+    changes = [
+        (expense_doc["seq"], expense_doc["updated_at"], Expense(**expense_doc)) for expense_doc in expense_docs
+    ]
+    changes.extend(
+        (tombstone["seq"], tombstone["deleted_at"], str(tombstone["expense_id"])) for tombstone in tombstones
+    )
+
+    changes.sort(key=lambda change: change[0])
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    # Advance only over settled changes; recent ones are delivered again next time
+    next_seq = since
+    for seq, changed_at, _ in changes:
+        if changed_at > settled_at:
+            # The rest is not settled yet: asking again right away would return the same page
+            has_more = False
+            break
+        next_seq = seq
+
+    return {
+        "upserts": [data for _, _, data in changes if isinstance(data, Expense)],
+        "deleted": [data for _, _, data in changes if isinstance(data, str)],
+        "next_token": encode_sync_token(next_seq, issued_at if has_more else settled_at),
+        "has_more": has_more,
+        "reset": False
+    }
 
 
 class ExpenseService:
     """Service for expense and income operations"""
+
+    def __init__(self):
+        # Con EXPENSE_STORAGE=buckets los gastos viven en documentos por usuario y mes
+        self.bucket_store = ExpenseBucketStore() if get_settings().expense_storage == "buckets" else None
+
+    async def _next_sequence(self, user_id: str, count: int = 1) -> int:
+        """Reserve `count` values of the user's change sequence and return the last one"""
+        sequences_collection = await get_collection("sequences")
+        counter = await sequences_collection.find_one_and_update(
+            {"_id": ObjectId(user_id)},
+            {"$inc": {"seq": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter["seq"]
+
+    async def get_current_sequence(self, user_id: str) -> int:
+        """Get the last change sequence assigned to a user"""
+        sequences_collection = await get_collection("sequences")
+        counter = await sequences_collection.find_one({"_id": ObjectId(user_id)})
+        return counter["seq"] if counter else 0
+
+    def _archive_reaches(self, start_date: Optional[datetime] = None) -> bool:
+        """Whether archived months can hold rows of a range starting at `start_date` (None: unbounded)
+
+        Archived months all end before archive_cutoff(): with ARCHIVE_ENABLED off, or a
+        range starting after the cutoff, expense_archives is not queried at all.
+        """
+        if not get_settings().archive_enabled:
+            return False
+        return start_date is None or naive_utc(start_date) < ArchiveService().archive_cutoff()
+
+    async def _record_write(
+        self,
+        added: List[Dict[str, Any]] = (),
+        removed: List[Dict[str, Any]] = ()
+    ):
+        """Update the counters derived from expenses (budgets, platform totals) for one write
+
+        Counter failures are logged and never fail the write itself.
+        """
+        deltas_by_user: Dict[str, SpendDeltas] = {}
+        for documents, sign in ((added, 1), (removed, -1)):
+            for document in documents:
+                add_spend_delta(deltas_by_user.setdefault(str(document["user_id"]), {}), document, sign)
+
+        for user_id, deltas in deltas_by_user.items():
+            get_stats_cache().invalidate(user_id)
+            try:
+                await BudgetService().apply_spend_deltas(user_id, deltas)
+            except Exception as e:
+                print(f"⚠️ Error actualizando presupuestos de {user_id}: {e}")
+        try:
+            await PlatformStatsService().record_transactions(list(added), list(removed))
+        except Exception as e:
+            print(f"⚠️ Error actualizando contadores de la plataforma: {e}")
     
-    async def create_expense(self, user_id: str, expense_data: ExpenseCreate) -> Expense:
-        """Create a new expense or income"""
+    async def create_expense(
+        self,
+        user_id: str,
+        expense_data: ExpenseCreate,
+        idempotency_key: Optional[str] = None,
+        currency: Optional[str] = None
+    ) -> Expense:
+        """Create a new expense or income (a repeated idempotency key returns the original)
+
+        `currency` is the user's reporting currency, used when the expense has none.
+        """
         expenses_collection = await get_collection("expenses")
 
         expense_dict = expense_data.dict()
         expense_dict["user_id"] = ObjectId(user_id)
+        if not expense_dict.get("currency"):
+            # Sin moneda explícita, el monto está en la moneda del usuario
+            expense_dict["currency"] = currency or get_settings().default_currency
+        if idempotency_key:
+            expense_dict["idempotency_key"] = idempotency_key
+            # Reintento: una lectura indexada devuelve el original, sin reservar secuencia ni escribir
+            original = await self._find_by_idempotency_key(user_id, idempotency_key, expense_dict["date"])
+            if original is not None:
+                return Expense(**original)
+        # La secuencia se reserva antes de fijar las fechas (ver SYNC_SETTLE_SECONDS)
+        expense_dict["seq"] = await self._next_sequence(user_id)
         expense_dict["created_at"] = datetime.utcnow()
         expense_dict["updated_at"] = datetime.utcnow()
 
@@ -22,11 +189,153 @@ class ExpenseService:
         if "type" not in expense_dict:
             expense_dict["type"] = "expense"  # 'income' o 'expense'
 
-        result = await expenses_collection.insert_one(expense_dict)
+        if self.bucket_store is not None:
+            if not await self.bucket_store.insert_documents([expense_dict]):
+                # Reintento concurrente: la clave llegó al bucket del mes después de la lectura
+                return Expense(**await self.bucket_store.find_by_idempotency_key(user_id, idempotency_key))
+            await self._record_write(added=[expense_dict])
+            audit_log.record("expense.create", user_id, expense_id=str(expense_dict["_id"]))
+            return Expense(**expense_dict)
+
+        try:
+            result = await expenses_collection.insert_one(expense_dict)
+        except DuplicateKeyError:
+            if not idempotency_key:
+                raise
+            # Reintento concurrente: el índice único (user_id, idempotency_key) ya tiene el original
+            original = await expenses_collection.find_one({
+                "user_id": ObjectId(user_id),
+                "idempotency_key": idempotency_key
+            })
+            if original is None:
+                raise
+            return Expense(**original)
         expense_dict["_id"] = result.inserted_id
+        await self._record_write(added=[expense_dict])
+        audit_log.record("expense.create", user_id, expense_id=str(result.inserted_id))
 
         return Expense(**expense_dict)
 
+    async def _find_by_idempotency_key(
+        self,
+        user_id: str,
+        idempotency_key: str,
+        date: datetime
+    ) -> Optional[Dict[str, Any]]:
+        """The expense a user already created with an idempotency key (None if there is none)"""
+        if self.bucket_store is not None:
+            return await self.bucket_store.find_by_idempotency_key(user_id, idempotency_key)
+        expenses_collection = await get_collection("expenses")
+        original = await expenses_collection.find_one({
+            "user_id": ObjectId(user_id),
+            "idempotency_key": idempotency_key
+        })
+        if original is None and self._archive_reaches(date):
+            # El índice único solo cubre los activos: un gasto con fecha de un mes archivado
+            # puede repetir una clave que ya está en el archivo
+            original = await ArchiveService().find_by_idempotency_key(user_id, idempotency_key)
+        return original
+
+    async def insert_expenses(
+        self,
+        user_id: str,
+        expenses: List[ExpenseCreate],
+        idempotency_keys: Optional[List[Optional[str]]] = None,
+        currency: Optional[str] = None
+    ) -> int:
+        """Insert a batch of expenses with one unordered write, returning how many were inserted
+
+        `currency` is the user's reporting currency, used for expenses without one.
+        """
+        now = datetime.utcnow()
+        currency = currency or get_settings().default_currency
+        documents = []
+        for index, expense_data in enumerate(expenses):
+            expense_dict = expense_data.dict()
+            expense_dict["user_id"] = ObjectId(user_id)
+            expense_dict["currency"] = expense_dict.get("currency") or currency
+            expense_dict["created_at"] = now
+            expense_dict["updated_at"] = now
+            if idempotency_keys and idempotency_keys[index]:
+                expense_dict["idempotency_key"] = idempotency_keys[index]
+            documents.append(expense_dict)
+
+        return len(await self.insert_expense_documents(documents))
+
+    async def insert_expense_documents(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Insert prepared expense documents (possibly of several users) in one unordered write
+
+        Documents whose idempotency_key already exists are skipped, and documents without
+        a currency are in DEFAULT_CURRENCY. Returns the inserted ones.
+        """
+        if not documents:
+            return []
+        expenses_collection = await get_collection("expenses")
+
+        # Un bloque de secuencias por usuario para todo el lote
+        by_user: Dict[str, List[Dict[str, Any]]] = {}
+        for document in documents:
+            by_user.setdefault(str(document["user_id"]), []).append(document)
+
+        if self.bucket_store is None and get_settings().archive_enabled:
+            # Claves ya usadas en meses archivados (p. ej. reimportar un archivo viejo): se omiten.
+            # Solo las de gastos con fecha anterior al corte pueden estar en el archivo
+            archive_service = ArchiveService()
+            cutoff = archive_service.archive_cutoff()
+            for user_id in list(by_user):
+                keys = [
+                    document["idempotency_key"] for document in by_user[user_id]
+                    if document.get("idempotency_key") and naive_utc(document["date"]) < cutoff
+                ]
+                archived_keys = await archive_service.archived_idempotency_keys(user_id, keys)
+                if archived_keys:
+                    by_user[user_id] = [
+                        document for document in by_user[user_id]
+                        if document.get("idempotency_key") not in archived_keys
+                    ]
+                    if not by_user[user_id]:
+                        del by_user[user_id]
+            documents = [document for user_documents in by_user.values() for document in user_documents]
+            if not documents:
+                return []
+        for user_id, user_documents in by_user.items():
+            last_seq = await self._next_sequence(user_id, len(user_documents))
+            for offset, document in enumerate(user_documents):
+                document["seq"] = last_seq - len(user_documents) + 1 + offset
+                document["currency"] = document.get("currency") or get_settings().default_currency
+
+        if self.bucket_store is not None:
+            inserted = await self.bucket_store.insert_documents(documents)
+            await self._record_write(added=inserted)
+            self._audit_bulk_insert(inserted)
+            return inserted
+
+        failed_indexes = set()
+        try:
+            await expenses_collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            # Duplicados por idempotency_key (p. ej. reimportar el mismo archivo) se omiten
+            if any(error.get("code") != 11000 for error in write_errors):
+                for user_id in by_user:
+                    get_stats_cache().invalidate(user_id)
+                raise
+            failed_indexes = {error["index"] for error in write_errors}
+
+        inserted = [doc for index, doc in enumerate(documents) if index not in failed_indexes]
+        await self._record_write(added=inserted)
+        self._audit_bulk_insert(inserted)
+        return inserted
+
+    def _audit_bulk_insert(self, inserted: List[Dict[str, Any]]):
+        # Un evento por usuario y lote, no por documento
+        inserted_by_user: Dict[str, int] = {}
+        for document in inserted:
+            user_id = str(document["user_id"])
+            inserted_by_user[user_id] = inserted_by_user.get(user_id, 0) + 1
+        for user_id, count in inserted_by_user.items():
+            audit_log.record("expense.bulk_insert", user_id, count=count)
+
     async def get_expense_by_id(self, expense_id: str, user_id: str) -> Optional[Expense]:
         """Get expense by ID for a specific user"""
         expenses_collection = await get_collection("expenses")
@@ -34,10 +343,17 @@ class ExpenseService:
         if not ObjectId.is_valid(expense_id):
             return None
 
+        if self.bucket_store is not None:
+            expense_data = await self.bucket_store.find_by_id(user_id, expense_id)
+            return Expense(**expense_data) if expense_data else None
+
         expense_data = await expenses_collection.find_one({
             "_id": ObjectId(expense_id),
             "user_id": ObjectId(user_id)
         })
+        if expense_data is None and get_settings().archive_enabled:
+            # Gastos de meses archivados: se leen del documento del mes
+            expense_data = await ArchiveService().find_archived_expense(user_id, expense_id)
 
         if expense_data:
             return Expense(**expense_data)
@@ -50,13 +366,61 @@ class ExpenseService:
         limit: int = 100,
         category: Optional[str] = None,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        end_date: Optional[datetime] = None,
+        q: Optional[str] = None
     ) -> List[Expense]:
-        """Get user's expenses and incomes with optional filtering"""
-        expenses_collection = await get_collection("expenses")
+        """Get user's expenses and incomes with optional filtering and text search"""
+        if self.bucket_store is not None:
+            entries = await self.bucket_store.find(user_id, skip, limit, category, start_date, end_date, q)
+            return [Expense(**entry) for entry in entries]
 
+        expenses_collection = await get_collection("expenses")
+        filter_query = self._filter_query(user_id, category, start_date, end_date, q)
+
+        def hot_cursor():
+            if q:
+                return (
+                    expenses_collection.find(filter_query, {"score": {"$meta": "textScore"}})
+                    .sort([("score", {"$meta": "textScore"}), ("date", -1)])
+                    .max_time_ms(get_settings().search_max_time_ms)
+                )
+            return expenses_collection.find(filter_query).sort("date", -1)
+
+        page = await hot_cursor().skip(skip).limit(limit).to_list(None)
+        # Archivo frío: solo interviene si el rango llega a meses archivados y la página no
+        # se llenó con filas más nuevas que el corte (los archivados van después de ellas;
+        # con q=, después de todos los resultados rankeados)
+        archive_service = ArchiveService()
+        if not self._archive_reaches(start_date) or (
+            len(page) == limit and (q or page[-1]["date"] >= archive_service.archive_cutoff())
+        ):
+            return [Expense(**expense_doc) for expense_doc in page]
+
+        needed = skip + limit
+        hot = await hot_cursor().limit(needed).to_list(None)
+        archived = await archive_service.get_archived_expenses(
+            user_id, needed, category=category, start_date=start_date, end_date=end_date, q=q
+        )
+        hot_ids = {expense_doc["_id"] for expense_doc in hot}
+        archived = [entry for entry in archived if entry["_id"] not in hot_ids]
+        if q:
+            # Los archivados no tienen puntaje de texto: van después de los resultados rankeados
+            merged = hot + sorted(archived, key=lambda entry: entry["date"], reverse=True)
+        else:
+            merged = sorted(hot + archived, key=lambda entry: entry["date"], reverse=True)
+        return [Expense(**expense_doc) for expense_doc in merged[skip:needed]]
+
+    def _filter_query(
+        self,
+        user_id: str,
+        category: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        q: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Hot collection filter for the get_user_expenses filters"""
         # Filtro base
-        filter_query = {"user_id": ObjectId(user_id)}
+        filter_query: Dict[str, Any] = {"user_id": ObjectId(user_id)}
 
         if category:
             filter_query["category"] = {"$regex": category, "$options": "i"}
@@ -69,12 +433,80 @@ class ExpenseService:
                 date_filter["$lte"] = end_date
             filter_query["date"] = date_filter
 
-        cursor = expenses_collection.find(filter_query).sort("date", -1).skip(skip).limit(limit)
-        expenses = []
-        async for expense_doc in cursor:
-            expenses.append(Expense(**expense_doc))
+        if q:
+            # El índice de texto tiene user_id como prefijo: la búsqueda queda acotada al usuario
+            filter_query["$text"] = {"$search": q}
+        return filter_query
 
-        return expenses
+    async def count_user_expenses(
+        self,
+        user_id: str,
+        category: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        q: Optional[str] = None
+    ) -> int:
+        """Number of expenses matching the get_user_expenses filters (same time limit for q=)"""
+        if self.bucket_store is not None:
+            return await self.bucket_store.count_matching(user_id, category, start_date, end_date, q)
+
+        expenses_collection = await get_collection("expenses")
+        options = {"maxTimeMS": get_settings().search_max_time_ms} if q else {}
+        hot = await expenses_collection.count_documents(
+            self._filter_query(user_id, category, start_date, end_date, q), **options
+        )
+        if not self._archive_reaches(start_date):
+            return hot
+        archived = await ArchiveService().get_archived_expenses(
+            user_id, sys.maxsize, category=category, start_date=start_date, end_date=end_date, q=q
+        )
+        if not archived:
+            return hot
+        # Una ejecución del archivador cortada a la mitad deja filas en ambos lados
+        duplicated = await expenses_collection.count_documents(
+            {"_id": {"$in": [entry["_id"] for entry in archived]}}
+        )
+        return hot + len(archived) - duplicated
+
+    async def iter_expenses(
+        self,
+        user_id: str,
+        start_date: datetime,
+        end_date: datetime,
+        batch_size: int = 1000
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Stream a user's expense documents within a date range in batches
+
+        Rows come from a cursor, a batch at a time; archived months come first as a
+        whole, so order across tiers is not guaranteed.
+        """
+        if self.bucket_store is not None:
+            cursor = self.bucket_store.iter_entries(user_id, start_date, end_date, batch_size)
+            seen = set()
+        else:
+            archived = await ArchiveService().get_archived_expenses(
+                user_id, sys.maxsize, start_date=start_date, end_date=end_date
+            ) if self._archive_reaches(start_date) else []
+            for offset in range(0, len(archived), batch_size):
+                yield archived[offset:offset + batch_size]
+            # Una ejecución del archivador cortada a la mitad deja filas en ambos lados
+            seen = {entry["_id"] for entry in archived}
+            expenses_collection = await get_collection("expenses")
+            cursor = expenses_collection.find({
+                "user_id": ObjectId(user_id),
+                "date": {"$gte": start_date, "$lte": end_date}
+            }).sort("date", 1).batch_size(batch_size)
+
+        batch: List[Dict[str, Any]] = []
+        async for document in cursor:
+            if document["_id"] in seen:
+                continue
+            batch.append(document)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
 
     async def update_expense(
         self, 
@@ -93,12 +525,31 @@ class ExpenseService:
             return None
 
         update_data = expense_update.dict(exclude_unset=True)
+        if "currency" in update_data and not update_data["currency"]:
+            del update_data["currency"]
         if update_data:
+            update_data["seq"] = await self._next_sequence(user_id)
             update_data["updated_at"] = datetime.utcnow()
 
-            await expenses_collection.update_one(
-                {"_id": ObjectId(expense_id)},
-                {"$set": update_data}
+            if self.bucket_store is not None:
+                old_entry = await self.bucket_store.find_by_id(user_id, expense_id)
+                await self.bucket_store.replace(old_entry, {**old_entry, **update_data})
+            else:
+                expense_filter = {"_id": ObjectId(expense_id), "user_id": ObjectId(user_id)}
+                result = await expenses_collection.update_one(expense_filter, {"$set": update_data})
+                if not result.matched_count and get_settings().archive_enabled:
+                    # Gasto archivado: vuelve al activo y se edita ahí (el archivador lo
+                    # devuelve a su mes en la siguiente pasada si su fecha sigue siendo vieja)
+                    await ArchiveService().restore_expense(user_id, expense_id)
+                    await expenses_collection.update_one(expense_filter, {"$set": update_data})
+
+            # Monto, categoría, fecha o tipo pueden cambiar: se descuenta el viejo y se suma el nuevo
+            old_doc = existing_expense.dict()
+            await self._record_write(added=[{**old_doc, **update_data}], removed=[old_doc])
+            audit_log.record(
+                "expense.update", user_id,
+                expense_id=expense_id,
+                fields=sorted(expense_update.dict(exclude_unset=True))
             )
 
         return await self.get_expense_by_id(expense_id, user_id)
@@ -110,20 +561,109 @@ class ExpenseService:
         if not ObjectId.is_valid(expense_id):
             return False
 
-        result = await expenses_collection.delete_one({
-            "_id": ObjectId(expense_id),
-            "user_id": ObjectId(user_id)
-        })
+        # find_one_and_delete devuelve el documento: el presupuesto se ajusta sin otra lectura
+        if self.bucket_store is not None:
+            deleted = await self.bucket_store.delete(user_id, expense_id)
+        else:
+            expense_filter = {"_id": ObjectId(expense_id), "user_id": ObjectId(user_id)}
+            deleted = await expenses_collection.find_one_and_delete(expense_filter)
+            if (
+                deleted is None
+                and get_settings().archive_enabled
+                and await ArchiveService().restore_expense(user_id, expense_id)
+            ):
+                # Gasto archivado: su mes se reescribe sin él y se borra del activo
+                deleted = await expenses_collection.find_one_and_delete(expense_filter)
+        if deleted is not None:
+            await self._record_write(removed=[deleted])
+            audit_log.record("expense.delete", user_id, expense_id=expense_id)
+
+            # Tombstone so delta sync clients learn about the deletion
+            tombstones_collection = await get_collection("expense_tombstones")
+            seq = await self._next_sequence(user_id)
+            await tombstones_collection.insert_one({
+                "user_id": ObjectId(user_id),
+                "expense_id": ObjectId(expense_id),
+                "seq": seq,
+                "deleted_at": datetime.utcnow()
+            })
+
+        return deleted is not None
+
+    async def get_changes(
+        self,
+        user_id: str,
+        since_token: Optional[str] = None,
+        limit: int = 500
+    ) -> Dict[str, Any]:
+        """Get expenses upserted and deleted since a sync token"""
+        settings = get_settings()
+        now = datetime.utcnow()
+
+        position = decode_sync_token(since_token) if since_token else None
+        retention = timedelta(days=settings.tombstone_retention_days)
+        if position is None or position[1] < now - retention:
+            # Sin token válido (o tombstones ya expirados): el cliente recarga la lista completa
+            current = await self.get_current_sequence(user_id)
+            return {
+                "upserts": [],
+                "deleted": [],
+                "next_token": encode_sync_token(current, now),
+                "has_more": False,
+                "reset": True
+            }
+
+        since, issued_at = position
+        expenses_collection = await get_collection("expenses")
+        tombstones_collection = await get_collection("expense_tombstones")
+        changes_query = {"user_id": ObjectId(user_id), "seq": {"$gt": since}}
 
-        return result.deleted_count > 0
+        if self.bucket_store is not None:
+            expense_docs = await self.bucket_store.find_changed(user_id, since, limit + 1)
+        else:
+            expense_docs = await expenses_collection.find(changes_query).sort("seq", 1).limit(limit + 1).to_list(None)
+        tombstones = await tombstones_collection.find(changes_query).sort("seq", 1).limit(limit + 1).to_list(None)
+        return page_changes(expense_docs, tombstones, since, issued_at, limit, now)
 
     async def get_expense_stats(
         self, 
         user_id: str,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        end_date: Optional[datetime] = None,
+        currency: Optional[str] = None
     ) -> Dict[str, Any]:
-        """Get total stats for both income and expenses"""
+        """Get total stats for both income and expenses (coalesced and briefly cached)
+
+        Amounts are converted to `currency`; callers pass the user's reporting currency,
+        which they already have, so a cache hit costs no query.
+        """
+        currency = currency or get_settings().default_currency
+        return await get_stats_cache().get_or_compute(
+            user_id,
+            # Con la versión de la tabla, un cambio de tasas no sirve totales viejos
+            ("stats", start_date, end_date, currency, get_fx_table().version),
+            lambda: self._compute_expense_stats(user_id, start_date, end_date, currency)
+        )
+
+    async def _compute_expense_stats(
+        self, 
+        user_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        currency: Optional[str] = None
+    ) -> Dict[str, Any]:
+        currency = currency or get_settings().default_currency
+        fx = get_fx_table()
+        if self.bucket_store is not None:
+            income_total, expense_total = await self.bucket_store.type_totals(user_id, start_date, end_date, currency)
+            return {
+                "income_total": income_total,
+                "expense_total": expense_total,
+                "balance": income_total - expense_total,
+                "currency": currency,
+                "fx_version": fx.version
+            }
+
         expenses_collection = await get_collection("expenses")
 
         filter_query = {"user_id": ObjectId(user_id)}
@@ -142,7 +682,8 @@ class ExpenseService:
             {
                 "$group": {
                     "_id": "$type",  # Agrupamos por tipo (income / expense)
-                    "total_amount": {"$sum": "$amount"},
+                    # Cada monto se convierte en el servidor antes de sumar
+                    "total_amount": {"$sum": fx.amount_expr(currency)},
                     "count": {"$sum": 1}
                 }
             }
@@ -150,30 +691,55 @@ class ExpenseService:
 
         result = await expenses_collection.aggregate(pipeline).to_list(None)
 
-        income_total = 0
-        expense_total = 0
+        income_total = expense_total = 0.0
+        if self._archive_reaches(start_date):
+            # Los meses archivados aportan sus totales precalculados
+            archived, _ = await ArchiveService().get_archived_totals(user_id, start_date, end_date, currency)
+            income_total = archived["income_total"]
+            expense_total = archived["expense_total"]
 
         for r in result:
             if r["_id"] == "income":
-                income_total = r["total_amount"]
+                income_total += r["total_amount"]
             elif r["_id"] == "expense":
-                expense_total = r["total_amount"]
+                expense_total += r["total_amount"]
 
         balance = income_total - expense_total
 
         return {
             "income_total": income_total,
             "expense_total": expense_total,
-            "balance": balance
+            "balance": balance,
+            "currency": currency,
+            "fx_version": fx.version
         }
 
     async def get_expenses_by_category(
         self, 
         user_id: str,
         start_date: Optional[datetime] = None,
-        end_date: Optional[datetime] = None
+        end_date: Optional[datetime] = None,
+        currency: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Get expenses grouped by category (coalesced and briefly cached), converted to `currency`"""
+        currency = currency or get_settings().default_currency
+        return await get_stats_cache().get_or_compute(
+            user_id,
+            ("by_category", start_date, end_date, currency, get_fx_table().version),
+            lambda: self._compute_expenses_by_category(user_id, start_date, end_date, currency)
+        )
+
+    async def _compute_expenses_by_category(
+        self, 
+        user_id: str,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        currency: Optional[str] = None
     ) -> List[Dict[str, Any]]:
-        """Get expenses grouped by category"""
+        currency = currency or get_settings().default_currency
+        if self.bucket_store is not None:
+            return await self.bucket_store.category_totals(user_id, start_date, end_date, currency)
+
         expenses_collection = await get_collection("expenses")
 
         filter_query = {"user_id": ObjectId(user_id), "type": "expense"}
@@ -191,7 +757,7 @@ class ExpenseService:
             {
                 "$group": {
                     "_id": "$category",
-                    "total_amount": {"$sum": "$amount"},
+                    "total_amount": {"$sum": get_fx_table().amount_expr(currency)},
                     "count": {"$sum": 1}
                 }
             },
@@ -200,16 +766,59 @@ class ExpenseService:
 
         result = await expenses_collection.aggregate(pipeline).to_list(None)
 
-        return [
-            {
-                "category": item["_id"],
-                "total_amount": item["total_amount"],
-                "count": item["count"]
-            }
-            for item in result
-        ]
+        archived = {}
+        if self._archive_reaches(start_date):
+            _, archived = await ArchiveService().get_archived_totals(user_id, start_date, end_date, currency)
+        if not archived:
+            return [
+                {
+                    "category": item["_id"],
+                    "total_amount": item["total_amount"],
+                    "count": item["count"]
+                }
+                for item in result
+            ]
+
+        categories = {name: {"total_amount": value["total"], "count": value["count"]} for name, value in archived.items()}
+        for item in result:
+            category = categories.setdefault(item["_id"], {"total_amount": 0.0, "count": 0})
+            category["total_amount"] += item["total_amount"]
+            category["count"] += item["count"]
+        return sorted(
+            ({"category": name, **value} for name, value in categories.items()),
+            key=lambda item: item["total_amount"],
+            reverse=True
+        )
+
+    async def list_all_expenses(
+        self,
+        limit: int = 50,
+        before: Optional[str] = None,
+        user_id: Optional[str] = None
+    ) -> List[Expense]:
+        """List expenses of every user, newest first, starting before a keyset cursor"""
+        if self.bucket_store is not None:
+            return [Expense(**entry) for entry in await self.bucket_store.find_all(limit, before, user_id)]
+
+        expenses_collection = await get_collection("expenses")
+
+        filter_query: Dict[str, Any] = {}
+        if user_id:
+            filter_query["user_id"] = ObjectId(user_id)
+        if before:
+            filter_query["_id"] = {"$lt": ObjectId(before)}
+
+        # Con user_id usa el índice (user_id, _id); sin él, el índice _id
+        cursor = expenses_collection.find(filter_query).sort("_id", -1).limit(limit)
+        return [Expense(**expense) async for expense in cursor]
 
     async def get_total_expenses_count(self, user_id: str) -> int:
         """Get total number of expenses for a user"""
+        if self.bucket_store is not None:
+            return await self.bucket_store.count(user_id)
+
         expenses_collection = await get_collection("expenses")
-        return await expenses_collection.count_documents({"user_id": ObjectId(user_id)})
+        hot = await expenses_collection.count_documents({"user_id": ObjectId(user_id)})
+        if not get_settings().archive_enabled:
+            return hot
+        return hot + await ArchiveService().get_archived_count(user_id)
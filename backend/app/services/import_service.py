@@ -0,0 +1,231 @@
+import csv
+import hashlib
+import os
+import re
+import tempfile
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from app.schemas.expense import ExpenseCreate
+from app.services.expense_service import ExpenseService
+from app.utils.jobs import Job, jobs
+from app.config.settings import get_settings
+
+# Accepted CSV header names (lowercase) for each expense field
+CSV_COLUMNS = {
+    "date": ("date", "fecha"),
+    "title": ("title", "titulo", "título", "concepto", "name"),
+    "amount": ("amount", "monto", "valor", "importe"),
+    "category": ("category", "categoria", "categoría"),
+    "description": ("description", "descripcion", "descripción", "memo", "nota"),
+    "type": ("type", "tipo"),
+}
+
+INCOME_TYPES = {"income", "ingreso", "credit", "credito", "crédito", "dep", "deposit", "int", "div"}
+EXPENSE_TYPES = {"expense", "gasto", "debit", "debito", "débito", "payment", "pos", "atm", "fee", "check"}
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+OFX_READ_CHARS = 64 * 1024
+
+# (line number, canonical row, idempotency key)
+ImportRow = Tuple[int, Dict[str, str], Optional[str]]
+
+
+def iter_csv_rows(file) -> Iterator[ImportRow]:
+    """Yield rows of a CSV statement one at a time"""
+    sample = file.read(4096)
+    file.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+
+    reader = csv.reader(file, dialect)
+    header = next(reader, None)
+    if header is None:
+        return
+    aliases = {alias: field for field, names in CSV_COLUMNS.items() for alias in names}
+    fields = [aliases.get(name.strip().lower()) for name in header]
+    if "amount" not in fields:
+        raise ValueError("El CSV no tiene columna de monto (amount/monto/valor)")
+
+    # Identical rows get different keys by occurrence, so reimports skip them all
+    occurrences: Dict[str, int] = {}
+    for values in reader:
+        if not any(v.strip() for v in values):
+            continue
+        row = {field: value.strip() for field, value in zip(fields, values) if field}
+        digest = hashlib.sha1(repr(sorted(row.items())).encode()).hexdigest()
+        occurrences[digest] = occurrences.get(digest, 0) + 1
+        yield reader.line_num, row, f"csv:{digest}:{occurrences[digest]}"
+
+
+def _ofx_tokens(file) -> Iterator[Tuple[str, str]]:
+    """Yield (TAG, value) pairs from SGML (OFX 1.x) or XML (OFX 2.x) statements"""
+    buffer = ""
+    while True:
+        chunk = file.read(OFX_READ_CHARS)
+        if not chunk:
+            break
+        buffer += chunk
+        parts = buffer.split("<")
+        # The last part may be cut in the middle of a tag
+        buffer = parts.pop()
+        for part in parts:
+            tag, _, value = part.partition(">")
+            yield tag.strip().upper(), value.strip()
+    if buffer:
+        tag, _, value = buffer.partition(">")
+        yield tag.strip().upper(), value.strip()
+
+
+def iter_ofx_rows(file) -> Iterator[ImportRow]:
+    """Yield transactions of an OFX statement one at a time"""
+    transaction: Optional[Dict[str, str]] = None
+    count = 0
+    for tag, value in _ofx_tokens(file):
+        if tag == "STMTTRN":
+            transaction = {}
+        elif tag == "/STMTTRN" and transaction is not None:
+            count += 1
+            fitid = transaction.get("FITID")
+            yield count, {
+                "date": transaction.get("DTPOSTED", ""),
+                "title": transaction.get("NAME") or transaction.get("MEMO", ""),
+                "amount": transaction.get("TRNAMT", ""),
+                "description": transaction.get("MEMO", ""),
+                "type": transaction.get("TRNTYPE", ""),
+            }, f"ofx:{fitid}" if fitid else None
+            transaction = None
+        elif transaction is not None and not tag.startswith("/") and value:
+            transaction[tag] = value
+
+
+def _parse_amount(value: str) -> float:
+    cleaned = re.sub(r"[^\d,.\-+]", "", value or "")
+    if "," in cleaned and "." in cleaned:
+        # El último separador es el decimal: 1.234,56 o 1,234.56
+        if cleaned.rfind(",") > cleaned.rfind("."):
+            cleaned = cleaned.replace(".", "").replace(",", ".")
+        else:
+            cleaned = cleaned.replace(",", "")
+    elif "," in cleaned:
+        decimals = cleaned.rsplit(",", 1)[1]
+        cleaned = cleaned.replace(",", ".") if len(decimals) <= 2 else cleaned.replace(",", "")
+    if not cleaned:
+        raise ValueError("monto vacío")
+    return float(cleaned)
+
+
+def _parse_date(value: str) -> datetime:
+    value = (value or "").strip()
+    if not value:
+        return datetime.utcnow()
+    if re.fullmatch(r"\d{8}(\d{6})?.*", value):
+        # Formato OFX: AAAAMMDD[HHMMSS[.XXX][zona]]
+        digits = re.match(r"\d+", value).group()
+        return datetime.strptime(digits[:14], "%Y%m%d%H%M%S" if len(digits) >= 14 else "%Y%m%d")
+    for date_format in ("%d/%m/%Y", "%d-%m-%Y", "%d/%m/%y"):
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            pass
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+
+
+def _to_expense(row: Dict[str, str], default_category: str) -> ExpenseCreate:
+    """Validate an imported row against ExpenseCreate"""
+    amount = _parse_amount(row.get("amount", ""))
+    row_type = row.get("type", "").lower()
+    if row_type in INCOME_TYPES:
+        expense_type = "income"
+    elif row_type in EXPENSE_TYPES:
+        expense_type = "expense"
+    else:
+        # Extractos bancarios: los cargos vienen en negativo
+        expense_type = "expense" if amount < 0 else "income"
+
+    title = row.get("title") or row.get("description") or "Movimiento importado"
+    return ExpenseCreate(
+        title=title[:100],
+        amount=abs(amount),
+        category=(row.get("category") or default_category)[:50],
+        description=row.get("description", "")[:500] or None,
+        date=_parse_date(row.get("date", "")),
+        type=expense_type
+    )
+
+
+def _error_message(error: Exception) -> str:
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in error.errors()
+        )
+    return str(error)
+
+
+def _take_chunk(rows: Iterator[ImportRow], size: int, default_category: str, job: Job):
+    """Parse and validate up to `size` rows (runs in a worker thread)"""
+    expenses: List[ExpenseCreate] = []
+    keys: List[Optional[str]] = []
+    processed = 0
+    for line_no, row, key in rows:
+        processed += 1
+        try:
+            expenses.append(_to_expense(row, default_category))
+            keys.append(key)
+        except ValueError as e:
+            job.progress["failed"] += 1
+            job.add_error(f"Fila {line_no}: {_error_message(e)}")
+        if processed >= size:
+            break
+    return expenses, keys, processed
+
+
+class ImportService:
+    """Service for bulk import of bank statements"""
+
+    async def save_upload(self, upload: UploadFile) -> str:
+        """Copy an upload to a temporary file in fixed-size chunks and return its path"""
+        settings = get_settings()
+        fd, path = tempfile.mkstemp(prefix="import-", suffix=os.path.splitext(upload.filename or "")[1])
+        size = 0
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while chunk := await upload.read(UPLOAD_CHUNK_BYTES):
+                    size += len(chunk)
+                    if size > settings.import_max_bytes:
+                        raise ValueError("File too large")
+                    await run_in_threadpool(out.write, chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+        return path
+
+    async def start_import(self, user_id: str, path: str, file_format: str, currency: Optional[str] = None) -> Job:
+        """Start a background import job for a saved upload (amounts in `currency`, the user's reporting currency)"""
+        job = Job(user_id, "import")
+        job.progress = {"processed": 0, "inserted": 0, "skipped": 0, "failed": 0}
+        return await jobs.start(job, lambda job: self._run_import(job, path, file_format, currency))
+
+    async def _run_import(self, job: Job, path: str, file_format: str, currency: Optional[str]):
+        settings = get_settings()
+        expense_service = ExpenseService()
+        try:
+            with open(path, newline="", encoding="utf-8-sig", errors="replace") as file:
+                rows = iter_ofx_rows(file) if file_format == "ofx" else iter_csv_rows(file)
+                while True:
+                    expenses, keys, processed = await run_in_threadpool(
+                        _take_chunk, rows, settings.import_chunk_size, settings.import_default_category, job
+                    )
+                    if not processed:
+                        break
+                    inserted = await expense_service.insert_expenses(job.user_id, expenses, keys, currency)
+                    job.progress["processed"] += processed
+                    job.progress["inserted"] += inserted
+                    job.progress["skipped"] += len(expenses) - inserted
+        finally:
+            os.remove(path)
+        return dict(job.progress)
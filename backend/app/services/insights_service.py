@@ -0,0 +1,298 @@
+import time
+from itertools import chain
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+from bson import ObjectId
+from fastapi.concurrency import run_in_threadpool
+from pymongo import ReplaceOne
+from app.config.settings import get_settings
+from app.database.mongodb import get_collection
+from app.models.user import User
+from app.utils.dates import month_key, month_bounds
+from app.utils.fx import get_fx_table
+
+# Document of insights_state holding the progress of the nightly pass
+NIGHTLY_STATE_ID = "nightly"
+MS_PER_DAY = 24 * 60 * 60 * 1000
+
+
+def _build_documents(
+    users: List[Dict[str, Any]],
+    series: List[Dict[str, Any]],
+    now: datetime
+) -> List[Dict[str, Any]]:
+    """Vectorized insights for a batch of users (runs in a worker thread)
+
+    `series` holds one entry per user with expenses: the categories of its groups, the
+    length of each group and flat columns ordered by group (expense ids as strings, days
+    since the start of the history window and amounts in DEFAULT_CURRENCY). Returns one
+    insights document per user; anomaly titles and dates are filled in afterwards.
+    """
+    # Importación diferida: numpy solo se carga cuando se calculan insights
+    import numpy as np
+    from app.utils.insights import compute_insights
+
+    settings = get_settings()
+    fx = get_fx_table()
+    month = month_key(now)
+    month_start, month_end = month_bounds(month)
+    days_elapsed = (now - month_start).days + 1
+    days_in_month = (month_end - month_start).days
+
+    currencies = [user.get("reporting_currency") or settings.default_currency for user in users]
+    documents = [
+        {
+            "_id": user["_id"],
+            "month": month,
+            "currency": currencies[index],
+            "fx_version": fx.version,
+            "spent_to_date": 0.0,
+            "projected_total": 0.0,
+            "categories": [],
+            "anomalies": [],
+            "generated_at": now,
+        }
+        for index, user in enumerate(users)
+    ]
+    if not series:
+        return documents
+
+    # Cada categoría de cada usuario es un grupo; sus filas van seguidas en las columnas
+    user_index = {user["_id"]: index for index, user in enumerate(users)}
+    categories = list(chain.from_iterable(item["categories"] for item in series))
+    group_user = np.repeat(
+        np.array([user_index[item["_id"]] for item in series], dtype=np.int64),
+        [len(item["categories"]) for item in series]
+    )
+    lengths = np.fromiter(
+        chain.from_iterable(item["lengths"] for item in series), dtype=np.int64, count=len(categories)
+    )
+    total = int(lengths.sum())
+    groups = np.repeat(np.arange(len(categories)), lengths)
+    # Los montos llegan en la moneda por defecto; cada usuario los ve en la suya
+    user_factor = np.array([fx.factor(settings.default_currency, currency) for currency in currencies])
+    amount = np.fromiter(
+        chain.from_iterable(item["amounts"] for item in series), dtype=np.float64, count=total
+    ) * user_factor[group_user][groups]
+    day = np.fromiter(
+        chain.from_iterable(item["days"] for item in series), dtype=np.float64, count=total
+    ).astype(np.int64)
+
+    result = compute_insights(
+        groups, len(categories), day, amount,
+        month_start_day=settings.insights_history_days,
+        days_elapsed=days_elapsed,
+        days_in_month=days_in_month,
+        half_life_days=settings.insights_half_life_days,
+        threshold=settings.insights_anomaly_threshold,
+        min_samples=settings.insights_min_samples
+    )
+
+    # Ensamblar los documentos con listas de Python: indexar arrays escalar por escalar es lento
+    owners = group_user.tolist()
+    month_spent = result["month_spent"].tolist()
+    projected = result["projected"].tolist()
+    for group in np.flatnonzero(result["projected"] > 0).tolist():
+        document = documents[owners[group]]
+        document["spent_to_date"] += month_spent[group]
+        document["projected_total"] += projected[group]
+        document["categories"].append({
+            "category": categories[group],
+            "spent": round(month_spent[group], 2),
+            "projected": round(projected[group], 2),
+        })
+
+    ids = list(chain.from_iterable(item["ids"] for item in series))
+    medians = result["medians"].tolist()
+    for row_number in np.flatnonzero(result["anomalous"]).tolist():
+        group = int(groups[row_number])
+        documents[owners[group]]["anomalies"].append({
+            "expense_id": ids[row_number],
+            "title": None,
+            "category": categories[group],
+            "amount": round(float(amount[row_number]), 2),
+            "typical_amount": round(medians[group], 2),
+            "score": round(float(result["scores"][row_number]), 2),
+            "date": None,
+        })
+
+    for document in documents:
+        document["spent_to_date"] = round(document["spent_to_date"], 2)
+        document["projected_total"] = round(document["projected_total"], 2)
+        document["categories"].sort(key=lambda item: item["projected"], reverse=True)
+        document["anomalies"].sort(key=lambda item: item["score"], reverse=True)
+        del document["anomalies"][settings.insights_max_anomalies:]
+    return documents
+
+
+class InsightsService:
+    """Service for spending forecasts and anomaly flags, precomputed in batches of users"""
+
+    async def _fetch_series(self, user_ids: List[ObjectId], start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """Expenses of a batch of users in [start, end] as flat columns, one document per user
+
+        Mongo does the row-to-column work: it groups by (user, category), then concatenates
+        each user's groups into flat arrays of string ids, day offsets and amounts in
+        DEFAULT_CURRENCY, with the category and length of every group. Decoding numbers and
+        short strings is much cheaper than one ObjectId, title and date per expense; only
+        the flagged expenses are read back in full (see _attach_anomaly_details).
+        """
+        settings = get_settings()
+        match = {"user_id": {"$in": user_ids}, "type": "expense", "date": {"$gte": start, "$lte": end}}
+        columns = ("ids", "days", "amounts")
+        stages = [
+            {"$group": {
+                "_id": {"user_id": "$user_id", "category": "$category"},
+                "ids": {"$push": {"$toString": "$_id"}},
+                "days": {"$push": {"$floor": {"$divide": [{"$subtract": ["$date", start]}, MS_PER_DAY]}}},
+                "amounts": {"$push": get_fx_table().amount_expr(settings.default_currency)},
+            }},
+            {"$group": {
+                "_id": "$_id.user_id",
+                "categories": {"$push": "$_id.category"},
+                "lengths": {"$push": {"$size": "$ids"}},
+                **{column: {"$push": f"${column}"} for column in columns},
+            }},
+            # Una lista por columna y usuario, sin anidar por categoría
+            {"$project": {
+                "categories": 1,
+                "lengths": 1,
+                **{
+                    column: {"$reduce": {
+                        "input": f"${column}",
+                        "initialValue": [],
+                        "in": {"$concatArrays": ["$$value", "$$this"]},
+                    }}
+                    for column in columns
+                },
+            }},
+        ]
+        if settings.expense_storage == "buckets":
+            buckets_collection = await get_collection("expense_buckets")
+            pipeline = [
+                {"$match": {"user_id": {"$in": user_ids}, "end": {"$gt": start}, "start": {"$lte": end}}},
+                {"$unwind": "$entries"},
+                {"$replaceRoot": {"newRoot": "$entries"}},
+                {"$match": match},
+                *stages,
+            ]
+            return await buckets_collection.aggregate(pipeline).to_list(None)
+        # Un rango de fechas por usuario sobre el índice (user_id, date)
+        expenses_collection = await get_collection("expenses")
+        return await expenses_collection.aggregate([{"$match": match}, *stages]).to_list(None)
+
+    async def _attach_anomaly_details(self, documents: List[Dict[str, Any]]):
+        """Fill in the title and date of the flagged expenses, the only rows read in full
+
+        Anomalies whose expense was deleted since the series was read are dropped.
+        """
+        anomalies = {
+            anomaly["expense_id"]: anomaly for document in documents for anomaly in document["anomalies"]
+        }
+        if not anomalies:
+            return
+        ids = [ObjectId(expense_id) for expense_id in anomalies]
+        if get_settings().expense_storage == "buckets":
+            buckets_collection = await get_collection("expense_buckets")
+            rows = await buckets_collection.aggregate([
+                {"$match": {"entries._id": {"$in": ids}}},
+                {"$unwind": "$entries"},
+                {"$match": {"entries._id": {"$in": ids}}},
+                {"$project": {"_id": "$entries._id", "title": "$entries.title", "date": "$entries.date"}},
+            ]).to_list(None)
+        else:
+            expenses_collection = await get_collection("expenses")
+            rows = await expenses_collection.find({"_id": {"$in": ids}}, {"title": 1, "date": 1}).to_list(None)
+
+        for row in rows:
+            anomaly = anomalies[str(row["_id"])]
+            anomaly["title"] = row["title"]
+            anomaly["date"] = row["date"]
+        for document in documents:
+            document["anomalies"] = [anomaly for anomaly in document["anomalies"] if anomaly["date"] is not None]
+
+    async def _store_documents(self, documents: List[Dict[str, Any]]):
+        """Replace the cached insights of a batch of users in one unordered write"""
+        insights_collection = await get_collection("expense_insights")
+        if documents:
+            await insights_collection.bulk_write(
+                [ReplaceOne({"_id": document["_id"]}, document, upsert=True) for document in documents],
+                ordered=False
+            )
+
+    async def compute_for_users(self, users: List[Dict[str, Any]], now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Compute and store the insights of a batch of users (dicts with _id and reporting_currency)"""
+        settings = get_settings()
+        now = now or datetime.utcnow()
+        month_start, _ = month_bounds(month_key(now))
+        series = await self._fetch_series(
+            [user["_id"] for user in users], month_start - timedelta(days=settings.insights_history_days), now
+        )
+        # El cálculo con NumPy corre en un hilo: el event loop sigue atendiendo peticiones
+        documents = await run_in_threadpool(_build_documents, users, series, now)
+        await self._attach_anomaly_details(documents)
+        await self._store_documents(documents)
+        return documents
+
+    async def refresh_due(self, now: Optional[datetime] = None) -> int:
+        """Run (or continue) the nightly pass over every user within the time budget; returns users processed"""
+        settings = get_settings()
+        now = now or datetime.utcnow()
+        state_collection = await get_collection("insights_state")
+        state = await state_collection.find_one({"_id": NIGHTLY_STATE_ID}) or {}
+        today = now.strftime("%Y-%m-%d")
+
+        if state.get("done", True):
+            # Sin pasada a medias: solo se empieza una por día, a partir de la hora configurada
+            if state.get("day") == today or now.hour < settings.insights_hour_utc:
+                return 0
+            state = {"day": today, "cursor": None}
+
+        users_collection = await get_collection("users")
+        started = time.monotonic()
+        deadline = started + settings.insights_time_budget_seconds
+        processed = 0
+        cursor = state.get("cursor")
+        finished = False
+        # Al menos un lote por ejecución, para que la pasada siempre avance
+        while True:
+            query = {"_id": {"$gt": cursor}} if cursor is not None else {}
+            users = await users_collection.find(query, {"reporting_currency": 1}).sort("_id", 1).limit(
+                settings.insights_batch_users
+            ).to_list(None)
+            if not users:
+                finished = True
+                break
+            await self.compute_for_users(users, now)
+            processed += len(users)
+            cursor = users[-1]["_id"]
+            if time.monotonic() >= deadline:
+                break
+
+        await state_collection.replace_one(
+            {"_id": NIGHTLY_STATE_ID},
+            {"day": state["day"], "cursor": cursor, "done": finished, "updated_at": datetime.utcnow()},
+            upsert=True
+        )
+        elapsed = time.monotonic() - started
+        status = "completa" if finished else "continúa en la próxima ejecución"
+        print(f"🔮 Insights de {processed} usuarios en {elapsed:.1f} s (pasada {status})")
+        return processed
+
+    async def get_user_insights(self, user: User) -> Dict[str, Any]:
+        """Cached insights of a user, computed on the spot if missing or stale"""
+        settings = get_settings()
+        now = datetime.utcnow()
+        currency = user.reporting_currency or settings.default_currency
+        insights_collection = await get_collection("expense_insights")
+        cached = await insights_collection.find_one({"_id": ObjectId(user.id)})
+        if (
+            cached
+            and cached["month"] == month_key(now)
+            and cached["currency"] == currency
+            and cached.get("fx_version") == get_fx_table().version
+        ):
+            return cached
+        # Usuario nuevo, cambio de mes o de moneda: se calcula solo para él
+        documents = await self.compute_for_users([{"_id": ObjectId(user.id), "reporting_currency": currency}], now)
+        return documents[0]
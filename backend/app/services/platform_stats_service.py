@@ -0,0 +1,91 @@
+from typing import Dict, Any, List
+from datetime import datetime
+from app.database.mongodb import get_collection
+
+# Single document holding the platform-wide counters
+PLATFORM_STATS_ID = "totals"
+
+COUNTER_FIELDS = ("users", "expenses", "incomes", "expense_total", "income_total")
+
+
+def transaction_counters(expense: Dict[str, Any], sign: int) -> Dict[str, float]:
+    """Counter increments for an expense document (+1 added, -1 removed)"""
+    if expense.get("type", "expense") == "income":
+        return {"incomes": sign, "income_total": sign * abs(expense["amount"])}
+    return {"expenses": sign, "expense_total": sign * abs(expense["amount"])}
+
+
+class PlatformStatsService:
+    """Service for precomputed platform-wide counters"""
+
+    async def increment(self, counters: Dict[str, float]):
+        """Apply counter increments with a single $inc"""
+        counters = {field: value for field, value in counters.items() if value}
+        if not counters:
+            return
+        stats_collection = await get_collection("platform_stats")
+        await stats_collection.update_one(
+            {"_id": PLATFORM_STATS_ID},
+            {"$inc": counters, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+
+    async def record_transactions(self, added: List[Dict[str, Any]], removed: List[Dict[str, Any]]):
+        """Update the counters for expense documents added and removed by one write"""
+        counters: Dict[str, float] = {}
+        for documents, sign in ((added, 1), (removed, -1)):
+            for document in documents:
+                for field, value in transaction_counters(document, sign).items():
+                    counters[field] = counters.get(field, 0) + value
+        await self.increment(counters)
+
+    async def get_totals(self) -> Dict[str, Any]:
+        """Read the counters (one document lookup), rebuilding them only if never initialized"""
+        stats_collection = await get_collection("platform_stats")
+        stats = await stats_collection.find_one({"_id": PLATFORM_STATS_ID})
+        if not stats or not stats.get("initialized"):
+            return await self.rebuild()
+        totals = {field: stats.get(field, 0) for field in COUNTER_FIELDS}
+        totals["updated_at"] = stats.get("updated_at")
+        return totals
+
+    async def rebuild(self) -> Dict[str, Any]:
+        """Recompute the counters from the collections (full scan; for first use and repairs)"""
+        users_collection = await get_collection("users")
+        expenses_collection = await get_collection("expenses")
+        archives_collection = await get_collection("expense_archives")
+        buckets_collection = await get_collection("expense_buckets")
+        stats_collection = await get_collection("platform_stats")
+
+        totals: Dict[str, Any] = {field: 0 for field in COUNTER_FIELDS}
+        totals["users"] = await users_collection.count_documents({})
+        async for group in expenses_collection.aggregate([
+            {"$group": {"_id": "$type", "count": {"$sum": 1}, "total": {"$sum": "$amount"}}}
+        ]):
+            if group["_id"] == "income":
+                totals["incomes"] += group["count"]
+                totals["income_total"] += group["total"]
+            else:
+                totals["expenses"] += group["count"]
+                totals["expense_total"] += group["total"]
+
+        # Los gastos archivados (y los buckets) siguen contando; sus totales ya están en cada mes
+        monthly_totals = [{"$group": {
+            "_id": None,
+            "incomes": {"$sum": "$income_count"},
+            "income_total": {"$sum": "$income_total"},
+            "expenses": {"$sum": "$expense_count"},
+            "expense_total": {"$sum": "$expense_total"}
+        }}]
+        for collection in (archives_collection, buckets_collection):
+            async for group in collection.aggregate(monthly_totals):
+                for field in ("incomes", "income_total", "expenses", "expense_total"):
+                    totals[field] += group[field]
+
+        totals["updated_at"] = datetime.utcnow()
+        await stats_collection.update_one(
+            {"_id": PLATFORM_STATS_ID},
+            {"$set": {**totals, "initialized": True}},
+            upsert=True
+        )
+        return totals
@@ -0,0 +1,136 @@
+import calendar
+from typing import List, Optional, Dict, Any
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import UpdateOne
+from app.models.recurring import RecurringRule
+from app.schemas.recurring import RecurringRuleCreate
+from app.database.mongodb import get_collection
+from app.services.expense_service import ExpenseService
+from app.config.settings import get_settings
+from app.utils.dates import naive_utc
+
+# Occurrences materialized per rule and tick; a rule further behind catches up on later ticks
+MAX_CATCHUP_OCCURRENCES = 100
+
+
+def _add_months(value: datetime, months: int, anchor_day: int) -> datetime:
+    """Add months keeping the anchor day, clamped to the month length (Jan 31 -> Feb 29 -> Mar 31)"""
+    month_index = value.month - 1 + months
+    year = value.year + month_index // 12
+    month = month_index % 12 + 1
+    day = min(anchor_day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+
+def advance(value: datetime, frequency: str, interval: int, anchor_day: int) -> datetime:
+    """Next occurrence after `value` for a rule"""
+    if frequency == "daily":
+        return value + timedelta(days=interval)
+    if frequency == "weekly":
+        return value + timedelta(weeks=interval)
+    if frequency == "monthly":
+        return _add_months(value, interval, anchor_day)
+    return _add_months(value, 12 * interval, anchor_day)
+
+
+class RecurringService:
+    """Service for recurring transaction rules"""
+
+    async def create_rule(self, user_id: str, rule_data: RecurringRuleCreate, currency: Optional[str] = None) -> RecurringRule:
+        """Create a recurring rule (its amount is in `currency`, the user's reporting currency)"""
+        rules_collection = await get_collection("recurring_rules")
+
+        start_date = naive_utc(rule_data.start_date)
+        rule_dict = rule_data.dict(exclude={"start_date"})
+        rule_dict["end_date"] = naive_utc(rule_data.end_date) if rule_data.end_date else None
+        rule_dict.update({
+            "user_id": ObjectId(user_id),
+            "currency": currency or get_settings().default_currency,
+            "anchor_day": start_date.day,
+            "next_run_at": start_date,
+            "active": True,
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        })
+
+        result = await rules_collection.insert_one(rule_dict)
+        rule_dict["_id"] = result.inserted_id
+        return RecurringRule(**rule_dict)
+
+    async def get_user_rules(self, user_id: str) -> List[RecurringRule]:
+        """Get a user's recurring rules"""
+        rules_collection = await get_collection("recurring_rules")
+        cursor = rules_collection.find({"user_id": ObjectId(user_id)}).sort("next_run_at", 1)
+        return [RecurringRule(**rule) async for rule in cursor]
+
+    async def delete_rule(self, rule_id: str, user_id: str) -> bool:
+        """Delete a recurring rule (already materialized expenses are kept)"""
+        rules_collection = await get_collection("recurring_rules")
+
+        if not ObjectId.is_valid(rule_id):
+            return False
+
+        result = await rules_collection.delete_one({
+            "_id": ObjectId(rule_id),
+            "user_id": ObjectId(user_id)
+        })
+        return result.deleted_count > 0
+
+    async def materialize_due(self, now: Optional[datetime] = None) -> int:
+        """Create the expenses of every due rule, in batches; returns how many were created"""
+        rules_collection = await get_collection("recurring_rules")
+        settings = get_settings()
+        expense_service = ExpenseService()
+        now = now or datetime.utcnow()
+        created = 0
+
+        while True:
+            # Solo las reglas vencidas, vía el índice (active, next_run_at)
+            rules = await rules_collection.find(
+                {"active": True, "next_run_at": {"$lte": now}}
+            ).sort("next_run_at", 1).limit(settings.recurring_batch_size).to_list(None)
+            if not rules:
+                break
+
+            documents: List[Dict[str, Any]] = []
+            rule_updates = []
+            for rule in rules:
+                run_at = rule["next_run_at"]
+                end_date = rule.get("end_date")
+                occurrences = 0
+                while run_at <= now and occurrences < MAX_CATCHUP_OCCURRENCES:
+                    if end_date and run_at > end_date:
+                        break
+                    documents.append({
+                        "user_id": rule["user_id"],
+                        "title": rule["title"],
+                        "amount": rule["amount"],
+                        "currency": rule.get("currency"),
+                        "category": rule["category"],
+                        "description": rule.get("description"),
+                        "type": rule["type"],
+                        "date": run_at,
+                        "recurring_rule_id": rule["_id"],
+                        # Misma clave en cada reintento: reiniciar no duplica gastos
+                        "idempotency_key": f"recurring:{rule['_id']}:{run_at:%Y%m%dT%H%M%S}",
+                        "created_at": now,
+                        "updated_at": now
+                    })
+                    occurrences += 1
+                    run_at = advance(run_at, rule["frequency"], rule["interval"], rule["anchor_day"])
+
+                update = {"next_run_at": run_at, "updated_at": now}
+                if end_date and run_at > end_date:
+                    update["active"] = False
+                # The filter on next_run_at makes a concurrent run's update a no-op
+                rule_updates.append(UpdateOne(
+                    {"_id": rule["_id"], "next_run_at": rule["next_run_at"]},
+                    {"$set": update}
+                ))
+
+            # Primero los gastos, luego las reglas: si algo falla entre ambos, se reintenta sin duplicar
+            created += len(await expense_service.insert_expense_documents(documents))
+            await rules_collection.bulk_write(rule_updates, ordered=False)
+
+        return created
@@ -0,0 +1,57 @@
+from typing import Optional, Tuple
+from datetime import datetime, timedelta
+from bson import ObjectId
+from app.database.mongodb import get_collection
+from app.utils.security import create_refresh_token, hash_refresh_token
+from app.config.settings import get_settings
+
+
+class SessionService:
+    """Service for refresh token sessions"""
+
+    async def create_session(self, user_id: str) -> str:
+        """Create a session and return its refresh token"""
+        sessions_collection = await get_collection("sessions")
+        settings = get_settings()
+
+        refresh_token = create_refresh_token()
+        now = datetime.utcnow()
+
+        # Solo se guarda el hash; el TTL index elimina la sesión al expirar
+        await sessions_collection.insert_one({
+            "token_hash": hash_refresh_token(refresh_token),
+            "user_id": ObjectId(user_id),
+            "created_at": now,
+            "expires_at": now + timedelta(days=settings.refresh_token_expire_days)
+        })
+
+        return refresh_token
+
+    async def rotate_session(self, refresh_token: str) -> Optional[Tuple[str, str]]:
+        """Consume a refresh token and issue a new one, returning (user_id, new_refresh_token)"""
+        sessions_collection = await get_collection("sessions")
+
+        # find_one_and_delete es atómico: un token solo puede usarse una vez
+        session = await sessions_collection.find_one_and_delete({
+            "token_hash": hash_refresh_token(refresh_token),
+            "expires_at": {"$gt": datetime.utcnow()}
+        })
+        if not session:
+            return None
+
+        user_id = str(session["user_id"])
+        return user_id, await self.create_session(user_id)
+
+    async def revoke_session(self, refresh_token: str) -> bool:
+        """Revoke the session that owns a refresh token"""
+        sessions_collection = await get_collection("sessions")
+        result = await sessions_collection.delete_one({
+            "token_hash": hash_refresh_token(refresh_token)
+        })
+        return result.deleted_count > 0
+
+    async def revoke_user_sessions(self, user_id: str) -> int:
+        """Revoke every session of a user"""
+        sessions_collection = await get_collection("sessions")
+        result = await sessions_collection.delete_many({"user_id": ObjectId(user_id)})
+        return result.deleted_count
@@ -0,0 +1,138 @@
+import asyncio
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from typing import Any, Dict, Optional
+from fastapi.concurrency import run_in_threadpool
+from app.config.settings import get_settings
+from app.models.user import User
+from app.services.expense_service import ExpenseService
+from app.utils.dates import month_bounds
+from app.utils.fx import get_fx_table
+from app.utils.jobs import Job, jobs
+from app.utils.statement_render import MEDIA_TYPES, render_statement, write_rows_chunk
+
+# Shared across requests (StatementService is created per request)
+_statement_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_statement_pool() -> ProcessPoolExecutor:
+    """Get the per-worker process pool that renders statements"""
+    global _statement_pool
+    if _statement_pool is None:
+        # spawn: un fork copiaría el event loop y los hilos del cliente de MongoDB
+        _statement_pool = ProcessPoolExecutor(
+            max_workers=get_settings().statement_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _statement_pool
+
+
+def shutdown_statement_pool():
+    """Stop the render processes (called from the lifespan)"""
+    global _statement_pool
+    if _statement_pool is not None:
+        _statement_pool.shutdown(wait=False)
+        _statement_pool = None
+
+
+def statement_cache_dir() -> Path:
+    return Path(get_settings().statement_cache_dir or os.path.join(tempfile.gettempdir(), "expense-statements"))
+
+
+class StatementService:
+    """Service for monthly statements rendered in background jobs and cached on disk"""
+
+    async def artifact_path(self, user_id: str, month: str, file_format: str, currency: str) -> Path:
+        """Cache path of a statement for the user's current data version
+
+        Any write of the user bumps their change sequence, which changes the name; the
+        FX table version is part of it too, since totals are converted.
+        """
+        seq = await ExpenseService().get_current_sequence(user_id)
+        version = f"{seq}-{get_fx_table().version}"
+        return statement_cache_dir() / user_id / f"{month}-{currency}-{version}.{file_format}"
+
+    async def start_statement(self, user: User, month: str, file_format: str, currency: str) -> Job:
+        """Start a background job producing a statement artifact"""
+        job = Job(str(user.id), "statement")
+        job.progress = {"rows": 0, "bytes": 0, "cached": 0}
+        return await jobs.start(job, lambda job: self._run_statement(job, user, month, file_format, currency))
+
+    async def _run_statement(
+        self, job: Job, user: User, month: str, file_format: str, currency: str
+    ) -> Dict[str, Any]:
+        result = {"month": month, "format": file_format}
+        # La versión se lee antes que los datos: si cambian a la mitad, el nombre queda viejo
+        # y la siguiente petición vuelve a generarlo
+        path = await self.artifact_path(job.user_id, month, file_format, currency)
+        if path.exists():
+            job.progress["cached"] = 1
+            job.progress["bytes"] = path.stat().st_size
+            return {**result, "path": str(path)}
+
+        settings = get_settings()
+        start, end = month_bounds(month)
+        end = end - timedelta(milliseconds=1)
+        expense_service = ExpenseService()
+        stats, categories = await asyncio.gather(
+            expense_service.get_expense_stats(job.user_id, start, end, currency),
+            expense_service.get_expenses_by_category(job.user_id, start, end, currency)
+        )
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Cada lote del cursor va a su propio archivo: en memoria nunca hay más de un lote,
+        # y al proceso de formateo solo le llegan las rutas
+        chunk_dir = tempfile.mkdtemp(prefix=f"{path.name}.", suffix=".parts", dir=path.parent)
+        try:
+            chunks = []
+            async for batch in expense_service.iter_expenses(job.user_id, start, end, settings.statement_batch_size):
+                rows = [
+                    (
+                        document["date"].isoformat(),
+                        document["title"],
+                        document["category"],
+                        document.get("type", "expense"),
+                        abs(document["amount"]),
+                        document.get("currency") or settings.default_currency,
+                        document.get("description"),
+                    )
+                    for document in batch
+                ]
+                chunk_path = os.path.join(chunk_dir, f"{len(chunks):06d}.jsonl")
+                await run_in_threadpool(write_rows_chunk, chunk_path, rows)
+                chunks.append(chunk_path)
+                job.progress["rows"] += len(rows)
+
+            statement = {
+                "month": month,
+                "user": user.full_name or user.username or user.email,
+                "currency": currency,
+                "totals": stats,
+                "categories": categories,
+                "row_chunks": chunks,
+            }
+            # El formateo ocupa CPU: se hace en otro proceso, que mezcla los lotes por fecha
+            # a medida que escribe; el archivo no vuelve por el pipe
+            loop = asyncio.get_running_loop()
+            job.progress["bytes"] = await loop.run_in_executor(
+                get_statement_pool(), render_statement, file_format, str(path), statement
+            )
+        finally:
+            shutil.rmtree(chunk_dir, ignore_errors=True)
+        self._remove_old_versions(path, month, currency)
+        return {**result, "path": str(path)}
+
+    def _remove_old_versions(self, path: Path, month: str, currency: str):
+        # Los archivos de versiones anteriores del mes ya no se van a servir
+        for old in path.parent.glob(f"{month}-{currency}-*"):
+            # Los .tmp son generaciones en curso: no se tocan
+            if old.suffix[1:] in MEDIA_TYPES and old.stem != path.stem:
+                try:
+                    old.unlink()
+                except OSError:
+                    pass
@@ -0,0 +1,111 @@
+import argparse
+import asyncio
+import sys
+from typing import List, Optional
+
+from pymongo.errors import BulkWriteError
+
+from app.database.mongodb import db, connect_to_mongo, close_mongo_connection
+from app.services.expense_bucket_store import bucket_totals, bucket_currencies, bucket_max_seq
+from app.utils.dates import month_bounds
+
+
+async def to_buckets(batch_months: int) -> int:
+    """Move every expense document into its (user, month) bucket; returns rows moved
+
+    Each month is written before its documents are deleted, merging by _id, so an
+    interrupted run can simply be started again.
+    """
+    expenses_collection = db.database.expenses
+    buckets_collection = db.database.expense_buckets
+    moved = 0
+    while True:
+        months = await expenses_collection.aggregate([
+            {"$group": {"_id": {
+                "user_id": "$user_id",
+                "month": {"$dateToString": {"format": "%Y-%m", "date": "$date"}}
+            }}},
+            {"$limit": batch_months}
+        ]).to_list(None)
+        if not months:
+            return moved
+
+        for item in months:
+            user_id, month = item["_id"]["user_id"], item["_id"]["month"]
+            start, end = month_bounds(month)
+            documents = await expenses_collection.find(
+                {"user_id": user_id, "date": {"$gte": start, "$lt": end}}
+            ).to_list(None)
+
+            bucket_id = f"{user_id}:{month}"
+            existing = await buckets_collection.find_one({"_id": bucket_id})
+            entries = {entry["_id"]: entry for entry in existing["entries"]} if existing else {}
+            for document in documents:
+                document.pop("score", None)
+                entries[document["_id"]] = document
+            merged = list(entries.values())
+
+            await buckets_collection.replace_one(
+                {"_id": bucket_id},
+                {"user_id": user_id, "start": start, "end": end, "entries": merged, **bucket_totals(merged, 1),
+                 "currencies": bucket_currencies(merged), "max_seq": bucket_max_seq(merged)},
+                upsert=True
+            )
+            await expenses_collection.delete_many({"_id": {"$in": [document["_id"] for document in documents]}})
+            moved += len(documents)
+        print(f"📦 {moved} gastos movidos a buckets")
+
+
+async def to_documents(batch_months: int) -> int:
+    """Unpack every bucket back into one document per expense; returns rows moved"""
+    expenses_collection = db.database.expenses
+    buckets_collection = db.database.expense_buckets
+    moved = 0
+    while True:
+        buckets = await buckets_collection.find({}).limit(batch_months).to_list(None)
+        if not buckets:
+            return moved
+
+        for bucket in buckets:
+            if bucket["entries"]:
+                try:
+                    await expenses_collection.insert_many(bucket["entries"], ordered=False)
+                except BulkWriteError as e:
+                    # Los _id ya insertados por una ejecución anterior se omiten
+                    if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                        raise
+            await buckets_collection.delete_one({"_id": bucket["_id"]})
+            moved += len(bucket["entries"])
+        print(f"📄 {moved} gastos movidos a documentos")
+
+
+async def migrate(target: str, batch_months: int) -> int:
+    await connect_to_mongo()
+    try:
+        await db.client.admin.command("ping")
+    except Exception as e:
+        print(f"❌ MongoDB no disponible: {e}")
+        return 1
+    try:
+        if target == "buckets":
+            moved = await to_buckets(batch_months)
+        else:
+            moved = await to_documents(batch_months)
+    finally:
+        await close_mongo_connection()
+    print(f"✅ Migración a '{target}' completa: {moved} gastos")
+    print(f"💡 Configura EXPENSE_STORAGE={target} y reinicia el servidor")
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Convert the stored expenses between the documents and buckets layouts"""
+    parser = argparse.ArgumentParser(description="Migrate expenses between storage layouts")
+    parser.add_argument("--to", dest="target", choices=("buckets", "documents"), required=True)
+    parser.add_argument("--batch-months", type=int, default=200, help="(user, month) groups per pass")
+    args = parser.parse_args(argv)
+    return asyncio.run(migrate(args.target, args.batch_months))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
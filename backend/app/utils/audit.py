@@ -0,0 +1,113 @@
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from bson import ObjectId
+from app.config.settings import get_settings
+from app.utils.metrics import register_metrics
+
+class AuditWriter:
+    """Buffers audit events in memory and writes them in batches from a background task
+
+    Recording never waits on the database: when the queue is full the event is dropped
+    and counted, so a slow or unavailable database cannot stall requests.
+    """
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # Events taken from the queue for the batch being collected
+        self._batch: List[Dict[str, Any]] = []
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def start(self):
+        """Create the queue and start the flush loop (called from the lifespan)"""
+        settings = get_settings()
+        if not settings.audit_enabled or self._task is not None:
+            return
+        # The queue is created here so it belongs to the running event loop
+        self._queue = asyncio.Queue(maxsize=settings.audit_queue_size)
+        self._task = asyncio.create_task(self._loop())
+
+    def record(self, action: str, user_id: Optional[Any] = None, **details: Any):
+        """Queue an audit event without blocking"""
+        if self._queue is None:
+            return
+        event: Dict[str, Any] = {
+            "action": action,
+            "user_id": ObjectId(user_id) if user_id is not None and ObjectId.is_valid(user_id) else None,
+            "timestamp": datetime.utcnow(),
+        }
+        if details:
+            event["details"] = details
+        try:
+            self._queue.put_nowait(event)
+            self.enqueued += 1
+        except asyncio.QueueFull:
+            # Política de descarte: se pierde el evento nuevo y se cuenta
+            self.dropped += 1
+
+    async def _loop(self):
+        settings = get_settings()
+        interval = settings.audit_flush_ms / 1000
+        while True:
+            self._batch.append(await self._queue.get())
+            deadline = time.monotonic() + interval
+            # Se escribe al llenar el lote o al vencer el intervalo, lo que ocurra primero
+            while len(self._batch) < settings.audit_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            batch, self._batch = self._batch, []
+            await self._write(batch)
+
+    async def _write(self, events: List[Dict[str, Any]]):
+        # Importación diferida: mongodb importa este módulo para vaciar la cola al cerrar
+        from app.database.mongodb import get_collection
+
+        if not events:
+            return
+        try:
+            audit_collection = await get_collection("audit_log")
+            await audit_collection.insert_many(events, ordered=False)
+            self.written += len(events)
+            self.batches += 1
+        except Exception as e:
+            self.failed += len(events)
+            print(f"⚠️ Error escribiendo {len(events)} eventos de auditoría: {e}")
+
+    async def stop(self):
+        """Stop the flush loop and write whatever is still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        settings = get_settings()
+        events, self._batch = self._batch, []
+        while self._queue is not None and not self._queue.empty():
+            events.append(self._queue.get_nowait())
+        for start in range(0, len(events), settings.audit_batch_size):
+            await self._write(events[start:start + settings.audit_batch_size])
+        self._queue = None
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+# Global audit writer
+audit_log = AuditWriter()
+register_metrics("audit", audit_log.stats)
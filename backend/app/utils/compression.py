@@ -0,0 +1,157 @@
+import zlib
+from typing import Dict, List, Optional
+from starlette.datastructures import Headers, MutableHeaders
+from app.config.settings import get_settings
+from app.utils.metrics import register_metrics
+
+# Content types that are already compressed (or not worth compressing)
+SKIP_CONTENT_TYPES = ("image/", "video/", "audio/", "application/zip", "application/gzip",
+                      "application/pdf", "application/octet-stream", "text/event-stream")
+
+
+def _load_brotli():
+    """The brotli package is optional: without it only gzip is offered"""
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+
+def accepted_encodings(accept_encoding: str) -> List[str]:
+    """Encodings listed in Accept-Encoding, ignoring those with q=0"""
+    encodings = []
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        if params.replace(" ", "").lower() in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if name:
+            encodings.append(name.strip().lower())
+    return encodings
+
+
+class _Compressor:
+    """Incremental gzip or brotli stream"""
+
+    def __init__(self, encoding: str, brotli_module, gzip_level: int, brotli_quality: int):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli_module.Compressor(quality=brotli_quality)
+        else:
+            # wbits 31: formato gzip (cabecera y CRC) en lugar de zlib crudo
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes, flush: bool) -> bytes:
+        """Compress a chunk; `flush` pushes it to the client without ending the stream"""
+        if self.encoding == "br":
+            return self._brotli.process(data) + (self._brotli.flush() if flush else b"")
+        return self._zlib.compress(data) + (self._zlib.flush(zlib.Z_SYNC_FLUSH) if flush else b"")
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self.encoding == "br":
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing HTTP responses with brotli or gzip above a size threshold
+
+    Complete responses smaller than the threshold go out untouched. Streaming responses
+    (more than one body message) are compressed chunk by chunk and flushed after each one,
+    so exports reach the client progressively instead of being buffered.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        settings = get_settings()
+        self.enabled = settings.compression_enabled
+        self.minimum_size = settings.compression_min_size
+        self.gzip_level = settings.compression_gzip_level
+        self.brotli_quality = settings.compression_brotli_quality
+        self.brotli = _load_brotli()
+        self.responses: Dict[str, int] = {"br": 0, "gzip": 0, "identity": 0}
+        self.bytes_in = 0
+        self.bytes_out = 0
+        register_metrics("compression", self.stats)
+
+    def choose_encoding(self, scope) -> Optional[str]:
+        accept = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+        if self.brotli is not None and "br" in accept:
+            return "br"
+        if "gzip" in accept:
+            return "gzip"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = self.choose_encoding(scope)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        compressor: Optional[_Compressor] = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, compressor, passthrough
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                content_type = headers.get("content-type", "")
+                if "content-encoding" in headers or content_type.startswith(SKIP_CONTENT_TYPES):
+                    passthrough = True
+                    await send(message)
+                else:
+                    # Se espera al primer trozo del cuerpo para decidir
+                    start_message = message
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if compressor is None:
+                if not more_body and len(body) < self.minimum_size:
+                    passthrough = True
+                    self.responses["identity"] += 1
+                    await send(start_message)
+                    await send(message)
+                    return
+                compressor = _Compressor(encoding, self.brotli, self.gzip_level, self.brotli_quality)
+                self.responses[encoding] += 1
+                headers = MutableHeaders(raw=start_message["headers"])
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    # Streaming: el tamaño final no se conoce
+                    del headers["Content-Length"]
+                else:
+                    compressed = compressor.finish(body)
+                    headers["Content-Length"] = str(len(compressed))
+                    self._count(body, compressed)
+                    await send(start_message)
+                    await send({"type": "http.response.body", "body": compressed})
+                    return
+                await send(start_message)
+
+            compressed = compressor.compress(body, flush=True) if more_body else compressor.finish(body)
+            self._count(body, compressed)
+            await send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _count(self, body: bytes, compressed: bytes):
+        self.bytes_in += len(body)
+        self.bytes_out += len(compressed)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "responses": dict(self.responses),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "brotli_available": self.brotli is not None,
+        }
@@ -0,0 +1,17 @@
+from datetime import datetime, timezone
+
+def naive_utc(value: datetime) -> datetime:
+    """Normalize a datetime to naive UTC, as stored by MongoDB"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def month_key(value: datetime) -> str:
+    """Month of a datetime as YYYY-MM (UTC)"""
+    return naive_utc(value).strftime("%Y-%m")
+
+def month_bounds(key: str):
+    """First instant of a YYYY-MM month and of the following one"""
+    start = datetime.strptime(key, "%Y-%m")
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return start, end
@@ -1,8 +1,10 @@
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from typing import Optional
+from app.config.settings import get_settings
 from app.models.user import User
 from app.services.auth_service import AuthService
+from app.utils.fx import validate_currency
 from app.utils.security import verify_token
 
 # Security scheme
@@ -46,6 +48,28 @@ async def get_current_active_user(
         )
     return current_user
 
+async def get_current_admin_user(
+    current_user: User = Depends(get_current_active_user)
+) -> User:
+    """Get current active user, requiring the admin role"""
+    if current_user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin privileges required"
+        )
+    return current_user
+
+async def get_stats_currency(
+    currency: Optional[str] = Query(None, description="Currency of the totals (defaults to the user's reporting currency)"),
+    current_user: User = Depends(get_current_active_user)
+) -> str:
+    """Currency for stats: the requested one, else the user's reporting currency"""
+    try:
+        currency = validate_currency(currency)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return currency or current_user.reporting_currency or get_settings().default_currency
+
 async def get_optional_current_user(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security)
 ) -> Optional[User]:
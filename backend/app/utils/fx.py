@@ -0,0 +1,78 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, Optional
+from app.config.settings import get_settings
+from app.utils.metrics import register_metrics
+
+# Bundled sample table; FX_RATES_PATH points to the real one
+DEFAULT_FX_PATH = Path(__file__).resolve().parent.parent / "data" / "fx_rates.json"
+
+
+class FxTable:
+    """Versioned exchange rates: units of each currency per one unit of the base currency"""
+
+    def __init__(self, version: str, base: str, rates: Dict[str, float]):
+        self.version = version
+        self.base = base
+        self.rates = rates
+
+    def supports(self, currency: str) -> bool:
+        return currency in self.rates
+
+    def factor(self, source: str, target: str) -> float:
+        """Multiplier converting an amount in `source` to `target` (1 for unknown currencies)"""
+        if source == target or source not in self.rates or target not in self.rates:
+            return 1.0
+        return self.rates[target] / self.rates[source]
+
+    def amount_expr(self, target: str, amount: Any = "$amount", currency: Any = "$currency") -> Any:
+        """Aggregation expression converting each document's amount to `target`
+
+        One $switch branch per currency in the table; documents without a currency
+        are in DEFAULT_CURRENCY.
+        """
+        branches = [
+            {"case": {"$eq": ["$$currency", source]}, "then": self.factor(source, target)}
+            for source in self.rates if source != target
+        ]
+        if not branches:
+            return amount
+        return {"$multiply": [amount, {"$let": {
+            "vars": {"currency": {"$ifNull": [currency, get_settings().default_currency]}},
+            "in": {"$switch": {"branches": branches, "default": 1.0}}
+        }}]}
+
+
+def load_fx_table(path: Optional[str] = None) -> FxTable:
+    with open(path or DEFAULT_FX_PATH, encoding="utf-8") as fx_file:
+        data = json.load(fx_file)
+    return FxTable(str(data["version"]), data["base"], {code: float(rate) for code, rate in data["rates"].items()})
+
+
+_fx_table: Optional[FxTable] = None
+
+
+def get_fx_table() -> FxTable:
+    """Get the per-worker FX table, loaded from disk on first use"""
+    global _fx_table
+    if _fx_table is None:
+        _fx_table = load_fx_table(get_settings().fx_rates_path or None)
+        register_metrics("fx", lambda: {"version": _fx_table.version, "currencies": len(_fx_table.rates)})
+    return _fx_table
+
+
+def reload_fx_table() -> FxTable:
+    """Read the FX table again (after replacing the file)"""
+    global _fx_table
+    _fx_table = None
+    return get_fx_table()
+
+
+def validate_currency(currency: Optional[str]) -> Optional[str]:
+    """Pydantic validator: ISO code present in the FX table"""
+    if currency is None:
+        return None
+    currency = currency.upper()
+    if not get_fx_table().supports(currency):
+        raise ValueError(f"Unsupported currency: {currency}")
+    return currency
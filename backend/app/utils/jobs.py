@@ -0,0 +1,166 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.config.settings import get_settings
+from app.database.mongodb import get_collection
+
+class Job:
+    """State of a background job, stored in the jobs collection so any worker can read it"""
+
+    # Errors kept per job; the rest are only counted
+    MAX_ERRORS = 20
+
+    def __init__(self, user_id: str, kind: str):
+        self.id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.kind = kind
+        self.status = "pending"  # pending | running | completed | failed
+        self.progress: Dict[str, int] = {}
+        self.errors: List[str] = []
+        self.result: Any = None
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self.updated_at = self.created_at
+
+    def add_error(self, message: str):
+        if len(self.errors) < self.MAX_ERRORS:
+            self.errors.append(message)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": dict(self.progress),
+            "errors": list(self.errors),
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+    def to_document(self) -> Dict[str, Any]:
+        now = datetime.utcnow()
+        return {
+            "_id": self.id,
+            "user_id": self.user_id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": dict(self.progress),
+            "errors": list(self.errors),
+            "result": self.result,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "updated_at": now,
+            # El índice TTL borra el trabajo este tiempo después de su última actualización
+            "expires_at": now + timedelta(seconds=get_settings().job_retention_seconds),
+        }
+
+    @classmethod
+    def from_document(cls, document: Dict[str, Any]) -> "Job":
+        job = cls(document["user_id"], document["kind"])
+        job.id = document["_id"]
+        job.status = document["status"]
+        job.progress = document.get("progress") or {}
+        job.errors = document.get("errors") or []
+        job.result = document.get("result")
+        job.created_at = document["created_at"]
+        job.finished_at = document.get("finished_at")
+        job.updated_at = document.get("updated_at") or job.created_at
+        return job
+
+class JobRegistry:
+    """Registry of background jobs, scoped per user
+
+    Jobs run as tasks of the worker that started them; their status and progress are
+    saved to the jobs collection when they change state and every
+    JOB_PROGRESS_INTERVAL_SECONDS while running, so the progress endpoints work from any
+    worker and survive restarts. A running job whose worker stopped saving is reported
+    as failed.
+    """
+
+    def __init__(self):
+        # Jobs running in this worker, with their tasks (kept so they are not garbage collected)
+        self._jobs: Dict[str, Job] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def _save(self, job: Job):
+        collection = await get_collection("jobs")
+        await collection.replace_one({"_id": job.id}, job.to_document(), upsert=True)
+
+    async def start(self, job: Job, run: Callable[[Job], Awaitable[Any]]) -> Job:
+        """Save a job and run it in the background"""
+        await self._save(job)
+        self._jobs[job.id] = job
+        self._tasks[job.id] = asyncio.create_task(self._run(job, run))
+        return job
+
+    async def _run(self, job: Job, run: Callable[[Job], Awaitable[Any]]):
+        job.status = "running"
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            job.result = await run(job)
+            job.status = "completed"
+        except asyncio.CancelledError:
+            job.status = "failed"
+            job.add_error("Interrumpido: el servidor se detuvo antes de terminar")
+            raise
+        except Exception as e:
+            job.status = "failed"
+            job.add_error(str(e))
+            print(f"⚠️ Error en trabajo {job.kind} {job.id}: {e}")
+        finally:
+            heartbeat.cancel()
+            await asyncio.gather(heartbeat, return_exceptions=True)
+            job.finished_at = datetime.utcnow()
+            try:
+                await asyncio.shield(self._save(job))
+            except Exception as e:
+                print(f"⚠️ No se pudo guardar el estado del trabajo {job.id}: {e}")
+            self._jobs.pop(job.id, None)
+            self._tasks.pop(job.id, None)
+
+    async def _heartbeat(self, job: Job):
+        interval = get_settings().job_progress_interval_seconds
+        while True:
+            try:
+                await self._save(job)
+            except Exception as e:
+                print(f"⚠️ No se pudo guardar el progreso del trabajo {job.id}: {e}")
+            await asyncio.sleep(interval)
+
+    async def get(self, job_id: str, user_id: str) -> Optional[Job]:
+        """Get a job if it belongs to the user, from this worker or from the jobs collection"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            collection = await get_collection("jobs")
+            document = await collection.find_one({"_id": job_id})
+            if document is None:
+                return None
+            job = Job.from_document(document)
+            if job.status in ("pending", "running") and self._is_stale(job):
+                # El worker que lo ejecutaba terminó sin guardar el resultado
+                job.status = "failed"
+                job.finished_at = job.updated_at
+                job.add_error("Interrumpido: el worker que lo ejecutaba se detuvo")
+        if job.user_id != user_id:
+            return None
+        return job
+
+    def _is_stale(self, job: Job) -> bool:
+        interval = get_settings().job_progress_interval_seconds
+        return datetime.utcnow() - job.updated_at > timedelta(seconds=5 * interval + 10)
+
+    async def drain(self, timeout: float):
+        """Let running jobs finish for up to `timeout` seconds, then cancel the rest (used on shutdown)"""
+        tasks = list(self._tasks.values())
+        if not tasks:
+            return
+        print(f"⏳ Esperando {len(tasks)} trabajos en curso (máximo {timeout:.0f} s)")
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        # Los cancelados guardan su estado como fallidos antes de terminar
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+# Global job registry
+jobs = JobRegistry()
@@ -0,0 +1,42 @@
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from pymongo.errors import DuplicateKeyError
+from app.database.mongodb import get_collection
+
+# Identifies this worker process as a lock owner
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+class LeaderLock:
+    """Lease-based lock in the `locks` collection so only one worker runs a job"""
+
+    def __init__(self, name: str, ttl_seconds: float):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+
+    async def acquire(self) -> bool:
+        """Acquire or renew the lease; False if another worker holds it"""
+        locks_collection = await get_collection("locks")
+        now = datetime.utcnow()
+        try:
+            await locks_collection.find_one_and_update(
+                {
+                    "_id": self.name,
+                    "$or": [{"owner": WORKER_ID}, {"expires_at": {"$lt": now}}]
+                },
+                {"$set": {
+                    "owner": WORKER_ID,
+                    "expires_at": now + timedelta(seconds=self.ttl_seconds)
+                }},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # El documento existe con otro dueño y un lease vigente
+            return False
+        return True
+
+    async def release(self):
+        """Release the lease if this worker holds it"""
+        locks_collection = await get_collection("locks")
+        await locks_collection.delete_one({"_id": self.name, "owner": WORKER_ID})
@@ -0,0 +1,123 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+from app.config.settings import get_settings
+from app.utils.metrics import register_metrics
+
+# Frames of the blocked thread kept per captured stack (innermost last)
+STACK_DEPTH = 25
+
+
+class LoopMonitor:
+    """Measures event-loop lag and, in sampling mode, catches the code that blocks it
+
+    A probe task sleeps for a fixed interval and records how late it wakes up: that
+    delay is the time the loop spent running something else without yielding. In
+    sampling mode a watchdog thread also checks the probe; when it is overdue by more
+    than the threshold, the thread reads the loop thread's current stack with
+    sys._current_frames(), which is the blocking callback caught in the act.
+    """
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        # Último momento en que la sonda durmió; el watchdog lo compara con el reloj
+        self._beat = time.monotonic()
+        self._captured_beat: Optional[float] = None
+        self._stack: Optional[List[str]] = None
+        self._lags: Deque[float] = deque(maxlen=600)
+        self.samples = 0
+        self.stalls = 0
+        self.max_lag_ms = 0.0
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=10)
+
+    def start(self):
+        """Start the probe (and the watchdog in sampling mode); called from the lifespan"""
+        settings = get_settings()
+        if not settings.loop_monitor_enabled or self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._task = asyncio.create_task(self._probe(settings.loop_monitor_interval_ms / 1000))
+        if settings.loop_monitor_sampling:
+            self._stop.clear()
+            self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+            self._watchdog.start()
+
+    async def _probe(self, interval: float):
+        threshold_ms = get_settings().loop_monitor_threshold_ms
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(interval)
+            lag_ms = max(0.0, (time.monotonic() - self._beat - interval) * 1000)
+            self._record(lag_ms, threshold_ms)
+
+    def _record(self, lag_ms: float, threshold_ms: float):
+        self.samples += 1
+        self._lags.append(lag_ms)
+        self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+        if lag_ms < threshold_ms:
+            return
+        self.stalls += 1
+        # La pila la captura el watchdog mientras el bucle sigue bloqueado
+        stack, self._stack = self._stack, None
+        self.recent.append({
+            "at": time.time(),
+            "lag_ms": round(lag_ms, 1),
+            "where": stack[-1].strip().splitlines()[0] if stack else None,
+        })
+        message = f"🐢 Event loop bloqueado {lag_ms:.0f} ms"
+        if stack:
+            message += " en:\n" + "".join(stack).rstrip()
+        print(message)
+
+    def _watch(self):
+        settings = get_settings()
+        interval = settings.loop_monitor_interval_ms / 1000
+        overdue = interval + settings.loop_monitor_threshold_ms / 1000
+        while not self._stop.wait(min(interval, overdue / 4)):
+            beat = self._beat
+            if beat == self._captured_beat or time.monotonic() - beat < overdue:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            # Una sola captura por bloqueo; la sonda la registra al despertar
+            self._captured_beat = beat
+            self._stack = traceback.format_stack(frame, limit=STACK_DEPTH)
+
+    async def stop(self):
+        """Stop the probe and the watchdog"""
+        self._stop.set()
+        if self._watchdog is not None:
+            self._watchdog.join()
+            self._watchdog = None
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        lags = sorted(self._lags)
+        return {
+            "enabled": self._task is not None,
+            "sampling": self._watchdog is not None,
+            "samples": self.samples,
+            "lag_ms": round(self._lags[-1], 1) if self._lags else 0.0,
+            # Percentiles de las últimas muestras (una por intervalo)
+            "p50_ms": round(lags[len(lags) // 2], 1) if lags else 0.0,
+            "p99_ms": round(lags[min(len(lags) - 1, len(lags) * 99 // 100)], 1) if lags else 0.0,
+            "max_ms": round(self.max_lag_ms, 1),
+            "stalls": self.stalls,
+            "recent_stalls": list(self.recent),
+        }
+
+# Global event loop monitor
+loop_monitor = LoopMonitor()
+register_metrics("event_loop", loop_monitor.stats)
@@ -0,0 +1,12 @@
+from typing import Any, Callable, Dict
+
+# Metric providers by name; each returns a dict with its current values
+_providers: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+def register_metrics(name: str, provider: Callable[[], Dict[str, Any]]):
+    """Register a metrics provider exposed through /metrics"""
+    _providers[name] = provider
+
+def collect_metrics() -> Dict[str, Dict[str, Any]]:
+    """Collect the current values of every registered provider"""
+    return {name: provider() for name, provider in _providers.items()}
@@ -0,0 +1,43 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+from app.utils.leader import LeaderLock
+
+class PeriodicTask:
+    """Runs a coroutine function every `interval` seconds, only on the leader worker"""
+
+    def __init__(self, name: str, interval: float, func: Callable[[], Awaitable[None]], leader: bool = True):
+        self.name = name
+        self.interval = interval
+        self.func = func
+        # The lease outlives a few missed ticks before another worker takes over
+        self.lock = LeaderLock(name, ttl_seconds=max(interval * 3, 30)) if leader else None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the background loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """Stop the loop and release the lease"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        if self.lock:
+            try:
+                await self.lock.release()
+            except Exception:
+                pass
+
+    async def _loop(self):
+        while True:
+            try:
+                if self.lock is None or await self.lock.acquire():
+                    await self.func()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Error en tarea periódica {self.name}: {e}")
+            await asyncio.sleep(self.interval)
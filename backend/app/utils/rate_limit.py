@@ -0,0 +1,182 @@
+import fnmatch
+import json
+import math
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+from app.config.settings import get_settings
+from app.utils.metrics import register_metrics
+from app.utils.security import verify_token
+
+# Paths never limited (health checks, docs, metrics)
+EXEMPT_PATHS = ("/health", "/metrics", "/docs", "/redoc", "/openapi.json")
+
+# (allowed, seconds until `cost` tokens are available)
+ConsumeResult = Tuple[bool, float]
+
+
+class MemoryBucketBackend:
+    """Token buckets in this worker's memory, bounded as an LRU"""
+
+    def __init__(self, rate: float, burst: float, max_keys: int = 100000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def consume(self, key: str, cost: float) -> ConsumeResult:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        # El menos usado recientemente es el que más probablemente ya se rellenó
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, 0.0 if allowed else (cost - tokens) / self.rate
+
+    def size(self) -> int:
+        return len(self._buckets)
+
+
+class MongoBucketBackend:
+    """Token buckets in the `rate_limits` collection, shared by every worker
+
+    Refill and consumption happen in one pipeline update, so concurrent workers
+    cannot both spend the same tokens.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+
+    async def consume(self, key: str, cost: float) -> ConsumeResult:
+        from app.database.mongodb import get_collection
+        from pymongo import ReturnDocument
+
+        rate_limits_collection = await get_collection("rate_limits")
+        now = datetime.utcnow()
+        elapsed_seconds = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}
+        bucket = await rate_limits_collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {
+                    "tokens": {"$min": [
+                        self.burst,
+                        {"$add": [{"$ifNull": ["$tokens", self.burst]}, {"$multiply": [elapsed_seconds, self.rate]}]}
+                    ]},
+                    "updated_at": now
+                }},
+                {"$set": {"allowed": {"$gte": ["$tokens", cost]}}},
+                {"$set": {
+                    "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", cost]}, "$tokens"]},
+                    # El TTL borra los buckets que ya estarían llenos
+                    "expires_at": now + timedelta(seconds=self.burst / self.rate)
+                }}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if bucket["allowed"]:
+            return True, 0.0
+        return False, (cost - bucket["tokens"]) / self.rate
+
+    def size(self) -> int:
+        return 0
+
+
+class RateLimitMiddleware:
+    """ASGI middleware applying a token bucket per user (or per IP when anonymous)"""
+
+    def __init__(self, app):
+        self.app = app
+        settings = get_settings()
+        self.enabled = settings.rate_limit_enabled
+        self.trust_forwarded = settings.rate_limit_trust_forwarded
+        # Los patrones se compilan una vez: "METHOD /ruta" con comodines.
+        # Un costo mayor que la ráfaga nunca se podría pagar, así que se recorta
+        self.costs: List[Tuple[str, re.Pattern, float]] = [
+            (pattern, re.compile(fnmatch.translate(pattern)), min(float(cost), settings.rate_limit_burst))
+            for pattern, cost in settings.rate_limit_costs.items()
+        ]
+        if settings.rate_limit_backend == "mongo":
+            self.backend = MongoBucketBackend(settings.rate_limit_rate, settings.rate_limit_burst)
+        else:
+            self.backend = MemoryBucketBackend(settings.rate_limit_rate, settings.rate_limit_burst)
+        self.allowed = 0
+        self.limited = 0
+        self.errors = 0
+        self.limited_by_route: Dict[str, int] = {}
+        register_metrics("rate_limit", self.stats)
+
+    def cost_of(self, method: str, path: str) -> Tuple[str, float]:
+        """Matching pattern and cost of a request (the first match wins; 1 otherwise)"""
+        route = f"{method} {path}"
+        for name, pattern, cost in self.costs:
+            if pattern.match(route):
+                return name, cost
+        return "default", 1.0
+
+    def client_key(self, scope) -> str:
+        """Bucket key: the token's subject when it is valid, the client IP otherwise"""
+        headers = dict(scope.get("headers") or [])
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        if authorization[:7].lower() == "bearer ":
+            try:
+                subject = verify_token(authorization[7:]).get("sub")
+                if subject:
+                    return f"user:{subject}"
+            except Exception:
+                pass
+        if self.trust_forwarded and b"x-forwarded-for" in headers:
+            return "ip:" + headers[b"x-forwarded-for"].decode("latin-1").split(",")[0].strip()
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}"
+
+    async def __call__(self, scope, receive, send):
+        if not self.enabled or scope["type"] != "http" or scope["path"].startswith(EXEMPT_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        route, cost = self.cost_of(scope["method"], scope["path"])
+        try:
+            allowed, retry_after = await self.backend.consume(self.client_key(scope), cost)
+        except Exception as e:
+            # Si el backend compartido falla, se deja pasar la petición
+            self.errors += 1
+            print(f"⚠️ Error en el limitador de peticiones: {e}")
+            allowed, retry_after = True, 0.0
+
+        if allowed:
+            self.allowed += 1
+            await self.app(scope, receive, send)
+            return
+
+        self.limited += 1
+        # Por patrón y no por ruta concreta: las rutas con IDs no multiplican las métricas
+        self.limited_by_route[route] = self.limited_by_route.get(route, 0) + 1
+        body = json.dumps({"detail": "Too many requests"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "errors": self.errors,
+            "buckets": self.backend.size(),
+            "limited_by_route": dict(self.limited_by_route),
+        }
@@ -1,26 +1,144 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
-from jose import JWTError, jwt
-from passlib.context import CryptContext
+from typing import Optional, Tuple
+import hashlib
+import secrets
+import time
 from fastapi import HTTPException, status
 from app.config.settings import get_settings
+from app.utils.metrics import register_metrics
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing context, created on first use so passlib (and its bcrypt
+# backend) is not loaded until an auth route actually needs it
+_pwd_context = None
+
+def get_pwd_context():
+    """Get the password hashing context"""
+    global _pwd_context
+    if _pwd_context is None:
+        _pwd_context = build_pwd_context()
+    return _pwd_context
+
+def build_pwd_context(schemes: Optional[list] = None, bcrypt_rounds: Optional[int] = None):
+    """Build a password hashing context from settings"""
+    from passlib.context import CryptContext
+    settings = get_settings()
+    schemes = schemes or settings.password_schemes
+    bcrypt_rounds = bcrypt_rounds or settings.bcrypt_rounds
+
+    options = dict(settings.password_scheme_options)
+    if "bcrypt" in schemes:
+        # Any other cost is flagged by needs_update, so changing the setting
+        # migrates hashes up or down as users log in
+        options.update({
+            "bcrypt__default_rounds": bcrypt_rounds,
+            "bcrypt__min_rounds": bcrypt_rounds,
+            "bcrypt__max_rounds": bcrypt_rounds,
+        })
+    return CryptContext(schemes=schemes, deprecated="auto", **options)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against its hash"""
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password and return a new hash if the stored one is outdated"""
+    return get_pwd_context().verify_and_update(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
     """Hash a password"""
     # Truncate password to 72 characters for bcrypt compatibility
     if len(password) > 72:
         password = password[:72]
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+# JWT backends: each loader returns (encode, decode, error class)
+def _load_jose():
+    from jose import JWTError, jwt
+    return jwt.encode, jwt.decode, JWTError
+
+def _load_pyjwt():
+    import jwt
+    return jwt.encode, jwt.decode, jwt.PyJWTError
+
+JWT_BACKENDS = {
+    "jose": _load_jose,
+    "pyjwt": _load_pyjwt,
+}
+
+_jwt_backends = {}
+
+def get_jwt_backend(name: Optional[str] = None):
+    """Get (encode, decode, error class) for the configured JWT backend"""
+    name = name or get_settings().jwt_backend
+    if name not in _jwt_backends:
+        if name not in JWT_BACKENDS:
+            raise ValueError(f"Unknown JWT backend: {name}")
+        _jwt_backends[name] = JWT_BACKENDS[name]()
+    return _jwt_backends[name]
+
+class TokenCache:
+    """Bounded LRU of verified token -> claims, keyed by a hash of the token"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[bytes, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[dict]:
+        """Return cached claims if the token was verified before and has not expired"""
+        key = self._key(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        claims, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(claims)
+
+    def put(self, token: str, claims: dict):
+        """Cache verified claims until the token's `exp`"""
+        expires_at = claims.get("exp")
+        if self.maxsize <= 0 or not isinstance(expires_at, (int, float)):
+            return
+        key = self._key(token)
+        self._entries[key] = (dict(claims), expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+_token_cache: Optional[TokenCache] = None
+
+def get_token_cache() -> TokenCache:
+    """Get the process-wide verified token cache"""
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = TokenCache(get_settings().token_cache_size)
+        register_metrics("token_cache", _token_cache.stats)
+    return _token_cache
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
+    encode, _, _ = get_jwt_backend()
     settings = get_settings()
     to_encode = data.copy()
     
@@ -30,22 +148,37 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
         expire = datetime.utcnow() + timedelta(minutes=settings.access_token_expire_minutes)
     
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
+    encoded_jwt = encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
 def verify_token(token: str) -> dict:
     """Verify and decode a JWT token"""
+    cache = get_token_cache()
+    payload = cache.get(token)
+    if payload is not None:
+        return payload
+
+    _, decode, error_class = get_jwt_backend()
     settings = get_settings()
     try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        payload = decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        cache.put(token, payload)
         return payload
-    except JWTError:
+    except error_class:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+def create_refresh_token() -> str:
+    """Create an opaque refresh token"""
+    return secrets.token_urlsafe(32)
+
+def hash_refresh_token(token: str) -> str:
+    """Hash a refresh token for storage (only the hash is persisted)"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
 def get_user_email_from_token(token: str) -> str:
     """Extract user email from JWT token"""
     payload = verify_token(token)
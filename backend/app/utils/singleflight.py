@@ -0,0 +1,104 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+class SingleFlightCache:
+    """Coalesces concurrent identical calls and caches their results briefly, per user"""
+
+    # Purge expired entries (or old invalidations) once this many users are tracked
+    PRUNE_THRESHOLD = 10000
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._results: Dict[str, Dict[Hashable, Tuple[float, Any]]] = {}
+        self._inflight: Dict[str, Dict[Hashable, asyncio.Task]] = {}
+        # Global counter bumped by every invalidate, the value of a user's last invalidate,
+        # and the value when each running computation started
+        self._generation = 0
+        self._invalidated: Dict[str, int] = {}
+        self._started: Dict[asyncio.Task, int] = {}
+        self._prune_invalidations_at = self.PRUNE_THRESHOLD
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    async def get_or_compute(self, user_id: str, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Return a cached result, join an identical in-flight call, or run `compute`"""
+        entry = self._results.get(user_id, {}).get(key)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+
+        inflight = self._inflight.setdefault(user_id, {})
+        task = inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._run(user_id, key, compute))
+            inflight[key] = task
+
+        # shield: a cancelled caller must not cancel the work others are waiting on
+        return await asyncio.shield(task)
+
+    async def _run(self, user_id: str, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        task = asyncio.current_task()
+        started = self._generation
+        self._started[task] = started
+        try:
+            result = await compute()
+        finally:
+            del self._started[task]
+            inflight = self._inflight.get(user_id)
+            if inflight and inflight.get(key) is asyncio.current_task():
+                del inflight[key]
+                if not inflight:
+                    del self._inflight[user_id]
+
+        # A write during the computation makes the result stale: do not cache it
+        if self.ttl > 0 and self._invalidated.get(user_id, started) <= started:
+            if len(self._results) >= self.PRUNE_THRESHOLD:
+                self._prune()
+            self._results.setdefault(user_id, {})[key] = (time.monotonic() + self.ttl, result)
+        return result
+
+    def invalidate(self, user_id: str):
+        """Drop cached and in-flight results for a user after one of their writes"""
+        self._generation += 1
+        self._invalidated[user_id] = self._generation
+        if len(self._invalidated) >= self._prune_invalidations_at:
+            self._prune_invalidations()
+        self._results.pop(user_id, None)
+        # Calls after the write start a fresh computation instead of joining a stale one
+        self._inflight.pop(user_id, None)
+
+    def _prune_invalidations(self):
+        # Only invalidations after the oldest running computation started can still mark a
+        # result stale; older ones are dropped, however many users wrote without reading
+        oldest = min(self._started.values(), default=self._generation)
+        self._invalidated = {
+            user_id: generation
+            for user_id, generation in self._invalidated.items()
+            if generation > oldest
+        }
+        # A long computation can keep many of them alive: the next purge waits for twice as many
+        self._prune_invalidations_at = max(self.PRUNE_THRESHOLD, 2 * len(self._invalidated))
+
+    def _prune(self):
+        now = time.monotonic()
+        for user_id in list(self._results):
+            entries = self._results[user_id]
+            for key in [k for k, (expires_at, _) in entries.items() if expires_at <= now]:
+                del entries[key]
+            if not entries:
+                del self._results[user_id]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "entries": sum(len(entries) for entries in self._results.values()),
+            "in_flight": sum(len(tasks) for tasks in self._inflight.values()),
+            "invalidations": len(self._invalidated),
+        }
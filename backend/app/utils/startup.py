@@ -0,0 +1,77 @@
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Backend root (the directory that contains the `app` package)
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+# Duration in milliseconds of each lifespan phase, in execution order
+lifespan_timings: Dict[str, float] = {}
+
+@contextmanager
+def timed_phase(name: str):
+    """Record how long a lifespan phase takes"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        lifespan_timings[name] = (time.perf_counter() - start) * 1000
+
+def measure_imports(module: str = "app.main") -> List[Tuple[str, float, float]]:
+    """Import a module in a fresh interpreter and return (module, self_ms, cumulative_ms) per import"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {module}:\n{result.stderr}")
+
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    return timings
+
+def measure_import_time(module: str = "app.main") -> float:
+    """Cumulative import time of a module in a fresh interpreter, in milliseconds"""
+    for name, _, cumulative_ms in measure_imports(module):
+        if name == module:
+            return cumulative_ms
+    raise RuntimeError(f"{module} no aparece en el reporte de importación")
+
+async def profile_lifespan(app) -> Dict[str, float]:
+    """Run the application lifespan once and return the recorded phase timings"""
+    lifespan_timings.clear()
+    async with app.router.lifespan_context(app):
+        pass
+    return dict(lifespan_timings)
+
+def print_startup_report(app, module: str = "app.main", top: int = 25):
+    """Print import and lifespan timings for the application"""
+    import asyncio
+    from app.config.settings import get_settings
+
+    settings = get_settings()
+    imports = measure_imports(module)
+    total_ms = next((c for name, _, c in imports if name == module), 0.0)
+
+    print(f"\n📦 Importación de {module}: {total_ms:.1f} ms "
+          f"(presupuesto {settings.startup_budget_ms} ms)")
+    print(f"{'self ms':>10} {'acum. ms':>10}  módulo")
+    for name, self_ms, cumulative_ms in sorted(imports, key=lambda t: t[2], reverse=True)[:top]:
+        print(f"{self_ms:>10.1f} {cumulative_ms:>10.1f}  {name}")
+
+    timings = asyncio.run(profile_lifespan(app))
+    print("\n⏱️ Fases del lifespan:")
+    for phase, elapsed_ms in timings.items():
+        print(f"{elapsed_ms:>10.1f} ms  {phase}")
+
+    if total_ms > settings.startup_budget_ms:
+        print(f"\n⚠️ La importación supera el presupuesto por {total_ms - settings.startup_budget_ms:.1f} ms")
@@ -0,0 +1,189 @@
+import csv
+import heapq
+import html
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+# Runs in the statement process pool: only the standard library is imported here, so
+# starting a worker process is cheap.
+
+# (date ISO, title, category, type, amount, currency, description); the ISO date sorts by time
+STATEMENT_COLUMNS = ("Fecha", "Título", "Categoría", "Tipo", "Monto", "Moneda", "Descripción")
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "html": "text/html",
+    "pdf": "application/pdf",
+}
+
+# PDF: A4 en puntos, Courier 9 (5.4 pt por carácter) para alinear columnas sin medir texto
+PDF_PAGE_WIDTH, PDF_PAGE_HEIGHT = 595, 842
+PDF_MARGIN = 40
+PDF_FONT_SIZE = 9
+PDF_LEADING = 11
+PDF_LINE_CHARS = 95
+
+
+def write_rows_chunk(path: str, rows: List[Sequence[Any]]):
+    """Write one batch of rows, sorted by date, as JSON lines (runs in a worker thread)"""
+    rows = sorted(rows, key=lambda row: row[0])
+    with open(path, "w", encoding="utf-8") as out:
+        out.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
+
+def _read_chunk(path: str) -> Iterator[List[Any]]:
+    with open(path, encoding="utf-8") as chunk:
+        for line in chunk:
+            yield json.loads(line)
+
+
+def iter_rows(chunk_paths: Iterable[str]) -> Iterator[List[Any]]:
+    """Rows of every chunk in date order, merged lazily (one row per chunk in memory)"""
+    return heapq.merge(*(_read_chunk(path) for path in chunk_paths), key=lambda row: row[0])
+
+
+def _amount(value: float) -> str:
+    return f"{value:,.2f}"
+
+
+def _summary_lines(statement: Dict[str, Any]) -> List[str]:
+    totals = statement["totals"]
+    currency = statement["currency"]
+    return [
+        f"Ingresos: {_amount(totals['income_total'])} {currency}",
+        f"Gastos: {_amount(totals['expense_total'])} {currency}",
+        f"Balance: {_amount(totals['balance'])} {currency}",
+    ]
+
+
+def _write_csv(path: str, statement: Dict[str, Any]):
+    with open(path, "w", newline="", encoding="utf-8-sig") as out:
+        writer = csv.writer(out)
+        writer.writerow(["Estado de cuenta", statement["month"], statement["user"]])
+        for line in _summary_lines(statement):
+            writer.writerow(line.split(": ", 1))
+        writer.writerow([])
+        writer.writerow(["Categoría", f"Total ({statement['currency']})", "Movimientos"])
+        for item in statement["categories"]:
+            writer.writerow([item["category"], f"{item['total_amount']:.2f}", item["count"]])
+        writer.writerow([])
+        writer.writerow(STATEMENT_COLUMNS)
+        for date, title, category, kind, amount, currency, description in iter_rows(statement["row_chunks"]):
+            writer.writerow([date[:10], title, category, kind, f"{amount:.2f}", currency, description or ""])
+
+
+def _write_html(path: str, statement: Dict[str, Any]):
+    escape = html.escape
+    with open(path, "w", encoding="utf-8") as out:
+        out.write(
+            "<!DOCTYPE html><html lang=\"es\"><head><meta charset=\"utf-8\">"
+            f"<title>Estado de cuenta {escape(statement['month'])}</title>"
+            "<style>body{font-family:sans-serif;margin:2em}table{border-collapse:collapse;margin:1em 0}"
+            "td,th{border:1px solid #ccc;padding:.3em .6em}td.n{text-align:right}</style></head><body>"
+            f"<h1>Estado de cuenta {escape(statement['month'])}</h1><p>{escape(statement['user'])}</p><ul>"
+        )
+        out.write("".join(f"<li>{escape(line)}</li>" for line in _summary_lines(statement)))
+        out.write(f"</ul><h2>Por categoría</h2><table><tr><th>Categoría</th><th>Total ({escape(statement['currency'])})"
+                  "</th><th>Movimientos</th></tr>")
+        for item in statement["categories"]:
+            out.write(f"<tr><td>{escape(item['category'])}</td><td class=\"n\">{_amount(item['total_amount'])}</td>"
+                      f"<td class=\"n\">{item['count']}</td></tr>")
+        out.write("</table><h2>Movimientos</h2><table><tr>")
+        out.write("".join(f"<th>{column}</th>" for column in STATEMENT_COLUMNS) + "</tr>")
+        for date, title, category, kind, amount, currency, description in iter_rows(statement["row_chunks"]):
+            out.write(
+                f"<tr><td>{date[:10]}</td><td>{escape(title)}</td><td>{escape(category)}</td><td>{kind}</td>"
+                f"<td class=\"n\">{_amount(amount)}</td><td>{currency}</td><td>{escape(description or '')}</td></tr>"
+            )
+        out.write("</table></body></html>")
+
+
+def _pdf_text(line: str) -> bytes:
+    line = line[:PDF_LINE_CHARS].replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return line.encode("cp1252", errors="replace")
+
+
+def _pdf_lines(statement: Dict[str, Any]) -> Iterator[str]:
+    yield f"Estado de cuenta {statement['month']} - {statement['user']}"
+    yield ""
+    yield from _summary_lines(statement)
+    yield ""
+    yield "Por categoría:"
+    for item in statement["categories"]:
+        yield f"  {item['category'][:40]:<40} {_amount(item['total_amount']):>18} {item['count']:>6}"
+    yield ""
+    yield f"{'Fecha':<10} {'Título':<34} {'Categoría':<18} {'Tipo':<7} {'Monto':>16} {'Mon.':<4}"
+    for date, title, category, kind, amount, currency, description in iter_rows(statement["row_chunks"]):
+        yield f"{date[:10]:<10} {title[:34]:<34} {category[:18]:<18} {kind[:7]:<7} {_amount(amount):>16} {currency:<4}"
+
+
+def _write_pdf(path: str, statement: Dict[str, Any]):
+    """Minimal PDF: text pages in Courier, no external dependencies
+
+    Pages are written as the rows stream in; the page tree (object 2), which lists
+    them, goes last, so only one page is held in memory.
+    """
+    per_page = (PDF_PAGE_HEIGHT - 2 * PDF_MARGIN) // PDF_LEADING
+    # Objetos: 1 catálogo, 2 páginas, 3 fuente, luego (página, contenido) por cada página
+    offsets: Dict[int, int] = {}
+    kids: List[bytes] = []
+
+    with open(path, "wb") as out:
+        def write_object(number: int, body: bytes):
+            offsets[number] = out.tell()
+            out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+        def write_page(page_lines: List[str]):
+            content = b"BT /F1 %d Tf %d TL %d %d Td " % (
+                PDF_FONT_SIZE, PDF_LEADING, PDF_MARGIN, PDF_PAGE_HEIGHT - PDF_MARGIN
+            )
+            content += b"".join(b"(" + _pdf_text(line) + b") Tj T* " for line in page_lines) + b"ET"
+            page_number = 4 + 2 * len(kids)
+            kids.append(b"%d 0 R" % page_number)
+            write_object(
+                page_number,
+                b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Resources << /Font << /F1 3 0 R >> >> "
+                b"/Contents %d 0 R >>" % (PDF_PAGE_WIDTH, PDF_PAGE_HEIGHT, page_number + 1)
+            )
+            write_object(page_number + 1, b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+
+        out.write(b"%PDF-1.4\n")
+        write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        write_object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>")
+        page_lines: List[str] = []
+        for line in _pdf_lines(statement):
+            page_lines.append(line)
+            if len(page_lines) == per_page:
+                write_page(page_lines)
+                page_lines = []
+        if page_lines or not kids:
+            write_page(page_lines)
+        write_object(2, b"<< /Type /Pages /Kids [" + b" ".join(kids) + b"] /Count %d >>" % len(kids))
+
+        # La tabla xref va en orden de número de objeto, aunque el archivo no lo esté
+        xref = out.tell()
+        out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(offsets) + 1))
+        out.write(b"".join(b"%010d 00000 n \n" % offsets[number] for number in sorted(offsets)))
+        out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(offsets) + 1, xref))
+
+
+WRITERS = {"csv": _write_csv, "html": _write_html, "pdf": _write_pdf}
+
+
+def render_statement(file_format: str, path: str, statement: Dict[str, Any]) -> int:
+    """Write a statement to `path` and return its size in bytes
+
+    The rows are read from the JSON-lines chunks in statement["row_chunks"], merged by
+    date as they are written. The file is written under a temporary name and renamed,
+    so a reader never sees a half-written artifact.
+    """
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        WRITERS[file_format](temp_path, statement)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return os.path.getsize(path)
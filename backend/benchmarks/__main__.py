@@ -0,0 +1,30 @@
+import importlib
+import pkgutil
+import sys
+from pathlib import Path
+
+def main() -> int:
+    """Run every benchmarks/bench_*.py module and report failures"""
+    package_dir = Path(__file__).resolve().parent
+    selected = set(sys.argv[1:])
+    failures = []
+
+    for module_info in sorted(pkgutil.iter_modules([str(package_dir)]), key=lambda m: m.name):
+        name = module_info.name
+        if not name.startswith("bench_"):
+            continue
+        if selected and name not in selected and name[len("bench_"):] not in selected:
+            continue
+        print(f"\n=== {name} ===")
+        module = importlib.import_module(f"benchmarks.{name}")
+        if module.main([]) != 0:
+            failures.append(name)
+
+    if failures:
+        print(f"\n❌ Benchmarks fuera de presupuesto: {', '.join(failures)}")
+        return 1
+    print("\n✅ Todos los benchmarks dentro de presupuesto")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,50 @@
+import argparse
+import statistics
+import sys
+import time
+from typing import List, Optional
+
+from app.config.settings import get_settings
+from app.utils.security import build_pwd_context
+
+PASSWORD = "benchmark-password-123"
+
+def verify_latency_ms(rounds: int, samples: int) -> float:
+    """Median bcrypt verify latency at a given cost, in milliseconds"""
+    context = build_pwd_context(schemes=["bcrypt"], bcrypt_rounds=rounds)
+    hashed = context.hash(PASSWORD)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.verify(PASSWORD, hashed)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Pick the highest bcrypt cost whose verify latency meets the target on this machine"""
+    parser = argparse.ArgumentParser(description="bcrypt work factor benchmark")
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--min-rounds", type=int, default=8)
+    parser.add_argument("--max-rounds", type=int, default=15)
+    parser.add_argument("--samples", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    chosen = None
+    print(f"{'rounds':>6} {'verify ms':>10}")
+    for rounds in range(args.min_rounds, args.max_rounds + 1):
+        latency = verify_latency_ms(rounds, args.samples)
+        print(f"{rounds:>6} {latency:>10.1f}")
+        if latency > args.target_ms:
+            # Each extra round doubles the cost, so higher ones will not fit either
+            break
+        chosen = rounds
+
+    configured = get_settings().bcrypt_rounds
+    if chosen is None:
+        print(f"⚠️ Ningún costo desde {args.min_rounds} cumple {args.target_ms:.0f} ms")
+    else:
+        print(f"✅ Recomendado para {args.target_ms:.0f} ms: BCRYPT_ROUNDS={chosen} (actual: {configured})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
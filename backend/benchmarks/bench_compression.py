@@ -0,0 +1,91 @@
+import argparse
+import json
+import sys
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Callable, List, Optional, Tuple
+
+from app.utils.compression import _load_brotli
+
+CATEGORIES = ["Alimentación", "Transporte", "Vivienda", "Salud", "Entretenimiento", "Servicios"]
+
+def expenses_page(rows: int) -> bytes:
+    """JSON body shaped like a GET /expenses page"""
+    start = datetime(2024, 1, 1)
+    expenses = [
+        {
+            "title": f"Compra {i}",
+            "amount": round(10 + (i * 37) % 900 + 0.5, 2),
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "description": "Pago con tarjeta" if i % 3 else None,
+            "date": (start + timedelta(hours=i * 5)).isoformat(),
+            "type": "income" if i % 10 == 0 else "expense",
+            "id": f"{0x65a1b2c3d4e5f60000000000 + i:024x}",
+            "user_id": "65a1b2c3d4e5f6a7b8c9d0e1",
+            "created_at": (start + timedelta(hours=i * 5, seconds=3)).isoformat(),
+            "updated_at": (start + timedelta(hours=i * 5, seconds=3)).isoformat(),
+        }
+        for i in range(rows)
+    ]
+    return json.dumps({"expenses": expenses, "total": rows, "page": 1, "limit": rows}).encode()
+
+def websocket_messages(count: int) -> List[bytes]:
+    """Consecutive new_expense WebSocket messages, each with a different expense"""
+    expenses = json.loads(expenses_page(count))["expenses"]
+    return [json.dumps({"type": "new_expense", "payload": expense}).encode() for expense in expenses]
+
+def measure(compress: Callable[[bytes], bytes], data: bytes, seconds: float) -> Tuple[int, float]:
+    """Compressed size and milliseconds per call"""
+    size = len(compress(data))
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        compress(data)
+        calls += 1
+    return size, (time.perf_counter() - start) * 1000 / calls
+
+def deflate_frame(level: int) -> Callable[[bytes], bytes]:
+    """permessage-deflate as websockets applies it: raw deflate, context kept between messages"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return lambda data: compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)[:-4]
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Compare bytes saved against CPU time for HTTP compression and WebSocket deflate"""
+    parser = argparse.ArgumentParser(description="Compression benchmark")
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--seconds", type=float, default=0.5)
+    args = parser.parse_args(argv)
+
+    page = expenses_page(args.rows)
+    codecs: List[Tuple[str, Callable[[bytes], bytes]]] = [
+        (f"gzip-{level}", lambda data, level=level: zlib.compress(data, level)) for level in (1, 6, 9)
+    ]
+    brotli = _load_brotli()
+    if brotli is not None:
+        codecs += [(f"br-{q}", lambda data, q=q: brotli.compress(data, quality=q)) for q in (1, 4, 11)]
+
+    print(f"GET /expenses con {args.rows} filas: {len(page):,} bytes sin comprimir")
+    print(f"{'códec':<10} {'bytes':>10} {'ahorro':>8} {'ms/resp':>9} {'MB/s':>8}")
+    for name, compress in codecs:
+        size, ms = measure(compress, page, args.seconds)
+        print(f"{name:<10} {size:>10,} {1 - size / len(page):>8.1%} {ms:>9.2f} {len(page) / ms / 1000:>8.1f}")
+    if brotli is None:
+        print("br         (paquete brotli no instalado)")
+
+    messages = websocket_messages(200)
+    raw = sum(len(message) for message in messages) / len(messages)
+    print(f"\nMensajes WebSocket new_expense: {raw:.0f} bytes en promedio sin comprimir")
+    print(f"{'nivel':<10} {'bytes/msg':>10} {'ahorro':>8} {'µs/msg':>9}")
+    for level in (1, 6):
+        compress = deflate_frame(level)
+        # El primer mensaje no tiene contexto previo; los siguientes reutilizan la ventana
+        first = len(compress(messages[0]))
+        start = time.perf_counter()
+        size = sum(len(compress(message)) for message in messages[1:]) / (len(messages) - 1)
+        us = (time.perf_counter() - start) * 1e6 / (len(messages) - 1)
+        print(f"deflate-{level:<2} {size:>10.0f} {1 - size / raw:>8.1%} {us:>9.1f}  (primero: {first} bytes)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
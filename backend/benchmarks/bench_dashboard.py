@@ -0,0 +1,107 @@
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from typing import Awaitable, Callable, List, Optional
+
+from bson import ObjectId
+
+import app.database.mongodb as mongodb
+from app.config.settings import get_settings
+from app.schemas.user import UserCreate
+from app.services.auth_service import AuthService
+from app.services.expense_service import ExpenseService
+from app.utils.security import create_access_token
+from benchmarks.bench_expense_storage import expense_documents
+
+def with_latency(app, rtt_ms: float):
+    """Wrap an ASGI app so every HTTP request pays one simulated network round trip"""
+    async def delayed(scope, receive, send):
+        if scope["type"] == "http":
+            await asyncio.sleep(rtt_ms / 1000)
+        await app(scope, receive, send)
+    return delayed
+
+async def timings_ms(call: Callable[[], Awaitable[object]], runs: int) -> List[float]:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - start) * 1000)
+    return sorted(samples)
+
+async def run(args) -> int:
+    import httpx
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    settings = get_settings()
+    client = AsyncIOMotorClient(settings.mongodb_url, serverSelectionTimeoutMS=2000)
+    try:
+        await client.admin.command("ping")
+    except Exception as e:
+        print(f"⏭️ MongoDB no disponible en {settings.mongodb_url} ({e.__class__.__name__}); se omite")
+        return 0
+
+    # Cada variante hace sus agregaciones: sin caché de estadísticas ni límite de peticiones
+    settings.stats_cache_ttl_seconds = 0
+    settings.rate_limit_enabled = False
+    from app.main import app
+
+    database_name = f"{settings.database_name}_bench"
+    await client.drop_database(database_name)
+    mongodb.db.client = client
+    mongodb.db.database = client[database_name]
+    await mongodb.create_indexes()
+
+    try:
+        user = await AuthService().create_user(UserCreate(email="bench@example.com", password="benchmark"))
+        await ExpenseService().insert_expense_documents(expense_documents(ObjectId(user.id), args.rows, args.months))
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': user.email})}"}
+
+        transport = httpx.ASGITransport(app=with_latency(app, args.rtt_ms))
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", headers=headers, follow_redirects=True
+        ) as http:
+            async def fetch(*paths: str):
+                # Como el navegador: las peticiones de un mismo render salen en paralelo
+                responses = await asyncio.gather(*(http.get(path) for path in paths))
+                for response in responses:
+                    response.raise_for_status()
+                return responses
+
+            variants = [
+                # Lo que hace hoy el frontend al montar (los totales los calcula él mismo)
+                ("actual: /auth/me + /expenses", ("/auth/me", "/expenses")),
+                ("mismos datos, 4 peticiones", (
+                    "/auth/me", "/expenses", "/expenses/stats/summary", "/expenses/stats/by-category"
+                )),
+                ("GET /dashboard", ("/dashboard",)),
+            ]
+            results = []
+            for label, paths in variants:
+                await fetch(*paths)
+                results.append((label, len(paths), await timings_ms(lambda: fetch(*paths), args.runs)))
+    finally:
+        await client.drop_database(database_name)
+        client.close()
+
+    print(f"{args.rows} gastos en {args.months} meses; RTT simulado {args.rtt_ms:.0f} ms; {args.runs} cargas por variante")
+    print(f"{'tiempo hasta el primer render':<32} {'peticiones':>10} {'mediana ms':>11} {'p95 ms':>8}")
+    for label, requests, samples in results:
+        p95 = samples[min(len(samples) - 1, len(samples) * 95 // 100)]
+        print(f"{label:<32} {requests:>10} {statistics.median(samples):>11.1f} {p95:>8.1f}")
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Compare the dashboard bootstrap endpoint with the frontend's current request sequence"""
+    parser = argparse.ArgumentParser(description="Dashboard time-to-first-render benchmark")
+    parser.add_argument("--rows", type=int, default=5000, help="Expenses of the benchmark user")
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--rtt-ms", type=float, default=20.0, help="Simulated network round trip per request")
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, List, Optional
+
+from bson import ObjectId
+
+import app.database.mongodb as mongodb
+from app.config.settings import get_settings
+from app.services.expense_bucket_store import ExpenseBucketStore
+from app.services.expense_service import ExpenseService
+from app.schemas.expense import ExpenseCreate
+
+CATEGORIES = ["Alimentación", "Transporte", "Vivienda", "Salud", "Entretenimiento", "Servicios"]
+
+def expense_documents(user_id: ObjectId, rows: int, months: int) -> List[dict]:
+    """Prepared expense documents of one user spread evenly over `months` months"""
+    start = datetime(2023, 1, 1)
+    step = timedelta(days=months * 30) / rows
+    now = datetime.utcnow()
+    return [
+        {
+            "title": f"Compra {i}",
+            "amount": round(10 + (i * 37) % 900 + 0.5, 2),
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "description": "Pago con tarjeta" if i % 3 else None,
+            "date": start + step * i,
+            "type": "income" if i % 10 == 0 else "expense",
+            "user_id": user_id,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(rows)
+    ]
+
+async def median_ms(call: Callable[[], Awaitable[object]], runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await call()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+async def run_layout(layout: str, user_ids: List[ObjectId], args) -> dict:
+    """Load the dataset through ExpenseService in one layout and time it"""
+    service = ExpenseService()
+    service.bucket_store = ExpenseBucketStore() if layout == "buckets" else None
+    collection = "expense_buckets" if layout == "buckets" else "expenses"
+
+    start = time.perf_counter()
+    for user_id in user_ids:
+        documents = expense_documents(user_id, args.rows, args.months)
+        for offset in range(0, len(documents), 1000):
+            await service.insert_expense_documents(documents[offset:offset + 1000])
+    bulk_rows_s = len(user_ids) * args.rows / (time.perf_counter() - start)
+
+    user_id = str(user_ids[0])
+    start = time.perf_counter()
+    for i in range(args.single):
+        await service.create_expense(user_id, ExpenseCreate(
+            title=f"Suelto {i}", amount=12.5, category="Salud", date=datetime(2023, 6, 1 + i % 28)
+        ))
+    single_rows_s = args.single / (time.perf_counter() - start)
+
+    month_start, month_end = datetime(2023, 6, 1), datetime(2023, 6, 30, 23, 59, 59)
+    year_start, year_end = datetime(2023, 1, 1), datetime(2023, 12, 31, 23, 59, 59)
+    collection_stats = await mongodb.db.database.command("collStats", collection)
+    return {
+        "bulk": bulk_rows_s,
+        "single": single_rows_s,
+        "index_bytes": collection_stats.get("totalIndexSize", 0),
+        "storage_bytes": collection_stats.get("storageSize", 0),
+        "month_page": await median_ms(
+            lambda: service.get_user_expenses(user_id, 0, 100, start_date=month_start, end_date=month_end), args.runs
+        ),
+        "year_stats": await median_ms(
+            lambda: service._compute_expense_stats(user_id, year_start, year_end), args.runs
+        ),
+        "all_stats": await median_ms(lambda: service._compute_expense_stats(user_id), args.runs),
+        "by_category": await median_ms(
+            lambda: service._compute_expenses_by_category(user_id, year_start, year_end), args.runs
+        ),
+    }
+
+async def run(args) -> int:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    settings = get_settings()
+    client = AsyncIOMotorClient(settings.mongodb_url, serverSelectionTimeoutMS=2000)
+    try:
+        await client.admin.command("ping")
+    except Exception as e:
+        print(f"⏭️ MongoDB no disponible en {settings.mongodb_url} ({e.__class__.__name__}); se omite")
+        return 0
+
+    database_name = f"{settings.database_name}_bench"
+    await client.drop_database(database_name)
+    mongodb.db.client = client
+    mongodb.db.database = client[database_name]
+    # Índices de ambos formatos (create_indexes solo crea los del formato configurado)
+    await mongodb.create_indexes()
+    for keys in (
+        [("user_id", 1), ("start", -1)],
+        "entries._id",
+        [("user_id", 1), ("entries.idempotency_key", 1)],
+        [("user_id", 1), ("max_seq", 1)]
+    ):
+        await mongodb.db.database.expense_buckets.create_index(keys)
+
+    try:
+        user_ids = [ObjectId() for _ in range(args.users)]
+        results = {layout: await run_layout(layout, user_ids, args) for layout in ("documents", "buckets")}
+    finally:
+        await client.drop_database(database_name)
+        client.close()
+
+    print(f"{args.users} usuarios × {args.rows} filas en {args.months} meses; "
+          f"{args.single} inserciones sueltas; mediana de {args.runs} consultas")
+    rows = [
+        ("inserción en lote (filas/s)", "bulk", "{:,.0f}"),
+        ("inserción suelta (filas/s)", "single", "{:,.0f}"),
+        ("tamaño de índices (KB)", "index_bytes", "{:,.0f}"),
+        ("almacenamiento (KB)", "storage_bytes", "{:,.0f}"),
+        ("página de un mes (ms)", "month_page", "{:.2f}"),
+        ("estadísticas de un año (ms)", "year_stats", "{:.2f}"),
+        ("estadísticas totales (ms)", "all_stats", "{:.2f}"),
+        ("por categoría, un año (ms)", "by_category", "{:.2f}"),
+    ]
+    print(f"{'':<30} {'documents':>12} {'buckets':>12}")
+    for label, key, fmt in rows:
+        values = [results[layout][key] / (1024 if key.endswith("bytes") else 1) for layout in ("documents", "buckets")]
+        print(f"{label:<30} {fmt.format(values[0]):>12} {fmt.format(values[1]):>12}")
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Compare the documents and buckets expense layouts on a throwaway database"""
+    parser = argparse.ArgumentParser(description="Expense storage layout benchmark")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=2000, help="Rows per user")
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--single", type=int, default=200, help="Individual create_expense calls")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args(argv)
+    return asyncio.run(run(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+import app.database.mongodb as mongodb
+from app.config.settings import get_settings
+from app.services.expense_service import ExpenseService
+from app.services.insights_service import InsightsService, _build_documents
+from app.utils.dates import month_bounds, month_key
+from benchmarks.bench_expense_storage import CATEGORIES
+
+def user_expenses(per_user: int, start: datetime, now: datetime, rng: random.Random) -> List[Tuple[str, datetime, float]]:
+    """(category, date, amount) of one user's expenses in the history window"""
+    span = (now - start).total_seconds()
+    # Montos log-normales: la mayoría típicos, unos pocos muy grandes
+    return [
+        (rng.choice(CATEGORIES), start + timedelta(seconds=rng.random() * span), round(rng.lognormvariate(10, 0.6), 2))
+        for _ in range(per_user)
+    ]
+
+def batch_series(users: List[Dict[str, Any]], per_user: int, start: datetime, now: datetime, rng: random.Random) -> List[dict]:
+    """Series as _fetch_series returns them: one per user with flat columns ordered by category"""
+    series = []
+    for user in users:
+        by_category: Dict[str, Tuple[list, list, list]] = {}
+        for category, date, amount in user_expenses(per_user, start, now, rng):
+            ids, days, amounts = by_category.setdefault(category, ([], [], []))
+            ids.append(str(ObjectId()))
+            days.append(float((date - start).days))
+            amounts.append(amount)
+        columns = list(by_category.values())
+        series.append({
+            "_id": user["_id"],
+            "categories": list(by_category),
+            "lengths": [len(ids) for ids, _, _ in columns],
+            "ids": [value for ids, _, _ in columns for value in ids],
+            "days": [value for _, days, _ in columns for value in days],
+            "amounts": [value for _, _, amounts in columns for value in amounts],
+        })
+    return series
+
+def python_reference(series: List[dict], now: datetime) -> Tuple[Dict[Any, float], Dict[Any, int]]:
+    """The same forecast and anomaly rules in plain Python, one group at a time
+
+    Returns the projected total and the anomalies found per user, to check the
+    vectorized version against it.
+    """
+    settings = get_settings()
+    month_start, month_end = month_bounds(month_key(now))
+    days_elapsed = (now - month_start).days + 1
+    days_in_month = (month_end - month_start).days
+    history_days = settings.insights_history_days
+    weights = [0.5 ** ((history_days - 1 - day) / settings.insights_half_life_days) for day in range(history_days)]
+    weights_total = sum(weights)
+
+    projected: Dict[Any, float] = {}
+    flagged: Dict[Any, int] = {}
+    groups = []
+    for item in series:
+        offset = 0
+        for length in item["lengths"]:
+            groups.append((item["_id"], item["days"][offset:offset + length], item["amounts"][offset:offset + length]))
+            offset += length
+
+    for user_id, days, amounts in groups:
+        history_rate = spent = 0.0
+        for day, amount in zip(days, amounts):
+            if day >= history_days:
+                spent += amount
+            else:
+                history_rate += amount * weights[int(day)]
+        pace_weight = days_elapsed / days_in_month
+        daily_rate = pace_weight * spent / days_elapsed + (1 - pace_weight) * history_rate / weights_total
+        projected[user_id] = projected.get(user_id, 0.0) + spent + daily_rate * (days_in_month - days_elapsed)
+
+        median = statistics.median(amounts)
+        deviations = [abs(amount - median) for amount in amounts]
+        spread = statistics.median(deviations) / 0.6745 or sum(deviations) / len(deviations) * 1.2533
+        if spread <= 0 or len(amounts) < settings.insights_min_samples:
+            continue
+        flagged[user_id] = flagged.get(user_id, 0) + sum(
+            1 for day, amount in zip(days, amounts)
+            if day >= history_days and (amount - median) / spread >= settings.insights_anomaly_threshold
+        )
+    return projected, flagged
+
+async def run_mongo(args, start: datetime, now: datetime) -> Optional[Dict[str, float]]:
+    """Time every stage of the pass against <DATABASE_NAME>_bench; None if MongoDB is not reachable"""
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    settings = get_settings()
+    client = AsyncIOMotorClient(settings.mongodb_url, serverSelectionTimeoutMS=2000)
+    try:
+        await client.admin.command("ping")
+    except Exception as e:
+        print(f"⏭️ MongoDB no disponible en {settings.mongodb_url} ({e.__class__.__name__}); se omiten las etapas con MongoDB")
+        return None
+
+    database_name = f"{settings.database_name}_bench"
+    await client.drop_database(database_name)
+    mongodb.db.client = client
+    mongodb.db.database = client[database_name]
+    await mongodb.create_indexes()
+
+    rng = random.Random(args.seed)
+    service = InsightsService()
+    stages = {"_fetch_series": 0.0, "cálculo": 0.0, "detalle de anomalías": 0.0, "bulk_write": 0.0}
+    try:
+        users = [{"_id": ObjectId()} for _ in range(args.db_users)]
+        created = datetime.utcnow()
+        for offset in range(0, len(users), args.batch):
+            await ExpenseService().insert_expense_documents([
+                {
+                    "title": f"Compra {number}",
+                    "amount": amount,
+                    "category": category,
+                    "description": None,
+                    "date": date,
+                    "type": "expense",
+                    "user_id": user["_id"],
+                    "created_at": created,
+                    "updated_at": created,
+                }
+                for user in users[offset:offset + args.batch]
+                for number, (category, date, amount) in enumerate(user_expenses(args.per_user, start, now, rng))
+            ])
+
+        # Las mismas etapas que compute_for_users, cronometradas por separado
+        for offset in range(0, len(users), args.batch):
+            batch = users[offset:offset + args.batch]
+            began = time.perf_counter()
+            series = await service._fetch_series([user["_id"] for user in batch], start, now)
+            stages["_fetch_series"] += time.perf_counter() - began
+            began = time.perf_counter()
+            documents = _build_documents(batch, series, now)
+            stages["cálculo"] += time.perf_counter() - began
+            began = time.perf_counter()
+            await service._attach_anomaly_details(documents)
+            stages["detalle de anomalías"] += time.perf_counter() - began
+            began = time.perf_counter()
+            await service._store_documents(documents)
+            stages["bulk_write"] += time.perf_counter() - began
+    finally:
+        await client.drop_database(database_name)
+        client.close()
+    return stages
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Time the nightly insights pass against its time budget: the vectorized compute alone, then every stage with MongoDB"""
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description="Nightly insights compute benchmark")
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--per-user", type=int, default=60, help="Expenses per user in the history window")
+    parser.add_argument("--batch", type=int, default=settings.insights_batch_users)
+    parser.add_argument("--db-users", type=int, default=5000, help="Users loaded into MongoDB for the full-pass stages")
+    parser.add_argument("--budget-seconds", type=float, default=settings.insights_time_budget_seconds)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        print("⏭️ numpy no está instalado; se omite")
+        return 0
+
+    rng = random.Random(args.seed)
+    now = datetime(2024, 6, 15, 3, 0)
+    month_start, _ = month_bounds(month_key(now))
+    start = month_start - timedelta(days=settings.insights_history_days)
+
+    compute_s = 0.0
+    anomalies = 0
+    reference_s = None
+    for offset in range(0, args.users, args.batch):
+        users = [{"_id": ObjectId()} for _ in range(min(args.batch, args.users - offset))]
+        series = batch_series(users, args.per_user, start, now, rng)
+        began = time.perf_counter()
+        documents = _build_documents(users, series, now)
+        compute_s += time.perf_counter() - began
+        anomalies += sum(len(document["anomalies"]) for document in documents)
+        if offset == 0:
+            # Referencia en Python puro sobre el primer lote: mismo resultado, grupo por grupo
+            began = time.perf_counter()
+            projected, flagged = python_reference(series, now)
+            reference_s = time.perf_counter() - began
+            for user, document in zip(users, documents):
+                expected = min(flagged.get(user["_id"], 0), settings.insights_max_anomalies)
+                if (
+                    len(document["anomalies"]) != expected
+                    or abs(document["projected_total"] - projected.get(user["_id"], 0.0)) > 0.01
+                ):
+                    print("❌ El resultado no coincide con la referencia en Python")
+                    return 1
+
+    total_rows = args.users * args.per_user
+    print(f"{args.users} usuarios × {args.per_user} gastos en {settings.insights_history_days} días; lotes de {args.batch}")
+    print(f"NumPy:        {compute_s:8.2f} s  {args.users / compute_s:>10,.0f} usuarios/s  {total_rows / compute_s:>12,.0f} filas/s")
+    if reference_s:
+        reference_total_s = reference_s * args.users / args.batch
+        print(f"Python puro:  {reference_total_s:8.2f} s  {args.users / reference_total_s:>10,.0f} usuarios/s  (extrapolado del primer lote)")
+    print(f"Anomalías marcadas: {anomalies}")
+    print(f"Presupuesto de la pasada: {args.budget_seconds:.0f} s")
+    if compute_s > args.budget_seconds:
+        print(f"❌ El cálculo ({compute_s:.1f} s) supera el presupuesto")
+        return 1
+    print(f"✅ Cálculo dentro del presupuesto ({compute_s / args.budget_seconds:.1%})")
+
+    stages = asyncio.run(run_mongo(args, start, now))
+    if stages is None:
+        return 0
+    # Se mide sobre --db-users y se extrapola a --users
+    scale = args.users / args.db_users
+    print(f"\nCon MongoDB: {args.db_users} usuarios × {args.per_user} gastos ({settings.expense_storage}), extrapolado a {args.users}")
+    for stage, seconds in stages.items():
+        print(f"{stage:<22} {seconds * scale:8.2f} s  {args.db_users / seconds:>10,.0f} usuarios/s")
+    pass_s = sum(stages.values()) * scale
+    print(f"{'pasada completa':<22} {pass_s:8.2f} s")
+    if pass_s > args.budget_seconds:
+        print(f"❌ La pasada completa ({pass_s:.1f} s) supera el presupuesto")
+        return 1
+    print(f"✅ Pasada completa dentro del presupuesto ({pass_s / args.budget_seconds:.1%})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+import argparse
+import sys
+import time
+from typing import Callable, List, Optional
+
+from app.utils import security
+from app.utils.security import JWT_BACKENDS, TokenCache, create_access_token, get_jwt_backend, verify_token
+from app.config.settings import get_settings
+
+def tokens_per_second(fn: Callable[[], object], seconds: float) -> float:
+    """Call `fn` in a tight loop on one core and return calls per second"""
+    calls = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            fn()
+        calls += 100
+    return calls / (time.perf_counter() - start)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Measure JWT verification throughput per backend, with and without the token cache"""
+    parser = argparse.ArgumentParser(description="JWT verification benchmark")
+    parser.add_argument("--seconds", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    settings = get_settings()
+    token = create_access_token({"sub": "bench@example.com"})
+
+    print(f"{'backend':<10} {'tokens/s/core':>15}")
+    for name in JWT_BACKENDS:
+        try:
+            _, decode, _ = get_jwt_backend(name)
+        except ImportError:
+            print(f"{name:<10} {'no instalado':>15}")
+            continue
+        rate = tokens_per_second(
+            lambda: decode(token, settings.secret_key, algorithms=[settings.algorithm]), args.seconds
+        )
+        print(f"{name:<10} {rate:>15,.0f}")
+
+    security._token_cache = TokenCache(settings.token_cache_size)
+    verify_token(token)
+    cached_rate = tokens_per_second(lambda: verify_token(token), args.seconds)
+    print(f"{'caché':<10} {cached_rate:>15,.0f}  (verify_token con token repetido)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import List, Optional
+
+from app.config.settings import get_settings
+from app.utils.startup import BACKEND_DIR, measure_import_time
+
+# Modules that must not be loaded just by importing the application
+LAZY_MODULES = ["passlib", "jose", "motor", "uvicorn"]
+
+def eagerly_loaded(module: str = "app.main") -> List[str]:
+    """Return the lazy modules that a fresh import of `module` loads anyway"""
+    check = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", check], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+    )
+    return [m for m in result.stdout.strip().split(",") if m]
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Measure cold import time of app.main against the startup budget"""
+    parser = argparse.ArgumentParser(description="Cold start benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=get_settings().startup_budget_ms)
+    args = parser.parse_args(argv)
+
+    samples = [measure_import_time("app.main") for _ in range(args.runs)]
+    median_ms = statistics.median(samples)
+    print(f"import app.main: mediana {median_ms:.1f} ms, "
+          f"mín {min(samples):.1f} ms, máx {max(samples):.1f} ms ({args.runs} ejecuciones)")
+    print(f"presupuesto: {args.budget_ms:.0f} ms")
+
+    loaded = eagerly_loaded()
+    if loaded:
+        print(f"❌ Módulos cargados al importar que deberían ser perezosos: {', '.join(loaded)}")
+        return 1
+    if median_ms > args.budget_ms:
+        print("❌ Tiempo de arranque fuera de presupuesto")
+        return 1
+    print("✅ Arranque dentro de presupuesto")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
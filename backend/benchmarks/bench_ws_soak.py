@@ -0,0 +1,105 @@
+import argparse
+import asyncio
+import contextlib
+import gc
+import os
+import sys
+import tracemalloc
+from typing import List, Optional
+
+from app.routes.websocket import ConnectionManager
+
+class FakeWebSocket:
+    """Stands in for a client socket; a half-open one never completes a send or a close"""
+
+    def __init__(self, half_open: bool = False):
+        self.half_open = half_open
+        self.sent = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message: str):
+        if self.half_open:
+            await asyncio.Event().wait()
+        self.sent += 1
+
+    async def close(self, code: int = 1000, reason: Optional[str] = None):
+        if self.half_open:
+            await asyncio.Event().wait()
+
+def retained_memory() -> int:
+    """Traced bytes still reachable (the cycles of cancelled tasks are not a leak)"""
+    gc.collect()
+    return tracemalloc.get_traced_memory()[0]
+
+async def soak(args) -> List[int]:
+    """Churn connections through a ConnectionManager and sample traced memory"""
+    manager = ConnectionManager()
+    manager.heartbeat_seconds = 0.05
+    manager.idle_timeout_seconds = 0.2
+    manager.send_timeout_seconds = 0.1
+    manager.max_connections = args.connections
+
+    samples = []
+    open_clients = []
+    for i in range(args.connections):
+        websocket = FakeWebSocket(half_open=i % args.half_open_every == 0)
+        client = await manager.connect(websocket, f"user{i % args.users}")
+        open_clients.append((websocket, client))
+        await manager.broadcast_to_user(client.user_id, "new_expense", {"title": f"Compra {i}", "amount": 10.5})
+        # Los clientes sanos se desconectan solos; los medio abiertos quedan para el barrido
+        if len(open_clients) >= args.concurrent:
+            for old_websocket, old_client in open_clients:
+                if not old_websocket.half_open:
+                    manager.disconnect(old_websocket, old_client.user_id)
+            open_clients = []
+            # Entre tandas pasa un heartbeat: el barrido cierra los medio abiertos a la par
+            await asyncio.sleep(manager.heartbeat_seconds)
+        if (i + 1) % args.sample_every == 0:
+            samples.append(retained_memory())
+
+    for old_websocket, old_client in open_clients:
+        if not old_websocket.half_open:
+            manager.disconnect(old_websocket, old_client.user_id)
+    # Tiempo suficiente para que el barrido cierre los medio abiertos y terminen sus cierres
+    await asyncio.sleep(manager.idle_timeout_seconds + manager.heartbeat_seconds * 2 + manager.send_timeout_seconds * 2)
+    samples.append(retained_memory())
+    args.final_stats = manager.stats()
+    return samples
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Churn 10k WebSocket connections and check that memory and bookkeeping stay flat"""
+    parser = argparse.ArgumentParser(description="WebSocket churn soak test")
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--concurrent", type=int, default=200, help="Connections open at once")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--half-open-every", type=int, default=10, help="One in N clients stops responding")
+    parser.add_argument("--sample-every", type=int, default=1000)
+    parser.add_argument("--budget-kb", type=float, default=512.0, help="Allowed growth after the first sample")
+    args = parser.parse_args(argv)
+
+    tracemalloc.start()
+    # Los mensajes de conexión y desconexión de 10k clientes no aportan nada aquí
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        samples = asyncio.run(soak(args))
+    tracemalloc.stop()
+
+    stats = args.final_stats
+    growth_kb = (samples[-1] - samples[0]) / 1024
+    print(f"{args.connections} conexiones ({args.concurrent} simultáneas, 1 de cada {args.half_open_every} medio abierta)")
+    print("memoria trazada (KB): " + ", ".join(f"{sample / 1024:.0f}" for sample in samples))
+    print(f"crecimiento: {growth_kb:.0f} KB (presupuesto {args.budget_kb:.0f} KB)")
+    print(f"al final: {stats['connections']} conexiones, {stats['bytes_buffered']} bytes en cola, "
+          f"cerradas por el servidor: {stats['evicted']}")
+
+    if stats["connections"] or stats["bytes_buffered"]:
+        print("❌ Quedaron conexiones registradas tras el barrido")
+        return 1
+    if growth_kb > args.budget_kb:
+        print("❌ La memoria crece con las conexiones")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
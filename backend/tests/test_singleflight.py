@@ -0,0 +1,173 @@
+import asyncio
+
+from app.utils.singleflight import SingleFlightCache
+
+
+class Blocked:
+    """A compute function that waits until released and counts its runs"""
+
+    def __init__(self):
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+        self.runs = 0
+
+    async def __call__(self):
+        self.runs += 1
+        self.started.set()
+        run = self.runs
+        await self.release.wait()
+        return run
+
+
+async def test_concurrent_calls_share_one_computation():
+    cache = SingleFlightCache(ttl=60)
+    compute = Blocked()
+
+    first = asyncio.ensure_future(cache.get_or_compute("u1", "stats", compute))
+    second = asyncio.ensure_future(cache.get_or_compute("u1", "stats", compute))
+    await compute.started.wait()
+    compute.release.set()
+
+    assert await asyncio.gather(first, second) == [1, 1]
+    assert await cache.get_or_compute("u1", "stats", compute) == 1
+    assert compute.runs == 1
+    assert (cache.misses, cache.coalesced, cache.hits) == (1, 1, 1)
+
+
+async def test_cancelled_caller_does_not_cancel_shared_work():
+    cache = SingleFlightCache(ttl=60)
+    compute = Blocked()
+
+    first = asyncio.ensure_future(cache.get_or_compute("u1", "stats", compute))
+    second = asyncio.ensure_future(cache.get_or_compute("u1", "stats", compute))
+    await compute.started.wait()
+    first.cancel()
+    compute.release.set()
+
+    assert await second == 1
+    assert compute.runs == 1
+
+
+async def test_write_during_computation_is_not_cached():
+    cache = SingleFlightCache(ttl=60)
+    compute = Blocked()
+
+    call = asyncio.ensure_future(cache.get_or_compute("u1", "stats", compute))
+    await compute.started.wait()
+    cache.invalidate("u1")
+    compute.release.set()
+
+    # The caller still gets its result, but the next call computes again
+    assert await call == 1
+    assert await cache.get_or_compute("u1", "stats", compute) == 2
+    assert cache.stats()["entries"] == 1
+
+
+async def test_write_to_another_user_does_not_drop_the_result():
+    cache = SingleFlightCache(ttl=60)
+    compute = Blocked()
+
+    call = asyncio.ensure_future(cache.get_or_compute("u1", "stats", compute))
+    await compute.started.wait()
+    cache.invalidate("u2")
+    compute.release.set()
+
+    assert await call == 1
+    assert await cache.get_or_compute("u1", "stats", compute) == 1
+    assert compute.runs == 1
+
+
+async def test_callers_after_invalidate_do_not_join_the_stale_computation():
+    cache = SingleFlightCache(ttl=60)
+    stale = Blocked()
+    fresh = Blocked()
+
+    before = asyncio.ensure_future(cache.get_or_compute("u1", "stats", stale))
+    await stale.started.wait()
+    cache.invalidate("u1")
+    after = asyncio.ensure_future(cache.get_or_compute("u1", "stats", fresh))
+    await fresh.started.wait()
+    assert fresh.runs == 1
+
+    fresh.release.set()
+    assert await after == 1
+    stale.release.set()
+    assert await before == 1
+
+    # The fresh result is cached; the stale one finishing later does not replace it
+    assert await cache.get_or_compute("u1", "stats", stale) == 1
+    assert stale.runs == 1
+    assert cache.stats()["in_flight"] == 0
+
+
+async def test_zero_ttl_never_caches():
+    cache = SingleFlightCache(ttl=0)
+    compute = Blocked()
+    compute.release.set()
+
+    assert await cache.get_or_compute("u1", "stats", compute) == 1
+    assert await cache.get_or_compute("u1", "stats", compute) == 2
+
+
+class SmallCache(SingleFlightCache):
+    """Prunes after a few users, so pruning is reached in a test"""
+
+    PRUNE_THRESHOLD = 2
+
+
+async def test_pruning_keeps_invalidations_newer_than_a_running_computation():
+    cache = SmallCache(ttl=60)
+    compute = Blocked()
+
+    call = asyncio.ensure_future(cache.get_or_compute("u1", "stats", compute))
+    await compute.started.wait()
+    # The write that makes the running computation stale, then another that triggers a purge
+    cache.invalidate("u1")
+    cache.invalidate("u2")
+
+    assert cache.stats()["invalidations"] == 2
+    compute.release.set()
+    assert await call == 1
+    assert await cache.get_or_compute("u1", "stats", compute) == 2
+
+
+async def test_pruning_drops_invalidations_older_than_every_running_computation():
+    cache = SmallCache(ttl=60)
+    compute = Blocked()
+
+    cache.invalidate("old")
+    call = asyncio.ensure_future(cache.get_or_compute("u1", "stats", compute))
+    await compute.started.wait()
+    cache.invalidate("u1")
+
+    # "old" was written before u1's computation started: it can no longer make anything stale
+    assert set(cache._invalidated) == {"u1"}
+    compute.release.set()
+    await call
+
+
+async def test_pruning_without_running_computations_drops_every_invalidation():
+    cache = SmallCache(ttl=60)
+
+    for user in ("u1", "u2"):
+        cache.invalidate(user)
+
+    assert cache.stats()["invalidations"] == 0
+    assert cache._prune_invalidations_at == cache.PRUNE_THRESHOLD
+
+
+async def test_long_computation_doubles_the_next_prune_point():
+    cache = SmallCache(ttl=60)
+    compute = Blocked()
+
+    call = asyncio.ensure_future(cache.get_or_compute("u1", "stats", compute))
+    await compute.started.wait()
+    for user in ("u2", "u3", "u4"):
+        cache.invalidate(user)
+
+    # All are newer than the running computation: none is dropped, and the next purge
+    # waits for twice as many instead of running on every write
+    assert cache.stats()["invalidations"] == 3
+    assert cache._prune_invalidations_at == 4
+    compute.release.set()
+    await call
@@ -0,0 +1,125 @@
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+
+from app.config.settings import get_settings
+from app.services.expense_service import (
+    SYNC_SETTLE_SECONDS,
+    ExpenseService,
+    decode_sync_token,
+    encode_sync_token,
+    page_changes,
+)
+
+NOW = datetime(2024, 6, 15, 12, 0, 0)
+SETTLED = NOW - timedelta(seconds=SYNC_SETTLE_SECONDS + 1)
+UNSETTLED = NOW - timedelta(seconds=1)
+ISSUED_AT = NOW - timedelta(hours=1)
+USER_ID = ObjectId()
+
+
+def expense(seq: int, updated_at: datetime) -> dict:
+    return {
+        "_id": ObjectId(),
+        "user_id": USER_ID,
+        "title": f"Gasto {seq}",
+        "amount": 10.0,
+        "category": "Comida",
+        "seq": seq,
+        "updated_at": updated_at,
+    }
+
+
+def tombstone(seq: int, deleted_at: datetime) -> dict:
+    return {"user_id": USER_ID, "expense_id": ObjectId(), "seq": seq, "deleted_at": deleted_at}
+
+
+def token_position(page: dict):
+    return decode_sync_token(page["next_token"])
+
+
+def test_sync_token_round_trip():
+    assert decode_sync_token(encode_sync_token(42, NOW)) == (42, NOW)
+    assert decode_sync_token("not-a-token") is None
+
+
+def test_settled_page_advances_to_its_last_change():
+    page = page_changes([expense(4, SETTLED), expense(5, SETTLED)], [], 3, ISSUED_AT, 10, NOW)
+
+    assert [upsert.title for upsert in page["upserts"]] == ["Gasto 4", "Gasto 5"]
+    assert page["has_more"] is False
+    assert page["reset"] is False
+    assert token_position(page) == (5, NOW - timedelta(seconds=SYNC_SETTLE_SECONDS))
+
+
+def test_no_changes_keeps_the_position():
+    page = page_changes([], [], 7, ISSUED_AT, 10, NOW)
+
+    assert page["upserts"] == [] and page["deleted"] == []
+    assert token_position(page)[0] == 7
+
+
+def test_unsettled_change_is_not_skipped():
+    # seq 5 was reserved before seq 6 but written later: the token must not pass it
+    docs = [expense(4, SETTLED), expense(5, UNSETTLED), expense(6, SETTLED)]
+    page = page_changes(docs, [], 3, ISSUED_AT, 10, NOW)
+
+    assert [upsert.title for upsert in page["upserts"]] == ["Gasto 4", "Gasto 5", "Gasto 6"]
+    assert token_position(page)[0] == 4
+
+    # Once settled, the next request from that token returns the rest again
+    later = NOW + timedelta(seconds=SYNC_SETTLE_SECONDS + 1)
+    page = page_changes(docs[1:], [], 4, ISSUED_AT, 10, later)
+    assert [upsert.title for upsert in page["upserts"]] == ["Gasto 5", "Gasto 6"]
+    assert token_position(page)[0] == 6
+
+
+def test_full_settled_page_has_more_and_keeps_the_issue_time():
+    docs = [expense(seq, SETTLED) for seq in (1, 2, 3)]
+    page = page_changes(docs, [], 0, ISSUED_AT, 2, NOW)
+
+    assert len(page["upserts"]) == 2
+    assert page["has_more"] is True
+    # While paging, the token keeps the original issue time for the retention check
+    assert token_position(page) == (2, ISSUED_AT)
+
+
+def test_unsettled_change_ends_a_page_cut_short():
+    docs = [expense(1, SETTLED), expense(2, UNSETTLED), expense(3, SETTLED)]
+    page = page_changes(docs, [], 0, ISSUED_AT, 2, NOW)
+
+    # More changes exist, but asking again right away would return the same page
+    assert page["has_more"] is False
+    assert token_position(page) == (1, NOW - timedelta(seconds=SYNC_SETTLE_SECONDS))
+
+
+def test_tombstones_interleave_with_upserts_by_seq():
+    deleted = tombstone(2, SETTLED)
+    page = page_changes([expense(1, SETTLED), expense(3, SETTLED)], [deleted], 0, ISSUED_AT, 2, NOW)
+
+    assert [upsert.title for upsert in page["upserts"]] == ["Gasto 1"]
+    assert page["deleted"] == [str(deleted["expense_id"])]
+    assert page["has_more"] is True
+    assert token_position(page)[0] == 2
+
+
+def test_unsettled_tombstone_holds_the_token():
+    page = page_changes([expense(2, SETTLED)], [tombstone(1, UNSETTLED)], 0, ISSUED_AT, 10, NOW)
+
+    assert len(page["upserts"]) == 1 and len(page["deleted"]) == 1
+    assert token_position(page)[0] == 0
+
+
+async def test_token_older_than_tombstone_retention_resets(monkeypatch):
+    async def current_sequence(self, user_id):
+        return 42
+
+    monkeypatch.setattr(ExpenseService, "get_current_sequence", current_sequence)
+    retention = timedelta(days=get_settings().tombstone_retention_days)
+    expired = encode_sync_token(3, datetime.utcnow() - retention - timedelta(hours=1))
+
+    for token in (expired, "not-a-token"):
+        page = await ExpenseService().get_changes(str(USER_ID), token)
+        assert page["reset"] is True
+        assert page["upserts"] == [] and page["deleted"] == []
+        assert token_position(page)[0] == 42
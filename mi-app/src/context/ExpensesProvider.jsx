@@ -3,7 +3,7 @@ import api from "../Api/apiClient";
 
 const ExpensesContext = createContext();
 
-const initial = { list: [], loading: false, error: null, user: null };
+const initial = { list: [], loading: false, error: null, user: null, stats: null, categories: [] };
 
 function reducer(state, action) {
   switch (action.type) {
@@ -29,6 +29,21 @@ function reducer(state, action) {
       };
     case "SET_USER":
       return { ...state, user: action.payload };
+    case "SET_STATS":
+      return { ...state, ...action.payload };
+    case "LOAD_DASHBOARD":
+      return {
+        ...state,
+        loading: false,
+        user: action.payload.user,
+        stats: action.payload.stats,
+        categories: action.payload.categories,
+        list: action.payload.expenses.map((exp) => ({
+          ...exp,
+          amount: Math.abs(Number(exp.amount)),
+          type: exp.type || "expense",
+        })),
+      };
     default:
       return state;
   }
@@ -43,6 +58,22 @@ function apiToWs(apiUrl) {
 export function ExpensesProvider({ children }) {
   const [state, dispatch] = useReducer(reducer, initial);
 
+  // 🔹 Totales y categorías calculados por el servidor (con todos los movimientos, no solo la página)
+  const refreshStats = async () => {
+    try {
+      const token = localStorage.getItem("token");
+      if (!token) return;
+      const headers = { Authorization: `Bearer ${token}` };
+      const [stats, categories] = await Promise.all([
+        api.get("/expenses/stats/summary", { headers }),
+        api.get("/expenses/stats/by-category", { headers }),
+      ]);
+      dispatch({ type: "SET_STATS", payload: { stats: stats.data, categories: categories.data } });
+    } catch (err) {
+      console.error("❌ Error al cargar estadísticas:", err);
+    }
+  };
+
   // 🔹 Cargar gastos e ingresos
   const loadExpenses = async () => {
     dispatch({ type: "LOAD_START" });
@@ -70,6 +101,7 @@ export function ExpensesProvider({ children }) {
       console.log("✅ DATOS NORMALIZADOS:", expenses);
 
       dispatch({ type: "LOAD_SUCCESS", payload: expenses });
+      refreshStats();
     } catch (err) {
       console.error("❌ Error al cargar:", err);
       dispatch({
@@ -112,6 +144,7 @@ export function ExpensesProvider({ children }) {
       console.log("✅ EXPENSE NORMALIZADO:", newExp);
 
       dispatch({ type: "ADD", payload: newExp });
+      refreshStats();
       return newExp;
     } catch (err) {
       console.error("❌ Error al agregar:", err);
@@ -128,6 +161,7 @@ export function ExpensesProvider({ children }) {
         headers: { Authorization: `Bearer ${token}` },
       });
       dispatch({ type: "DELETE", payload: id });
+      refreshStats();
     } catch (err) {
       console.error("❌ Error al eliminar:", err);
       throw err;
@@ -154,54 +188,122 @@ export function ExpensesProvider({ children }) {
     const token = localStorage.getItem("token");
     if (!token) return;
 
+    // Una sola petición trae perfil, primera página y estadísticas
+    dispatch({ type: "LOAD_START" });
     api
-      .get("/auth/me", { headers: { Authorization: `Bearer ${token}` } })
-      .then((res) => dispatch({ type: "SET_USER", payload: res.data }))
-      .catch((err) => console.error("Error cargando usuario:", err));
-
-    loadExpenses();
+      .get("/dashboard", { headers: { Authorization: `Bearer ${token}` } })
+      .then((res) => dispatch({ type: "LOAD_DASHBOARD", payload: res.data }))
+      .catch((err) => {
+        console.error("Error cargando el tablero:", err);
+        dispatch({ type: "LOAD_FAIL", payload: err.response?.data || err.message });
+      });
 
     const base = import.meta.env.VITE_API_URL || "http://localhost:8000";
     const wsBase = apiToWs(base);
-    const wsUrl = wsBase.replace(/\/$/, "") + "/ws/expenses?token=" + token;
-    const ws = new WebSocket(wsUrl);
 
-    ws.onmessage = (evt) => {
-      try {
-        const msg = JSON.parse(evt.data);
-        console.log("📨 WEBSOCKET MENSAJE:", msg);
+    // 🔁 Reconexión: con 1012 se espera lo que indicó el servidor; con 1013 y los cortes,
+    // backoff exponencial con jitter para que los clientes no vuelvan todos a la vez
+    let ws = null;
+    let stopped = false;
+    let connectedOnce = false;
+    let attempts = 0;
+    let reconnectAfterMs = null;
+    let timer = null;
+
+    const backoffMs = (baseMs) => {
+      const ms = Math.min(30000, baseMs * 2 ** attempts);
+      attempts += 1;
+      return ms / 2 + Math.random() * (ms / 2);
+    };
+
+    const scheduleReconnect = (evt) => {
+      if (stopped) return;
+      // 1008: token inválido o conexión reemplazada por otra pestaña; reintentar no ayuda
+      if (evt.code === 1008) {
+        console.warn("🔌 WS cerrado por el servidor:", evt.reason);
+        return;
+      }
+      let delay;
+      if (evt.code === 1012) {
+        const fromReason = /reconnect_after_ms=(\d+)/.exec(evt.reason || "");
+        delay = reconnectAfterMs ?? (fromReason ? Number(fromReason[1]) : backoffMs(1000));
+      } else if (evt.code === 1013) {
+        // Servidor al límite de conexiones: se espera más desde el primer intento
+        delay = backoffMs(5000);
+      } else {
+        delay = backoffMs(1000);
+      }
+      reconnectAfterMs = null;
+      console.log(`🔌 WS cerrado (${evt.code}); reconectando en ${Math.round(delay)} ms`);
+      timer = setTimeout(connect, delay);
+    };
+
+    const connect = () => {
+      const currentToken = localStorage.getItem("token");
+      if (stopped || !currentToken) return;
+      const wsUrl = wsBase.replace(/\/$/, "") + "/ws/expenses?token=" + currentToken;
+      ws = new WebSocket(wsUrl);
+
+      ws.onopen = () => {
+        attempts = 0;
+        // Lo ocurrido mientras estuvo desconectado no llegó por el WebSocket
+        if (connectedOnce) loadExpenses();
+        connectedOnce = true;
+      };
+
+      ws.onclose = scheduleReconnect;
+
+      ws.onmessage = (evt) => {
+        try {
+          const msg = JSON.parse(evt.data);
+
+          // 💓 El servidor cierra las conexiones que no responden al heartbeat
+          if (msg.type === "heartbeat") {
+            ws.send(JSON.stringify({ type: "pong" }));
+            return;
+          }
+
+          // 🔁 El servidor se reinicia: indica cuánto esperar antes de reconectar (llega antes del cierre 1012)
+          if (msg.type === "server_restart") {
+            reconnectAfterMs = Number(msg.payload?.reconnect_after_ms) || null;
+            return;
+          }
+
+          console.log("📨 WEBSOCKET MENSAJE:", msg);
         
-        if (msg.type === "new_expense") {
-          const exp = msg.payload;
-          console.log("📨 WS EXPENSE:", exp);
+          if (msg.type === "new_expense") {
+            const exp = msg.payload;
+            console.log("📨 WS EXPENSE:", exp);
           
-          // ✅ Normalizar datos del WebSocket
-          const normalized = {
-            ...exp,
-            amount: Math.abs(Number(exp.amount)), // Siempre positivo
-            type: exp.type || "expense", // Usar el type del mensaje
-          };
+            // ✅ Normalizar datos del WebSocket
+            const normalized = {
+              ...exp,
+              amount: Math.abs(Number(exp.amount)), // Siempre positivo
+              type: exp.type || "expense", // Usar el type del mensaje
+            };
           
-          console.log("✅ WS NORMALIZADO:", normalized);
-          dispatch({ type: "ADD", payload: normalized });
+            console.log("✅ WS NORMALIZADO:", normalized);
+            dispatch({ type: "ADD", payload: normalized });
+            refreshStats();
+          }
+        } catch (e) {
+          console.error("❌ WS parse error:", e);
         }
-      } catch (e) {
-        console.error("❌ WS parse error:", e);
-      }
+      };
     };
 
-    return () => ws.close();
-  }, []);
-
-  // 🔹 Totales
-  const totalIncome = state.list
-    .filter((i) => i.type === "income")
-    .reduce((sum, i) => sum + Math.abs(Number(i.amount) || 0), 0);
+    connect();
 
-  const totalExpense = state.list
-    .filter((i) => i.type === "expense")
-    .reduce((sum, i) => sum + Math.abs(Number(i.amount) || 0), 0);
+    return () => {
+      stopped = true;
+      clearTimeout(timer);
+      if (ws) ws.close();
+    };
+  }, []);
 
+  // 🔹 Totales (de /dashboard o /expenses/stats, en la moneda del usuario)
+  const totalIncome = Number(state.stats?.income_total) || 0;
+  const totalExpense = Number(state.stats?.expense_total) || 0;
   const balance = totalIncome - totalExpense;
 
   console.log("📊 TOTALES CALCULADOS:", { totalIncome, totalExpense, balance });
@@ -214,6 +316,7 @@ export function ExpensesProvider({ children }) {
         addExpense,
         deleteExpense,
         updateUser,
+        refreshStats,
         totalIncome,
         totalExpense,
         balance,
@@ -29,7 +29,7 @@ ChartJS.register(
 );
 
 export default function Dashboard() {
-  const { list, user } = useExpenses();
+  const { list, user, totalIncome, totalExpense, categories: categoryStats } = useExpenses();
   const navigate = useNavigate();
 
   const handleLogout = () => {
@@ -37,15 +37,7 @@ export default function Dashboard() {
     navigate("/login");
   };
 
-  // 🔹 Totales
-  const totalIncome = list
-    .filter((e) => e.type === "income")
-    .reduce((sum, e) => sum + Math.abs(Number(e.amount) || 0), 0);
-
-  const totalExpense = list
-    .filter((e) => e.type === "expense")
-    .reduce((sum, e) => sum + Math.abs(Number(e.amount) || 0), 0);
-
+  // 🔹 Totales: vienen del servidor (todos los movimientos, no solo la página cargada)
   const userIncome = Number(user?.income) || 0;
   const balance = userIncome + totalIncome - totalExpense;
   const lowBalance = balance < 100;
@@ -143,15 +135,11 @@ export default function Dashboard() {
     ],
   };
 
-  // 🔹 Clasificación de gastos por categorías
+  // 🔹 Clasificación de gastos por categorías (desglose del servidor)
   const categories = {};
-  list
-    .filter((e) => e.type === "expense")
-    .forEach((e) => {
-      const cat = e.category || "Sin categoría";
-      const amount = Math.abs(Number(e.amount)) || 0;
-      categories[cat] = (categories[cat] || 0) + amount;
-    });
+  (categoryStats || []).forEach((c) => {
+    categories[c.category || "Sin categoría"] = Math.abs(Number(c.total_amount)) || 0;
+  });
 
   // 🔹 Alertas
   const alerts = [];